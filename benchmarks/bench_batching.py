@@ -0,0 +1,113 @@
+"""
+`bench_batching`
+====================================================
+
+Compares delivering messages one per request to ``/message`` with
+delivering them in batches to ``/messages``, against a single-threaded
+stand-in WSGI server that decodes with the PyBadge's own message classes
+and adds a fixed per-request cost like the ESP32's SPI socket
+
+Run from the repository root with ``python3 benchmarks/bench_batching.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "pybadge"))
+
+# pylint: disable=wrong-import-position
+from message_queue import MessageQueue, MessageRecord
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.record_codec import RECORD_CONTENT_TYPE
+from shared.capabilities import Capabilities, encode_capabilities
+
+REQUEST_OVERHEAD = 0.02
+MESSAGES = 200
+BATCH_SIZES = (1, 5, 10, 20)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def _badge_app(message_queue: MessageQueue):
+    def app(environ, start_response):
+        time.sleep(REQUEST_OVERHEAD)
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = io.StringIO(environ["wsgi.input"].read(length).decode())
+        path = environ["PATH_INFO"]
+        reply = b""
+        if path == "/capabilities":
+            reply = encode_capabilities(
+                {Capabilities.RECORDS: None, Capabilities.BATCH: None}
+            ).encode()
+        elif path == "/messages":
+            for record in MessageRecord.iter_from_records(body):
+                message_queue.push(record)
+        elif path == "/message":
+            record = MessageRecord()
+            if environ.get("CONTENT_TYPE", "").startswith(RECORD_CONTENT_TYPE):
+                record.from_record(body)
+            else:
+                record.from_json(body)
+            message_queue.push(record)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [reply]
+
+    return app
+
+
+async def _deliver(host: str, batch_size: int) -> float:
+    client = BadgeClient(host, use_records=True)
+    messages = [
+        RPiDiscordMessage("cheer number {}".format(index), "moonbeam#0001", 2)
+        for index in range(MESSAGES)
+    ]
+    start = time.perf_counter()
+    for index in range(0, MESSAGES, batch_size):
+        batch = messages[index : index + batch_size]
+        if batch_size == 1:
+            results = [await client.send_message(batch[0])]
+        else:
+            results = await client.send_batch(batch)
+        assert all(result.ok for result in results)
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return elapsed
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table of results"""
+
+    message_queue = MessageQueue(MESSAGES)
+    server = make_server(
+        "127.0.0.1", 0, _badge_app(message_queue), handler_class=_QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = "127.0.0.1:{}".format(server.server_port)
+
+    print("{:>6} {:>10} {:>10}".format("batch", "seconds", "msg/s"))
+    for batch_size in BATCH_SIZES:
+        received = message_queue.received
+        elapsed = asyncio.run(_deliver(host, batch_size))
+        assert message_queue.received - received == MESSAGES
+        print(
+            "{:>6} {:>10.2f} {:>10.1f}".format(batch_size, elapsed, MESSAGES / elapsed)
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+`bench_bitmap`
+====================================================
+
+Compares the work the DisBadge does between receiving a message and
+displaying it, when the message is sent as text and laid out with
+labels, against when it is rendered by the Raspberry Pi and sent as a
+1-bit bitmap.  The label path is stood in for by decoding the record,
+wrapping the message, and drawing each glyph of the BDF fonts; the
+bitmap path decodes the record and bitmap and copies the pixels, as
+``bitmaptools.readinto`` would.  Times are measured under CPython, so
+only the relative cost of each path is meaningful.
+
+Run from the repository root with ``python3 benchmarks/bench_bitmap.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import io
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from shared import layout
+from shared.bitmap_codec import read_bitmap
+from shared.record_codec import read_record
+from raspberrypi import render
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from corpus import build_corpus, KINDS
+
+
+def _time(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main() -> None:
+    """Runs the comparison and prints a table of results by message kind"""
+
+    wrapper = layout.PixelWrapper(
+        layout.GlyphWidths.from_bdf(render.MESSAGE_FONTNAME), cache_size=0
+    )
+    # The DisBadge loads its fonts once, so leave that out of the timing
+    title_font = render.BDFFont.from_file(render.TITLE_FONTNAME)
+    message_font = render.BDFFont.from_file(render.MESSAGE_FONTNAME)
+
+    def label_path(body: str) -> None:
+        message, user = read_record(io.StringIO(body))[:2]
+        lines = wrapper.wrap(message, layout.MESSAGE_WIDTH, layout.MESSAGE_MAX_LINES)
+        canvas = render.BitmapCanvas(render.SCREEN_WIDTH, render.SCREEN_HEIGHT)
+        canvas.draw_text(title_font, user[:-5], 0, render.USERNAME_Y)
+        canvas.draw_text(message_font, "\n".join(lines), 0, render.MESSAGE_Y)
+
+    def bitmap_path(body: str) -> None:
+        stream = io.StringIO(body)
+        read_record(stream)
+        bytearray(read_bitmap(stream)[2])
+
+    corpus = build_corpus()
+    print(
+        "{:>9} {:>5} {:>10} {:>10} {:>10} {:>10} {:>8}".format(
+            "kind", "count", "text B", "bitmap B", "label us", "bitmap us", "speedup"
+        )
+    )
+    for kind in KINDS:
+        messages = [
+            RPiDiscordMessage(*entry[1:]) for entry in corpus if entry[0] == kind
+        ]
+        text_bodies = [message.to_bytes().decode() for message in messages]
+        bitmap_bodies = [message.to_bitmap_body().decode() for message in messages]
+
+        label_time = _time(
+            lambda bodies=text_bodies: [label_path(body) for body in bodies], 5
+        ) / len(messages)
+        bitmap_time = _time(
+            lambda bodies=bitmap_bodies: [bitmap_path(body) for body in bodies], 5
+        ) / len(messages)
+        print(
+            "{:>9} {:>5} {:>10} {:>10} {:>10.1f} {:>10.1f} {:>7.1f}x".format(
+                kind,
+                len(messages),
+                sum(len(body) for body in text_bodies),
+                sum(len(body) for body in bitmap_bodies),
+                label_time * 1e6,
+                bitmap_time * 1e6,
+                label_time / bitmap_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
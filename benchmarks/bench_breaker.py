@@ -0,0 +1,86 @@
+"""
+`bench_breaker`
+====================================================
+
+Sends messages to a local stand-in DisBadge that has stopped answering,
+with and without a circuit breaker, then brings it back and measures
+how long the breaker takes to notice
+
+Run from the repository root with ``python3 benchmarks/bench_breaker.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.health import CircuitBreaker, CircuitStates
+from raspberrypi.rpi_messages import RPiDiscordMessage
+
+MESSAGES = 10
+TIMEOUT = 0.5
+PROBE_INTERVAL = 0.2
+HUNG_LATENCY = 60.0
+
+
+async def _send_all(client: BadgeClient) -> float:
+    start = time.perf_counter()
+    for index in range(MESSAGES):
+        message = RPiDiscordMessage("Message {}".format(index), "Tekktrik#0458", 2)
+        await client.send_message(message)
+    return time.perf_counter() - start
+
+
+async def _run() -> None:
+    badge = FakeBadge(HUNG_LATENCY)
+    host = badge.start_in_thread()
+
+    client = BadgeClient(host, timeout=TIMEOUT)
+    without_breaker = await _send_all(client)
+    await client.close()
+
+    client = BadgeClient(host, timeout=TIMEOUT)
+    breaker = CircuitBreaker(
+        client, probe_interval=PROBE_INTERVAL, probe_timeout=PROBE_INTERVAL
+    )
+    breaker.start()
+    with_breaker = await _send_all(client)
+
+    badge.latency = 0.0
+    start = time.perf_counter()
+    while breaker.state != CircuitStates.CLOSED:
+        await asyncio.sleep(0.01)
+    recovery = time.perf_counter() - start
+    await breaker.stop()
+    await client.close()
+
+    print("{} messages to an unresponsive DisBadge:".format(MESSAGES))
+    print("  without breaker {:>8.2f} s".format(without_breaker))
+    print("  with breaker    {:>8.2f} s".format(with_breaker))
+    print("Circuit closed {:.2f} s after the DisBadge came back".format(recovery))
+    print(
+        "Opened {} time(s), closed {} time(s), {} of {} probes failed".format(
+            breaker.transitions[CircuitStates.OPEN],
+            breaker.transitions[CircuitStates.CLOSED],
+            breaker.probe_failures,
+            breaker.probes,
+        )
+    )
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+`bench_delivery`
+====================================================
+
+Fires many slash commands at once at a local stand-in DisBadge, comparing
+a blocking POST made inside the command handler with background delivery
+from an in-memory `raspberrypi.outbox.OutboxDispatcher`.  Reports how long the
+handlers take, how long the event loop is stalled for, and the delivery
+latency.
+
+Run from the repository root with ``python3 benchmarks/bench_delivery.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.outbox import OutboxDispatcher
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.messages import CommandType
+
+COMMANDS = 50
+BADGE_LATENCY = 0.01
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _watch_stalls(stop: asyncio.Event, stalls: list) -> None:
+    """Measures how late a 1 ms heartbeat wakes up, as a proxy for how long
+    the event loop is blocked"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start - 0.001)
+
+
+async def _run(mode: str, host: str) -> None:
+    message = RPiDiscordMessage("GG, that was a great round!", "moonbeam#0001", 2)
+    stop = asyncio.Event()
+    stalls = []
+    watcher = asyncio.create_task(_watch_stalls(stop, stalls))
+    await asyncio.sleep(0.01)
+
+    handler_times = []
+    latencies = []
+    client = BadgeClient(host)
+    client.result_callbacks.append(lambda result: latencies.append(result.latency))
+    dispatcher = OutboxDispatcher(":memory:", [client])
+    await dispatcher.start()
+
+    async def blocking_handler():
+        start = time.perf_counter()
+        body = message.to_form_body()
+        with urllib.request.urlopen(
+            "http://{}/message".format(host), body, timeout=5
+        ) as response:
+            response.read()
+        handler_times.append(time.perf_counter() - start)
+        latencies.append(time.perf_counter() - start)
+
+    async def outbox_handler():
+        start = time.perf_counter()
+        dispatcher.add(message)
+        handler_times.append(time.perf_counter() - start)
+
+    handler = blocking_handler if mode == "blocking" else outbox_handler
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(COMMANDS)))
+    while dispatcher.outbox.depth():
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    await dispatcher.stop()
+
+    print(
+        "{:>9} {:>14.2f} {:>14.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+            mode,
+            max(handler_times) * 1e3,
+            max(stalls) * 1e3,
+            _percentile(latencies, 0.5) * 1e3,
+            _percentile(latencies, 0.95) * 1e3,
+            COMMANDS / elapsed,
+        )
+    )
+
+
+async def main() -> None:
+    """Runs the benchmark and prints a table of results"""
+
+    fake_badge = FakeBadge(latency=BADGE_LATENCY)
+    host = fake_badge.start_in_thread()
+    with urllib.request.urlopen(
+        "http://{}/activate".format(host), b"", timeout=5
+    ) as response:
+        response.read()
+
+    print(
+        "{:>9} {:>14} {:>14} {:>10} {:>10} {:>10}".format(
+            "mode", "handler ms", "loop stall ms", "p50 ms", "p95 ms", "msg/s"
+        )
+    )
+    await _run("blocking", host)
+    await _run("outbox", host)
+    assert len(fake_badge.messages) == 2 * COMMANDS
+    assert fake_badge.messages[-1][2] == CommandType.CHEER
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+`bench_fanout`
+====================================================
+
+Delivers messages to several local stand-in DisBadges at once, one of
+which never answers, and compares the time until every healthy DisBadge
+has each message with the latency of the slowest healthy DisBadge
+
+Run from the repository root with ``python3 benchmarks/bench_fanout.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.outbox import OutboxDispatcher
+from raspberrypi.rpi_messages import RPiDiscordMessage
+
+MESSAGES = 20
+SPACING = 0.1
+HEALTHY_LATENCIES = (0.01, 0.02, 0.05)
+DEAD_LATENCY = 60.0
+
+
+async def _run(path: str) -> None:
+    healthy = [FakeBadge(latency) for latency in HEALTHY_LATENCIES]
+    dead = FakeBadge(DEAD_LATENCY)
+    clients = [BadgeClient(badge.start_in_thread(), timeout=1) for badge in healthy]
+    clients.append(BadgeClient(dead.start_in_thread(), timeout=1))
+    healthy_hosts = {client.host for client in clients[:-1]}
+
+    sent_at = {}
+    delivered = {}
+    fanout_latencies = []
+
+    def on_result(host):
+        def callback(result):
+            if not result.ok or host not in healthy_hosts:
+                return
+            key = id(result.message)
+            delivered[key] = delivered.get(key, 0) + 1
+            if delivered[key] == len(healthy_hosts):
+                fanout_latencies.append(time.perf_counter() - sent_at[key])
+
+        return callback
+
+    for client in clients:
+        client.result_callbacks.append(on_result(client.host))
+
+    dispatcher = OutboxDispatcher(path, clients)
+    await dispatcher.start()
+    for index in range(MESSAGES):
+        message = RPiDiscordMessage("hype #{}".format(index), "moonbeam#0001", 3)
+        sent_at[id(message)] = time.perf_counter()
+        dispatcher.add(message)
+        await asyncio.sleep(SPACING)
+    while len(fanout_latencies) < MESSAGES:
+        await asyncio.sleep(0.01)
+    await dispatcher.stop()
+
+    ordered = sorted(fanout_latencies)
+    print("healthy badge latencies: {} ms".format([x * 1e3 for x in HEALTHY_LATENCIES]))
+    print(
+        "fan-out p50 {:.1f} ms, max {:.1f} ms (slowest healthy {:.0f} ms, sum {:.0f} ms)".format(
+            ordered[len(ordered) // 2] * 1e3,
+            ordered[-1] * 1e3,
+            max(HEALTHY_LATENCIES) * 1e3,
+            sum(HEALTHY_LATENCIES) * 1e3,
+        )
+    )
+    for badge in healthy:
+        assert [entry[0] for entry in badge.messages] == [
+            "hype #{}".format(index) for index in range(MESSAGES)
+        ]
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        asyncio.run(_run(os.path.join(tmpdir, "outbox.db")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+`bench_ingest`
+====================================================
+
+Replays the message corpus through the whole path a message takes from
+the Raspberry Pi to the DisBadge's screen when sent as form data, and
+reports the time and peak memory of each stage:
+
+* ``to_dict``: `RPiDiscordMessage.to_dict`, which URI encodes the fields
+  with ``encode_dictionary``
+* ``form``: joining the encoded fields into the request body
+* ``decode``: decoding the request body with ``iter_decode_payload``, as
+  the DisBadge does in place of ``decode_payload``
+* ``from_json``: ``DiscordMessageGroup.from_json`` on the DisBadge,
+  which decodes the body, wraps the message and lays out the labels
+* ``wrap``: wrapping the message to the screen on its own
+
+The DisBadge's display libraries are replaced with the simulator's fakes,
+and its wrapping cache is disabled so every message is wrapped.  Times
+are measured under CPython, so compare them against a baseline from the
+same machine.  The results are compared against the stored baseline in
+``baseline_ingest.json``, and the benchmark fails if any stage is slower
+or uses more memory than the baseline allows.
+
+Run from the repository root with ``python3 benchmarks/bench_ingest.py``,
+adding ``--update-baseline`` to store the results as the new baseline
+
+* Author(s): Alec Delaney
+
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+from urllib.parse import urlencode
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCHMARKS, "..")
+PYBADGE = os.path.join(ROOT, "pybadge")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, PYBADGE)
+
+# pylint: disable=wrong-import-position
+from shared import layout
+from shared.uri_codec import iter_decode_payload
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from simulator import install_fake_modules
+from corpus import build_corpus
+
+BASELINE_PATH = os.path.join(BENCHMARKS, "baseline_ingest.json")
+
+STAGES = ("to_dict", "form", "decode", "from_json", "wrap")
+
+
+def _load_message_group():
+    install_fake_modules()
+    working_directory = os.getcwd()
+    # The DisBadge loads its fonts relative to the CIRCUITPY drive
+    os.chdir(PYBADGE)
+    try:
+        # pylint: disable=import-outside-toplevel
+        import assets
+        import pybadge_messages
+
+        # Load the fonts up front, as the DisBadge does while booting
+        assets.load_font(pybadge_messages.TITLE_FONTNAME)
+        assets.load_font(pybadge_messages.MESSAGE_FONTNAME)
+    finally:
+        os.chdir(working_directory)
+    pybadge_messages.MESSAGE_WRAPPER = layout.PixelWrapper(
+        layout.GlyphWidths.from_bdf(
+            os.path.join(PYBADGE, pybadge_messages.MESSAGE_FONTNAME)
+        ),
+        cache_size=0,
+    )
+    return pybadge_messages
+
+
+def _stage_functions(corpus, pybadge_messages):
+    messages = [entry[1:] for entry in corpus]
+    dicts = [RPiDiscordMessage(*message).to_dict() for message in messages]
+    bodies = [urlencode(fields) for fields in dicts]
+    wrapper = pybadge_messages.MESSAGE_WRAPPER
+    group = pybadge_messages.DiscordMessageGroup()
+
+    def to_dict():
+        for message in messages:
+            RPiDiscordMessage(*message).to_dict()
+
+    def form():
+        for fields in dicts:
+            urlencode(fields)
+
+    def decode():
+        for body in bodies:
+            dict(iter_decode_payload(io.StringIO(body)))
+
+    def from_json():
+        for body in bodies:
+            group.from_json(io.StringIO(body))
+
+    def wrap():
+        for message in messages:
+            wrapper.wrap(message[0], pybadge_messages.MESSAGE_WIDTH, group.max_lines)
+
+    return {
+        "to_dict": to_dict,
+        "form": form,
+        "decode": decode,
+        "from_json": from_json,
+        "wrap": wrap,
+    }
+
+
+def _measure(func, count: int):
+    timer = timeit.Timer(func)
+    # Run each stage for long enough that timer noise doesn't matter
+    number = max(1, timer.autorange()[0] // 2)
+    # The median is steadier than the minimum on a busy machine
+    seconds = statistics.median(timer.repeat(number=number, repeat=5))
+    seconds = seconds / number / count
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak - start
+
+
+def main() -> None:
+    """Runs the benchmark, prints a table of results, and exits with an
+    error if any stage has regressed past the baseline"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--update-baseline",
+        help="Store the results as the new baseline",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--tolerance",
+        help="How much slower or bigger a stage can be than the baseline, "
+        "as a fraction",
+        type=float,
+        default=0.5,
+    )
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    stage_functions = _stage_functions(corpus, _load_message_group())
+    results = {stage: _measure(stage_functions[stage], len(corpus)) for stage in STAGES}
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print(
+        "{:>10} {:>10} {:>10} {:>10} {:>10} {:>6}".format(
+            "stage", "us/msg", "peak B", "base us", "base B", ""
+        )
+    )
+    regressions = []
+    for stage in STAGES:
+        micros, peak = results[stage]
+        base_micros, base_peak = baseline.get(stage, (None, None))
+        status = "new"
+        if base_micros is not None:
+            status = "ok"
+            if micros > base_micros * (1 + args.tolerance):
+                status = "SLOW"
+            elif peak > base_peak * (1 + args.tolerance):
+                status = "BIG"
+            if status != "ok":
+                regressions.append(stage)
+        print(
+            "{:>10} {:>10.2f} {:>10} {:>10} {:>10} {:>6}".format(
+                stage,
+                micros,
+                peak,
+                "-" if base_micros is None else "{:.2f}".format(base_micros),
+                "-" if base_peak is None else base_peak,
+                status,
+            )
+        )
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as baseline_file:
+            json.dump(
+                {
+                    stage: [round(micros, 2), peak]
+                    for stage, (micros, peak) in results.items()
+                },
+                baseline_file,
+                indent=4,
+            )
+            baseline_file.write("\n")
+        print("Stored the results as the new baseline")
+    elif regressions:
+        print("Regressed past the baseline: {}".format(", ".join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+`bench_layout`
+====================================================
+
+Compares the previous word wrapping function against `shared.layout`
+for short and long messages under CPython
+
+Run from the repository root with ``python3 benchmarks/bench_layout.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from shared import layout
+
+MESSAGE_FONT_PATH = os.path.join(ROOT, "pybadge", "fonts", "cherry-11-r.bdf")
+MAX_LINES = 5
+SAMPLE = "That last round was absolutely insane, how did you even pull that off? "
+
+
+def _legacy_wrap_text(string: str, max_chars: int):
+    string = string.replace("\n", "").replace("\r", "")
+    words = string.split(" ")
+    the_lines = []
+    the_line = ""
+    for word in words:
+        if len(the_line + " " + word) <= max_chars:
+            the_line += " " + word
+        else:
+            the_lines.append(the_line)
+            the_line = "" + word
+    if the_line:
+        the_lines.append(the_line)
+    the_lines[0] = the_lines[0][1:]
+    return the_lines
+
+
+def _time(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table of results"""
+
+    glyph_widths = layout.GlyphWidths.from_bdf(MESSAGE_FONT_PATH)
+    print(
+        "{:>6} {:>12} {:>12} {:>12} {:>12}".format(
+            "chars", "old us", "chars us", "pixels us", "cached us"
+        )
+    )
+    for length in (20, 100, 500, 2000, 4000):
+        text = (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+        number = max(10, 20000 // length)
+
+        old = _time(lambda: _legacy_wrap_text(text, 26)[:MAX_LINES], number)
+        chars = _time(lambda: layout.wrap_text(text, 26, MAX_LINES), number)
+        pixels = _time(
+            lambda: layout.PixelWrapper(glyph_widths, 0).wrap(text, 160, MAX_LINES),
+            number,
+        )
+        wrapper = layout.PixelWrapper(glyph_widths)
+        wrapper.wrap(text, 160, MAX_LINES)
+        cached = _time(lambda: wrapper.wrap(text, 160, MAX_LINES), number)
+        print(
+            "{:>6} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+                length, old * 1e6, chars * 1e6, pixels * 1e6, cached * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+`bench_load`
+====================================================
+
+Load generator for the bot link.  Slash commands are fed straight into a
+`raspberrypi.pipeline.MessagePipeline` at a steady rate, without Discord,
+and delivered to a local stand-in DisBadge that handles one connection at
+a time like the ESP32, with configurable latency, jitter and drops.
+Reports how many messages were admitted and delivered, the delivered
+throughput, and the latency from the slash command until each DisBadge
+accepted the message.
+
+Run from the repository root with ``python3 benchmarks/bench_load.py``,
+or point it at a running DisBadge or ``raspberrypi.fake_badge`` with
+``--badge``
+
+* Author(s): Alec Delaney
+
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from raspberrypi.admission import AdmissionStates
+from raspberrypi.delivery import BadgeClient, DeliveryResult
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.pipeline import MessagePipeline
+from raspberrypi.tracing import LatencyHistogram
+from corpus import build_corpus
+
+UNLIMITED = 1e9
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--rate", help="Slash commands per second", type=float, default=5
+    )
+    parser.add_argument(
+        "--duration", help="How long to send for, in seconds", type=float, default=10
+    )
+    parser.add_argument(
+        "--users", help="The number of users sending", type=int, default=20
+    )
+    parser.add_argument(
+        "--badge",
+        help="Send to a DisBadge at this address instead of a local stand-in",
+    )
+    parser.add_argument(
+        "--latency",
+        help="How long the stand-in takes to handle each request, in seconds",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument(
+        "--jitter",
+        help="The most extra time the stand-in takes at random, in seconds",
+        type=float,
+        default=0.02,
+    )
+    parser.add_argument(
+        "--drop-rate",
+        help="The fraction of requests the stand-in drops",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--max-connections",
+        help="The number of requests the stand-in handles at once, 0 for no limit",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--compact", help="Send messages as compact records", action="store_true"
+    )
+    parser.add_argument(
+        "--coalesce",
+        help="Merge messages from the same user sent within this many seconds",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--user-rate",
+        help="The number of messages per minute each user can send, "
+        "default is no limit",
+        type=float,
+    )
+    parser.add_argument(
+        "--global-rate",
+        help="The number of messages per minute that can be sent in total, "
+        "default is no limit",
+        type=float,
+    )
+    parser.add_argument(
+        "--drain",
+        help="The longest to wait for delivery after sending, in seconds",
+        type=float,
+        default=30,
+    )
+    parser.add_argument("--seed", help="The random seed", type=int, default=2022)
+    return parser.parse_args()
+
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class LoadResults:
+    """Tallies the outcome of every slash command and delivery"""
+
+    def __init__(self) -> None:
+
+        self.outcomes = {
+            AdmissionStates.ADMITTED: 0,
+            AdmissionStates.USER_LIMITED: 0,
+            AdmissionStates.GLOBAL_LIMITED: 0,
+            AdmissionStates.BACKLOGGED: 0,
+        }
+        self.merged = 0
+        self.delivered = 0
+        self.failed = 0
+        self.latencies = LatencyHistogram(max_samples=1000000)
+        self.started = time.monotonic()
+        self.last_delivery = self.started
+        self._seen = set()
+
+    def record_result(self, host: str, result: DeliveryResult) -> None:
+        """Records the outcome of a delivery attempt
+
+        :param str host: The DisBadge the message was delivered to
+        :param DeliveryResult result: The outcome of the delivery
+        """
+
+        if not result.ok:
+            self.failed += 1
+            return
+        key = (host, result.message.trace_id)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.last_delivery = time.monotonic()
+        self.delivered += 1
+        self.latencies.add((self.last_delivery - result.message.created) * 1000)
+
+
+async def _send(pipeline: MessagePipeline, results: LoadResults, args) -> None:
+    rng = random.Random(args.seed)
+    users = ["loadtest{:03d}#0001".format(index) for index in range(args.users)]
+    corpus = itertools.cycle(build_corpus(seed=args.seed))
+    interval = 1 / args.rate
+    count = int(args.duration * args.rate)
+    start = time.monotonic()
+    for index in range(count):
+        # Keep to the schedule, rather than waiting after each command
+        delay = start + index * interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        _, message, _, cmd_type = next(corpus)
+        outcome = pipeline.submit(message, rng.choice(users), cmd_type)
+        results.outcomes[outcome] += 1
+
+
+def _settled(pipeline: MessagePipeline) -> bool:
+    outbox = pipeline.dispatcher.outbox
+    return not pipeline.coalescer.pending and all(
+        outbox.depth(consumer) == 0 for consumer in outbox.consumers
+    )
+
+
+async def _run(args, host: str, outbox_path: str) -> LoadResults:
+    client = BadgeClient(host, use_records=args.compact)
+    pipeline = MessagePipeline(
+        [client],
+        outbox_path,
+        coalesce=args.coalesce,
+        user_rate=UNLIMITED if args.user_rate is None else args.user_rate / 60,
+        user_burst=UNLIMITED if args.user_rate is None else 3,
+        global_rate=UNLIMITED if args.global_rate is None else args.global_rate / 60,
+        global_burst=UNLIMITED if args.global_rate is None else 10,
+        trace=True,
+    )
+    results = LoadResults()
+    client.result_callbacks.append(
+        lambda result: results.record_result(client.host, result)
+    )
+    await client.activate()
+    await pipeline.start()
+    results.started = time.monotonic()
+    await _send(pipeline, results, args)
+    pipeline.coalescer.flush()
+    deadline = time.monotonic() + args.drain
+    while not _settled(pipeline) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    await pipeline.stop()
+    results.merged = pipeline.coalescer.received - pipeline.coalescer.delivered
+    return results
+
+
+def main() -> None:
+    """Runs the load and prints the results"""
+
+    args = _parse_args()
+    fake_badge = None
+    host = args.badge
+    if host is None:
+        fake_badge = FakeBadge(
+            args.latency,
+            args.jitter,
+            args.drop_rate,
+            args.max_connections,
+            args.seed,
+        )
+        host = fake_badge.start_in_thread()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = asyncio.run(_run(args, host, os.path.join(tmpdir, "outbox.db")))
+
+    outcomes = results.outcomes
+    submitted = sum(outcomes.values())
+    elapsed = max(1e-9, results.last_delivery - results.started)
+    p50, p95, p99, worst = results.latencies.percentiles(50, 95, 99, 100)
+    print(
+        "{} commands at {:.1f}/s: {} admitted, {} user limited, "
+        "{} globally limited, {} refused while the backlog was full".format(
+            submitted,
+            args.rate,
+            outcomes[AdmissionStates.ADMITTED],
+            outcomes[AdmissionStates.USER_LIMITED],
+            outcomes[AdmissionStates.GLOBAL_LIMITED],
+            outcomes[AdmissionStates.BACKLOGGED],
+        )
+    )
+    print("{} merged by coalescing".format(results.merged))
+    print(
+        "{} delivered in {:.2f} s ({:.1f} msg/s), {} failed attempts".format(
+            results.delivered, elapsed, results.delivered / elapsed, results.failed
+        )
+    )
+    print(
+        "latency: p50 {:.0f} ms, p95 {:.0f} ms, p99 {:.0f} ms, max {:.0f} ms".format(
+            p50, p95, p99, worst
+        )
+    )
+    if fake_badge is not None:
+        print(
+            "stand-in: {} requests, {} dropped".format(
+                fake_badge.requests, fake_badge.dropped
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+`bench_outbox`
+====================================================
+
+Measures the cost of writing a burst of messages to the outbox with
+batched writes against one transaction per message, then drains the
+outbox into a local stand-in DisBadge after it comes back online
+
+Run from the repository root with ``python3 benchmarks/bench_outbox.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.outbox import Outbox, OutboxDispatcher
+from raspberrypi.rpi_messages import RPiDiscordMessage
+
+BURST = 500
+
+
+def _message(index: int) -> RPiDiscordMessage:
+    return RPiDiscordMessage("cheer number {}".format(index), "moonbeam#0001", 2)
+
+
+def _burst(path: str, batched: bool) -> float:
+    outbox = Outbox(path)
+    start = time.perf_counter()
+    for index in range(BURST):
+        outbox.add(_message(index))
+        if not batched:
+            outbox.flush()
+    outbox.flush()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:>10}: {} messages in {:.1f} ms with {} transactions".format(
+            "batched" if batched else "unbatched",
+            BURST,
+            elapsed * 1e3,
+            outbox.flushes,
+        )
+    )
+    outbox.close()
+    return elapsed
+
+
+async def _drain(path: str) -> None:
+    fake_badge = FakeBadge(latency=0.002)
+    dispatcher = OutboxDispatcher(path, [BadgeClient(fake_badge.start_in_thread())])
+    outbox = dispatcher.outbox
+    start = time.perf_counter()
+    await dispatcher.start()
+    while outbox.depth():
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    await dispatcher.stop()
+    print(
+        "{:>10}: {} messages in {:.2f} s ({:.0f} msg/s), recent drain rate {:.0f} msg/s".format(
+            "drain",
+            outbox.delivered,
+            elapsed,
+            outbox.delivered / elapsed,
+            outbox.drain_rate,
+        )
+    )
+    assert [entry[0] for entry in fake_badge.messages] == [
+        _message(index).message for index in range(BURST)
+    ]
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results"""
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _burst(os.path.join(tmpdir, "unbatched.db"), batched=False)
+        path = os.path.join(tmpdir, "batched.db")
+        _burst(path, batched=True)
+        asyncio.run(_drain(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+`bench_scheduler`
+====================================================
+
+Runs the PyBadge main loop scheduler under CPython with stand-in tasks
+that take about as long as their hardware counterparts, and reports the
+per-task worst-case latency and the loop overhead
+
+Run from the repository root with ``python3 benchmarks/bench_scheduler.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "pybadge"))
+
+# pylint: disable=wrong-import-position
+from scheduler import Scheduler
+
+DURATION = 3.0
+
+# Task name, interval, and approximate cost in seconds
+TASKS = (
+    ("network", 0.01, 0.002),
+    ("leds", 0.02, 0.001),
+    ("inputs", 0.05, 0.0002),
+    ("display", 0.1, 0.004),
+)
+
+
+def _busy(seconds: float):
+    def task():
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    return task
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table of results"""
+
+    scheduler = Scheduler(monotonic=time.perf_counter)
+    for name, interval, cost in TASKS:
+        scheduler.add_task(name, _busy(cost), interval)
+
+    sleeping = 0.0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        wait = scheduler.run_once()
+        if wait:
+            sleeping += wait
+            time.sleep(wait)
+    elapsed = time.perf_counter() - start
+
+    print(
+        "{:>8} {:>9} {:>6} {:>10} {:>16} {:>16}".format(
+            "task", "interval", "runs", "rate Hz", "worst late ms", "worst run ms"
+        )
+    )
+    for name, interval, _ in TASKS:
+        runs, latency, duration = scheduler.task_stats()[name]
+        print(
+            "{:>8} {:>9.3f} {:>6} {:>10.1f} {:>16.2f} {:>16.2f}".format(
+                name, interval, runs, runs / elapsed, latency * 1e3, duration * 1e3
+            )
+        )
+    print(
+        "{} passes in {:.2f} s, {:.0f}% of the time spent sleeping".format(
+            scheduler.passes, elapsed, 100 * sleeping / elapsed
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
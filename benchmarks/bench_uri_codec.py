@@ -0,0 +1,106 @@
+"""
+`bench_uri_codec`
+====================================================
+
+Compares the previous character-by-character URI codec against the
+current implementation in `shared.uri_codec` under CPython
+
+Run from the repository root with ``python3 benchmarks/bench_uri_codec.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import gc
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from shared import uri_codec
+
+LENGTHS = (10, 100, 500, 1000, 2000, 4000)
+SAMPLE = "Let's GOOOO! GG wp, that clutch was insane :D #1 héros ★ "
+
+
+def _legacy_encode_characters(original: str) -> str:
+    payload = ""
+    for char in original:
+        if not re.match("^[a-zA-Z0-9]+$", char):
+            char = "".join(["-", str(ord(char)), "-"])
+        payload += char
+    gc.collect()
+    return payload
+
+
+def _legacy_decode_characters(payload: str) -> str:
+    translation = ""
+    payload_iter = iter(payload)
+    for char in payload_iter:
+        if char == "-":
+            sub_seq = char
+            while True:
+                next_char = next(payload_iter)
+                sub_seq += next_char
+                if next_char == "-":
+                    break
+            char = chr(int(sub_seq[1:-1]))
+        translation += char
+    gc.collect()
+    return translation
+
+
+def _time(func, arg, number: int) -> float:
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=3)) / number
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table of results"""
+
+    print(
+        "{:>6} {:>12} {:>12} {:>8} {:>12} {:>12} {:>8} {:>12}".format(
+            "chars",
+            "old enc us",
+            "new enc us",
+            "speedup",
+            "old dec us",
+            "new dec us",
+            "speedup",
+            "bytes dec us",
+        )
+    )
+    for length in LENGTHS:
+        text = (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+        encoded = uri_codec.encode_characters(text)
+        encoded_bytes = encoded.encode()
+
+        assert encoded == _legacy_encode_characters(text)
+        assert uri_codec.decode_characters(encoded) == text
+        assert uri_codec.encode_bytes(text.encode()) == encoded_bytes
+        assert uri_codec.decode_bytes(encoded_bytes) == text.encode()
+
+        number = max(1, 2000 // length)
+        old_enc = _time(_legacy_encode_characters, text, number)
+        new_enc = _time(uri_codec.encode_characters, text, number)
+        old_dec = _time(_legacy_decode_characters, encoded, number)
+        new_dec = _time(uri_codec.decode_characters, encoded, number)
+        bytes_dec = _time(uri_codec.decode_bytes, encoded_bytes, number)
+        print(
+            "{:>6} {:>12.1f} {:>12.1f} {:>7.1f}x {:>12.1f} {:>12.1f} {:>7.1f}x {:>12.1f}".format(
+                length,
+                old_enc * 1e6,
+                new_enc * 1e6,
+                old_enc / new_enc,
+                old_dec * 1e6,
+                new_dec * 1e6,
+                old_dec / new_dec,
+                bytes_dec * 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
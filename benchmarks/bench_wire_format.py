@@ -0,0 +1,94 @@
+"""
+`bench_wire_format`
+====================================================
+
+Compares the size and decode time of the URI encoded form payload and
+the compact record format over the message corpus, and the size of
+records that are wrapped by the Raspberry Pi before sending
+
+Run from the repository root with ``python3 benchmarks/bench_wire_format.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import io
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from shared.uri_codec import encode_dictionary, iter_decode_payload
+from shared.record_codec import encode_record, read_record
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from corpus import build_corpus, KINDS
+
+REPEATS = 20
+
+
+def _form_body(message: str, user: str, cmd_type: int) -> bytes:
+    return urlencode(
+        encode_dictionary({"message": message, "user": user, "cmdtype": str(cmd_type)})
+    ).encode()
+
+
+def main() -> None:
+    """Runs the comparison and prints a table of results by message kind"""
+
+    corpus = build_corpus()
+    print(
+        "{:>9} {:>5} {:>10} {:>10} {:>7} {:>12} {:>12} {:>10}".format(
+            "kind",
+            "count",
+            "form B",
+            "record B",
+            "ratio",
+            "form dec us",
+            "rec dec us",
+            "wrapped B",
+        )
+    )
+    for kind in KINDS:
+        entries = [entry[1:] for entry in corpus if entry[0] == kind]
+        form_bodies = [_form_body(*entry).decode() for entry in entries]
+        record_bodies = [encode_record(*entry).decode() for entry in entries]
+        for entry, body in zip(entries, record_bodies):
+            assert read_record(io.StringIO(body))[:3] == entry
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            for body in form_bodies:
+                for _pair in iter_decode_payload(io.StringIO(body)):
+                    pass
+        form_time = (time.perf_counter() - start) / (REPEATS * len(entries))
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            for body in record_bodies:
+                read_record(io.StringIO(body))
+        record_time = (time.perf_counter() - start) / (REPEATS * len(entries))
+
+        form_size = sum(len(body.encode()) for body in form_bodies)
+        record_size = sum(len(body.encode()) for body in record_bodies)
+        wrapped_size = sum(
+            len(RPiDiscordMessage(*entry).to_bytes(prewrap=True)) for entry in entries
+        )
+        print(
+            "{:>9} {:>5} {:>10} {:>10} {:>6.2f}x {:>12.1f} {:>12.1f} {:>10}".format(
+                kind,
+                len(entries),
+                form_size,
+                record_size,
+                form_size / record_size,
+                form_time * 1e6,
+                record_time * 1e6,
+                wrapped_size,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+`corpus`
+====================================================
+
+A deterministic corpus of realistic Discord messages for the benchmarks
+
+* Author(s): Alec Delaney
+
+"""
+
+import random
+
+try:
+    from typing import List, Tuple
+except ImportError:
+    pass
+
+USERS = (
+    "Tekktrik#0458",
+    "xX_n00bslayer_Xx#1337",
+    "moonbeam#0001",
+    "Ärger Bär#4242",
+    "たけし#8080",
+)
+
+SHORT_CHEERS = (
+    "GG!",
+    "gl hf",
+    "LET'S GOOOOO",
+    "nice one :D",
+    "you got this!!",
+    "clutch",
+    "W",
+    "hype hype hype",
+)
+
+SENTENCES = (
+    "That last round was absolutely insane, how did you even pull that off?",
+    "Don't forget to stretch and drink some water, you've been live for 4 hours.",
+    "Chat says hi! We're all rooting for you in the finals tonight.",
+    "Reminder: the raffle closes at 9pm, so get your entries in soon.",
+    "Can you show the build again? I missed the part with the soldering.",
+)
+
+EMOJI = ("🎉", "🔥", "💯", "😂", "🚀", "👏", "❤️", "🙌")
+
+CJK = (
+    "頑張って！今日の配信も最高です。",
+    "加油！我们都在支持你。",
+    "화이팅! 오늘 방송 정말 재밌어요.",
+)
+
+
+def short_cheer(rng: random.Random) -> str:
+    """A short cheer, the most common kind of message"""
+    return rng.choice(SHORT_CHEERS)
+
+
+def sentence(rng: random.Random) -> str:
+    """A typical one or two sentence message"""
+    return " ".join(rng.sample(SENTENCES, rng.randint(1, 2)))
+
+
+def emoji_heavy(rng: random.Random) -> str:
+    """A message that is mostly emoji"""
+    return " ".join(
+        rng.choice(EMOJI) * rng.randint(1, 4) for _ in range(rng.randint(3, 10))
+    )
+
+
+def cjk(rng: random.Random) -> str:
+    """A message in Chinese, Japanese, or Korean"""
+    return rng.choice(CJK)
+
+
+def wall_of_text(rng: random.Random, length: int = 2000) -> str:
+    """A message at Discord's 2000 character limit"""
+    pieces = []
+    total = 0
+    while total < length:
+        piece = rng.choice(SENTENCES)
+        pieces.append(piece)
+        total += len(piece) + 1
+    return " ".join(pieces)[:length]
+
+
+KINDS = {
+    "short": short_cheer,
+    "sentence": sentence,
+    "emoji": emoji_heavy,
+    "cjk": cjk,
+    "wall": wall_of_text,
+}
+"""The kinds of messages in the corpus, by name"""
+
+
+def build_corpus(size: int = 200, seed: int = 2022) -> List[Tuple[str, str, str, int]]:
+    """Builds the corpus as a list of (kind, message, user, cmd_type)
+    tuples.  The mix is weighted towards short messages, as in a real
+    chat.
+
+    :param int size: (Optional) The number of messages, default is 200
+    :param int seed: (Optional) The random seed, default is 2022
+    """
+
+    rng = random.Random(seed)
+    weights = {"short": 10, "sentence": 6, "emoji": 3, "cjk": 2, "wall": 1}
+    kinds = [kind for kind, weight in weights.items() for _ in range(weight)]
+    corpus = []
+    for _ in range(size):
+        kind = rng.choice(kinds)
+        corpus.append((kind, KINDS[kind](rng), rng.choice(USERS), rng.randint(1, 3)))
+    return corpus
@@ -0,0 +1,33 @@
+"""
+`assets`
+====================================================
+
+Fonts loaded the first time they are used rather than when the DisBadge's
+modules are imported, so that the first splash screen only waits for
+the font it shows
+
+* Author(s): Alec Delaney
+
+"""
+
+from adafruit_bitmap_font import bitmap_font
+
+try:
+    from typing import Any
+except ImportError:
+    pass
+
+_fonts = {}
+
+
+def load_font(filename: str) -> Any:
+    """Loads a font, or gets it if it has already been loaded
+
+    :param str filename: The filename of the BDF font
+    :return: The font
+    """
+
+    font = _fonts.get(filename)
+    if font is None:
+        font = _fonts[filename] = bitmap_font.load_font(filename)
+    return font
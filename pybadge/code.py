@@ -8,19 +8,26 @@ Main sequence for Discord PyBadge
 
 """
 
-import time
-import board
-from digitalio import DigitalInOut
-from adafruit_esp32spi import adafruit_esp32spi
-import adafruit_esp32spi.adafruit_esp32spi_wifimanager as wifimanager
-import adafruit_esp32spi.adafruit_esp32spi_wsgiserver as server
-from states import LEDStateIDs
-from pybadge_messages import DiscordMessageGroup
-from disbadge import DiscordPyBadge, Buttons
-from shared.messages import CommandType
+# Imported first, so that the boot is timed from as early as possible
+import global_state
+from pybadge_messages import (
+    DiscordMessageGroup,
+    MESSAGE_FONTNAME,
+    TITLE_FONTNAME,
+    load_message_wrapper,
+)
+from message_queue import MessageRecord
+from disbadge import DiscordPyBadge
+from controller import MessageController
+from scheduler import Scheduler
+from shared.record_codec import FORM_CONTENT_TYPE, RECORD_CONTENT_TYPE
+from shared.bitmap_codec import BITMAP_CONTENT_TYPE
+from shared.capabilities import Capabilities, encode_capabilities
 from states import DisplayStateIDs
+from stats import StatIDs
+from startup import BootStages
 from adafruit_wsgi.wsgi_app import WSGIApp
-import global_state
+import assets
 from shared.secrets import secrets
 
 try:
@@ -32,37 +39,177 @@ except ImportError:
 MESSAGE_PIN_TIME = 10
 """How long messages should be displayed before being removed"""
 
-disbadge = DiscordPyBadge(external_speaker=True)
+MESSAGE_DWELL_TIME = 3
+"""How long a message is displayed before the next one can replace it, in
+seconds"""
+
+MESSAGE_GROUP = DiscordMessageGroup()
+"""The display group reused for every message shown"""
+
+# How often each part of the main loop runs, in seconds
+NETWORK_INTERVAL = 0.01
+LED_INTERVAL = 0.02
+INPUT_INTERVAL = 0.05
+DISPLAY_INTERVAL = 0.1
+BOOT_INTERVAL = 0.05
+
+CONNECT_TIMEOUT = 15
+"""How long to wait for Wi-Fi to connect before retrying, in seconds"""
+
+CAPABILITIES = {
+    Capabilities.RECORDS: None,
+    Capabilities.BATCH: None,
+    Capabilities.BITMAPS: None,
+    Capabilities.TRACES: None,
+    Capabilities.STATS: None,
+    Capabilities.QUEUE: global_state.HISTORY_SIZE,
+}
+"""The optional features reported to the Raspberry Pi"""
+
+# The WSGI server doesn't catch errors from routes, so a body that can't
+# be decoded is answered with an error status instead of being raised
+DECODE_ERRORS = (ValueError, RuntimeError, TypeError)
+
+hardware = global_state.HARDWARE
+network = hardware.network
+boot = global_state.BOOT
+
+disbadge = DiscordPyBadge(external_speaker=True, hardware=hardware)
 disbadge.set_splash(DisplayStateIDs.LOADING)
+boot.mark(BootStages.FIRST_PIXEL)
 
-# Set up ESP32
-esp32_cs = DigitalInOut(board.D13)
-esp32_ready = DigitalInOut(board.D11)
-esp32_reset = DigitalInOut(board.D12)
-esp32 = adafruit_esp32spi.ESP_SPIcontrol(
-    board.SPI(), esp32_cs, esp32_ready, esp32_reset
-)
+# Everything not needed for the first splash screen is loaded a step at a
+# time, while waiting for Wi-Fi and the Raspberry Pi, and then from the
+# main loop.  The message font comes first, as the IP address screen uses it.
+boot.add_step("message_font", lambda: assets.load_font(MESSAGE_FONTNAME))
+boot.add_step("message_wrapper", load_message_wrapper)
+boot.add_step("title_font", lambda: assets.load_font(TITLE_FONTNAME))
+boot.add_step("animations", disbadge.preload_animations)
+boot.add_step("sounds", disbadge.preload_sounds)
 
 disbadge.set_splash(DisplayStateIDs.CONNECTING)
-wifi = wifimanager.ESPSPI_WiFiManager(esp32, secrets, attempts=3, debug=True)
-wifi.connect()
+network.start_connect(secrets)
+connect_deadline = hardware.monotonic() + CONNECT_TIMEOUT
+while not network.is_connected:
+    if hardware.monotonic() > connect_deadline:
+        # Wait for Wi-Fi, retrying if it fails
+        network.connect(secrets)
+    elif not boot.run_step():
+        hardware.sleep(0.1)
+boot.mark(BootStages.CONNECTED)
 
 web_app = WSGIApp()
 
 
 @web_app.route("/message", ["POST"])
 def display_message(request: Request):  # TODO: add request param
-    """Function for handling data transmission over WSGI app
+    """Function for handling data transmission over WSGI app.  Until the
+    DisBadge is activated, or if every message in the queue is still
+    waiting to be shown, the message is refused so that the Raspberry Pi
+    sends it again later.
 
     :param Request request: The incoming request
     """
 
     print("RECEIVED NEW MESSAGE!")
-    global_state.CURRENT_MESSAGE = DiscordMessageGroup()
-    global_state.CURRENT_MESSAGE.from_json(request.body)
+    if not global_state.DISCORD_CONNECTION or not global_state.MESSAGE_QUEUE.space:
+        return ("503 Service Unavailable", ["Content-Type", "text/plain"], "")
+    received = global_state.TRACE_LOG.now()
+    decode_start = global_state.STATS.now()
+    new_message = MessageRecord()
+    content_type = request.headers.get("content-type") or FORM_CONTENT_TYPE
+    try:
+        if content_type.startswith(RECORD_CONTENT_TYPE):
+            new_message.from_record(request.body)
+        elif content_type.startswith(BITMAP_CONTENT_TYPE):
+            new_message.from_bitmap(request.body)
+        elif content_type.startswith(FORM_CONTENT_TYPE):
+            new_message.from_json(request.body)
+        else:
+            return ("415 Unsupported Media Type", ["Content-Type", "text/plain"], "")
+    except DECODE_ERRORS as err:
+        print("Could not decode message:", err)
+        return ("400 Bad Request", ["Content-Type", "text/plain"], "")
+    global_state.STATS.record_time(StatIDs.DECODES, decode_start)
+    global_state.TRACE_LOG.begin(new_message, received)
+    global_state.MESSAGE_QUEUE.push(new_message)
     return ("200 OK", ["Content-Type", "text/plain"], "")
 
 
+@web_app.route("/messages", ["POST"])
+def display_messages(request: Request):
+    """Function for handling a batch of messages in the compact record
+    format, sent in a single request.  Either every message in the batch
+    is accepted or none are, which happens until the DisBadge is activated
+    or if there isn't space in the queue for all of them.
+
+    :param Request request: The incoming request
+    """
+
+    received = global_state.TRACE_LOG.now()
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(RECORD_CONTENT_TYPE):
+        return ("415 Unsupported Media Type", ["Content-Type", "text/plain"], "")
+    if not global_state.DISCORD_CONNECTION:
+        return ("503 Service Unavailable", ["Content-Type", "text/plain"], "")
+    decode_start = global_state.STATS.now()
+    new_messages = []
+    try:
+        for new_message in MessageRecord.iter_from_records(request.body):
+            global_state.STATS.record_time(StatIDs.DECODES, decode_start)
+            new_messages.append(new_message)
+            decode_start = global_state.STATS.now()
+    except DECODE_ERRORS as err:
+        print("Could not decode messages:", err)
+        return ("400 Bad Request", ["Content-Type", "text/plain"], "")
+    if len(new_messages) > global_state.MESSAGE_QUEUE.space:
+        return ("503 Service Unavailable", ["Content-Type", "text/plain"], "")
+    for new_message in new_messages:
+        global_state.TRACE_LOG.begin(new_message, received)
+        global_state.MESSAGE_QUEUE.push(new_message)
+    print("RECEIVED {} NEW MESSAGES!".format(len(new_messages)))
+    return ("200 OK", ["Content-Type", "text/plain"], str(len(new_messages)))
+
+
+@web_app.route("/capabilities", ["GET"])
+def report_capabilities(request: Request):  # pylint: disable=unused-argument
+    """Function for reporting the optional features this firmware
+    supports, one per line, see `shared.capabilities`
+
+    :param Request request: The incoming request
+    """
+
+    return (
+        "200 OK",
+        ["Content-Type", "text/plain"],
+        encode_capabilities(CAPABILITIES),
+    )
+
+
+@web_app.route("/traces", ["GET"])
+def report_traces(request: Request):  # pylint: disable=unused-argument
+    """Function for reporting the stage times of traced messages that
+    have finished being shown, see `trace_log.TraceLog.report`
+
+    :param Request request: The incoming request
+    """
+
+    return ("200 OK", ["Content-Type", "text/plain"], global_state.TRACE_LOG.report())
+
+
+@web_app.route("/stats", ["GET"])
+def report_stats(request: Request):  # pylint: disable=unused-argument
+    """Function for reporting the diagnostic counters, one per line as
+    its name and value, see `stats.BadgeStats.report`
+
+    :param Request request: The incoming request
+    """
+
+    report = global_state.STATS.report(global_state.MESSAGE_QUEUE, scheduler)
+    report = "\n".join((report, boot.report()))
+    return ("200 OK", ["Content-Type", "text/plain"], report)
+
+
 @web_app.route("/activate", ["POST"])
 def activate_disbadge(request: Request):  # TODO: add request param
     """Function for activating the DisBadge
@@ -87,80 +234,73 @@ def set_sound(request: Request, setting: str):
     return ("200 OK", ["Content-Type", "text/plain"], "")
 
 
-server.set_interface(esp32)
-wsgi_server = server.WSGIServer(80, application=web_app)
-wsgi_server.start()
+wsgi_server = network.serve(web_app)
 
-pretty_ip_address = esp32.pretty_ip(esp32.ip_address)
+pretty_ip_address = network.ip_address
 disbadge.ip_address = pretty_ip_address
 print(pretty_ip_address)
 disbadge.set_splash(DisplayStateIDs.CONNECT)
+boot.mark(BootStages.SERVING)
 while not global_state.DISCORD_CONNECTION:
     wsgi_server.update_poll()
+    boot.run_step()
+boot.mark(BootStages.ACTIVATED)
 disbadge.set_splash(DisplayStateIDs.NO_MESSAGE)
 
 
-def main():
-    """Main sequence"""
+controller = MessageController(
+    disbadge,
+    global_state.MESSAGE_QUEUE,
+    MESSAGE_GROUP,
+    MESSAGE_PIN_TIME * 60,
+    hardware.monotonic,
+    trace_log=global_state.TRACE_LOG,
+    stats=global_state.STATS,
+    dwell_time=MESSAGE_DWELL_TIME,
+)
 
-    while True:
 
-        # Main loop for handling UI and buttons
+def poll_network() -> None:
+    """Reconnects to Wi-Fi if needed, then handles any incoming request"""
 
-        if not esp32.is_connected:
-            disbadge.set_splash(DisplayStateIDs.CONNECTING)
-            while not esp32.is_connected:
-                wifi.reset()
-                pass
+    if not network.is_connected:
+        disbadge.set_splash(DisplayStateIDs.CONNECTING)
+        network.reconnect()
+        disbadge.set_splash(DisplayStateIDs.NO_MESSAGE)
 
-        wsgi_server.update_poll()
+    global_state.STATS.record_poll()
+    wsgi_server.update_poll()
 
-        # Guard statement for message equality
-        if global_state.CURRENT_MESSAGE == disbadge.current_message:
-            continue
 
-        # Check if no messsage
-        if global_state.CURRENT_MESSAGE is None:
-            disbadge.set_splash(DisplayStateIDs.NO_MESSAGE)
-            continue
+def load_assets() -> None:
+    """Runs the next step of loading the DisBadge's assets, until they are
+    all loaded"""
 
-        # Handle actual message
-        disbadge.flush_inputs()
-        if global_state.CURRENT_MESSAGE.cmd_type == CommandType.PING:
-            led_animation_id = LEDStateIDs.PING
-            new_splash_id = DisplayStateIDs.PING
-        elif global_state.CURRENT_MESSAGE.cmd_type == CommandType.CHEER:
-            led_animation_id = LEDStateIDs.CHEER
-            new_splash_id = DisplayStateIDs.CHEER
-        else:
-            led_animation_id = LEDStateIDs.HYPE
-            new_splash_id = DisplayStateIDs.HYPE
-        disbadge.set_splash(new_splash_id)
-        disbadge.animation = led_animation_id
-        disbadge.play_notification(new_splash_id)
-        disbadge.set_splash(
-            DisplayStateIDs.MESSAGE, message=global_state.CURRENT_MESSAGE
-        )
-
-        # Start LED animation clock
-        popup_start_time = time.monotonic()
-        while (
-            time.monotonic() < popup_start_time + (MESSAGE_PIN_TIME * 60)
-            and global_state.CURRENT_MESSAGE == disbadge.current_message
-        ):
-            disbadge.animate_leds()
-            wsgi_server.update_poll()
-            disbadge.update_inputs()
-            if disbadge.button_pressed == Buttons.BUTTON_B:
-                break
-        disbadge.animation = LEDStateIDs.NONE
-        disbadge.animate_leds()
-        disbadge.play_notification(None)
-
-        # Check if new message available
-        if global_state.CURRENT_MESSAGE == disbadge.current_message:  # New message
-            disbadge.set_splash(DisplayStateIDs.NO_MESSAGE)
-            global_state.CURRENT_MESSAGE = None
-
-
-main()
+    if not boot.run_step():
+        boot.mark(BootStages.READY)
+        scheduler.remove_task("boot")
+
+
+def scan_inputs() -> None:
+    """Passes any button press to the message controller"""
+
+    if disbadge.update_inputs():
+        controller.handle_button(disbadge.button_pressed)
+
+
+scheduler = Scheduler(hardware.monotonic, hardware.sleep)
+scheduler.add_task("network", poll_network, NETWORK_INTERVAL)
+scheduler.add_task("leds", disbadge.tick, LED_INTERVAL)
+scheduler.add_task("inputs", scan_inputs, INPUT_INTERVAL)
+scheduler.add_task("display", controller.update, DISPLAY_INTERVAL)
+scheduler.add_task("boot", load_assets, BOOT_INTERVAL)
+
+
+def main():
+    """Main sequence"""
+
+    scheduler.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+`controller`
+====================================================
+
+Handles showing queued messages, their notifications, and browsing the
+message history, one step at a time from the main loop
+
+* Author(s): Alec Delaney
+
+"""
+
+import time
+from shared.messages import CommandType
+from states import DisplayStateIDs, LEDStateIDs, Buttons
+from trace_log import TraceStages
+from stats import StatIDs
+
+try:
+    from typing import Any, Callable, Optional
+    from message_queue import MessageQueue, MessageRecord
+    from pybadge_messages import DiscordMessageGroup
+    from trace_log import TraceLog
+    from stats import BadgeStats
+except ImportError:
+    pass
+
+
+# pylint: disable=too-few-public-methods
+class ControllerStates:
+    """Enum-like class for the state of the message controller"""
+
+    IDLE = 0
+    NOTIFYING = 1
+    SHOWING = 2
+
+
+# pylint: disable=too-many-instance-attributes
+class MessageController:
+    """Steps through showing each queued message: playing its
+    notification, then pinning it to the screen until it times out, is
+    dismissed, or a new message arrives.  A new message waits until the
+    shown message has been on screen for the dwell time, so that every
+    message in a burst can be read.
+
+    :param disbadge: The DiscordPyBadge
+    :param MessageQueue message_queue: The queue of received messages
+    :param DiscordMessageGroup message_group: The display group used to
+        show messages
+    :param float pin_time: How long messages are shown, in seconds
+    :param monotonic: (Optional) The clock function, default is
+        ``time.monotonic``
+    :param TraceLog trace_log: (Optional) The log that traced messages
+        record their stages in, default is None
+    :param BadgeStats stats: (Optional) The diagnostic counters that
+        layout times are recorded in, default is None
+    :param float dwell_time: (Optional) The least time a message is shown
+        before the next one replaces it, in seconds; default is 3
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        disbadge: Any,
+        message_queue: MessageQueue,
+        message_group: DiscordMessageGroup,
+        pin_time: float,
+        monotonic: Callable[[], float] = time.monotonic,
+        trace_log: Optional[TraceLog] = None,
+        stats: Optional[BadgeStats] = None,
+        dwell_time: float = 3,
+    ) -> None:
+
+        self._disbadge = disbadge
+        self._queue = message_queue
+        self._group = message_group
+        self._pin_time = pin_time
+        self._dwell_time = dwell_time
+        self._monotonic = monotonic
+
+        self._trace_log = trace_log
+        self._stats = stats
+        self._notifying_message = None
+
+        self._state = ControllerStates.IDLE
+        self._pin_start = 0.0
+
+    @property
+    def state(self) -> int:
+        """The current state, as a `ControllerStates` value"""
+        return self._state
+
+    def _notify(self, message: MessageRecord) -> None:
+        """Starts the notification for a new message"""
+
+        self._disbadge.flush_inputs()
+        if message.cmd_type == CommandType.PING:
+            led_animation_id = LEDStateIDs.PING
+            new_splash_id = DisplayStateIDs.PING
+        elif message.cmd_type == CommandType.CHEER:
+            led_animation_id = LEDStateIDs.CHEER
+            new_splash_id = DisplayStateIDs.CHEER
+        else:
+            led_animation_id = LEDStateIDs.HYPE
+            new_splash_id = DisplayStateIDs.HYPE
+        self._disbadge.set_splash(new_splash_id)
+        self._mark(message, TraceStages.SPLASH)
+        self._disbadge.animation = led_animation_id
+        self._disbadge.play_notification(new_splash_id)
+        layout_start = self._stats.now() if self._stats is not None else 0
+        self._group.from_message(message)
+        if self._stats is not None:
+            self._stats.record_time(StatIDs.LAYOUTS, layout_start)
+        self._mark(message, TraceStages.LAYOUT)
+        self._notifying_message = message
+        self._state = ControllerStates.NOTIFYING
+
+    def _mark(self, message: MessageRecord, stage: int) -> None:
+        """Records that a message has reached a stage, if tracing"""
+
+        if self._trace_log is not None:
+            self._trace_log.mark(message, stage)
+
+    def _show(self) -> None:
+        """Shows the message in the message group and starts its timer"""
+
+        self._disbadge.set_splash(DisplayStateIDs.MESSAGE, message=self._group)
+        self._pin_start = self._monotonic()
+        self._state = ControllerStates.SHOWING
+
+    def dismiss(self) -> None:
+        """Removes the message from the screen"""
+
+        self._disbadge.animation = LEDStateIDs.NONE
+        self._disbadge.animate_leds()
+        self._disbadge.play_notification(None)
+        self._disbadge.set_splash(DisplayStateIDs.NO_MESSAGE)
+        self._state = ControllerStates.IDLE
+
+    def update(self) -> None:
+        """Advances to the next step, if needed"""
+
+        if self._state == ControllerStates.NOTIFYING:
+            if self._disbadge.notification_playing:
+                return
+            self._mark(self._notifying_message, TraceStages.SOUND)
+            self._notifying_message = None
+            self._show()
+
+        if self._state == ControllerStates.SHOWING:
+            shown_for = self._monotonic() - self._pin_start
+            if self._queue.pending:
+                if shown_for >= self._dwell_time:
+                    self._notify(self._queue.pop_pending())
+            elif shown_for >= self._pin_time:
+                self.dismiss()
+        elif self._queue.pending:
+            self._notify(self._queue.pop_pending())
+
+    def handle_button(self, button: int) -> None:
+        """Responds to a button press
+
+        :param int button: The button pressed, as a `Buttons` value
+        """
+
+        if self._state == ControllerStates.NOTIFYING:
+            if button == Buttons.BUTTON_B:
+                self._disbadge.play_notification(None)
+            return
+
+        if self._state != ControllerStates.SHOWING:
+            return
+
+        if button == Buttons.BUTTON_B:
+            self.dismiss()
+            return
+        if button in (Buttons.BUTTON_LEFT, Buttons.BUTTON_UP):
+            browsed_message = self._queue.older()
+        elif button in (Buttons.BUTTON_RIGHT, Buttons.BUTTON_DOWN):
+            browsed_message = self._queue.newer()
+        else:
+            return
+        if browsed_message:
+            self._group.from_message(browsed_message)
+            self._show()
@@ -9,26 +9,15 @@ Manager for the PyBadge that handles user input, displays, and sounds
 """
 
 import gc
-import board
-import time
-from micropython import const
-from keypad import ShiftRegisterKeys, Event
-import neopixel
-import digitalio
 import displayio
-from audioio import AudioOut
-from adafruit_led_animation.animation.solid import Solid
-from adafruit_led_animation.animation.pulse import Pulse
 from adafruit_led_animation.color import RED, BLACK
-from adafruit_led_animation.animation.rainbow import Rainbow
-from adafruit_led_animation.animation.rainbowsparkle import RainbowSparkle
-from audiocore import WaveFile
-from audiomp3 import MP3Decoder
-from states import DisplayStateIDs, LEDStateIDs
+from hal import BadgeHardware, get_hardware
+from states import DisplayStateIDs, LEDStateIDs, Buttons
+from notifications import NotificationPlayer
 from screens import SplashBackground, TextSplashScreen, LabeledTextSplashScreen
 
 try:
-    from typing import Optional, Union
+    from typing import Any, Dict, Optional
     from pybadge_messages import DiscordMessageGroup
     from adafruit_led_animation.animation import Animation
 except ImportError:
@@ -45,20 +34,8 @@ LOADING_TEXT = "Loading..."
 CONNECTING_TEXT = "Connecting..."
 NO_MESSAGES_TEXT = "No messages!"
 
-
-# pylint: disable=too-few-public-methods
-class Buttons:
-    """An enum-like class for the button constants"""
-
-    NONE = const(8)
-    BUTTON_LEFT = const(7)
-    BUTTON_UP = const(6)
-    BUTTON_DOWN = const(5)
-    BUTTON_RIGHT = const(4)
-    BUTTON_SEL = const(3)
-    BUTTON_START = const(2)
-    BUTTON_A = const(1)
-    BUTTON_B = const(0)
+SPLASH_CACHE_BUDGET = 8192
+"""The estimated number of bytes that cached splash screens may use"""
 
 
 # pylint: disable=too-many-instance-attributes, no-member
@@ -69,17 +46,33 @@ class DiscordPyBadge:
     :param str ip_address: The IP address of the Disbadge
     :param bool external_speaker: Whether the PyBadge is set up to use an
         external speaker; default is False
+    :param BadgeHardware hardware: (Optional) The hardware to use, default
+        is the hardware from `hal.get_hardware`
     """
 
     def __init__(
-        self, ip_address: Optional[str] = None, external_speaker: bool = False
+        self,
+        ip_address: Optional[str] = None,
+        external_speaker: bool = False,
+        hardware: Optional[BadgeHardware] = None,
     ) -> None:
 
+        if hardware is None:
+            hardware = get_hardware()
+        self._hardware = hardware
+
         # Set IP address
         self._ip_address = ip_address
 
         # Display loading screen details
         self._current_message = None
+        self._current_screen_id = None
+        self._visible_screen = None
+        self._message_screen = None
+        self._screen_cache = {}
+        self._screen_cache_order = []
+        self.splash_cache_budget = SPLASH_CACHE_BUDGET
+        """The estimated number of bytes that cached splash screens may use"""
         self._splashes = {
             DisplayStateIDs.LOADING: {
                 "type": "ts",
@@ -123,7 +116,7 @@ class DiscordPyBadge:
         }
 
         # Initialize LED animations
-        self._neopixels = neopixel.NeoPixel(board.NEOPIXEL, 5, brightness=0.25)
+        self._neopixels = hardware.neopixels
         self._animations = {
             LEDStateIDs.PING: {
                 "type": "pulse",
@@ -135,21 +128,22 @@ class DiscordPyBadge:
             LEDStateIDs.HYPE: {"type": "rainbowsparkle", "speed": 0.1, "period": 0.75},
             LEDStateIDs.NONE: {"type": "solid", "color": BLACK},
         }
+        self._animation_pool = {}
+        self._current_animation = None
+        self._current_animation_id = None
+
+        self.animation_switch_time = 0.0
+        """How long the last change of animation took, in seconds"""
+
+        self.animation_switch_alloc = 0
+        """How many bytes of heap the last change of animation allocated"""
 
         # Initialize keypad-related functionalities
-        self._pad = ShiftRegisterKeys(
-            clock=board.BUTTON_CLOCK,
-            data=board.BUTTON_OUT,
-            latch=board.BUTTON_LATCH,
-            key_count=8,
-            value_when_pressed=True,
-            interval=0.1,
-            max_events=1,
-        )
-        self._event = Event(8)
+        self._pad = hardware.keys
+        self._event = hardware.make_event(8)
 
-        # Initialize sounds
-        self._current_sound = None
+        # Initialize sounds, which are opened once and kept
+        self._sound_pool = {}
         self._sounds = {
             DisplayStateIDs.PING: {"type": "wav", "file": "sounds/vgdeathsound.wav"},
             DisplayStateIDs.CHEER: {"type": "wav", "file": "sounds/chipquest.wav"},
@@ -157,19 +151,27 @@ class DiscordPyBadge:
         }
         if external_speaker:
             self.external_speaker = True
-            self.speaker_enable = digitalio.DigitalInOut(board.SPEAKER_ENABLE)
+            self.speaker_enable = hardware.speaker_enable
             self.speaker_enable.switch_to_output()
         else:
             self.external_speaker = False
 
         self.muted = False
 
-        self.audio = AudioOut(board.SPEAKER)
+        self.audio = hardware.audio
         """The audio object for the DiscordPyBadge"""
 
+        self._notification = NotificationPlayer(
+            self.audio,
+            self._generate_audio_file,
+            self.speaker_enable if external_speaker else None,
+            monotonic=hardware.monotonic,
+            release_sounds=False,
+        )
+
         # Make the Display Background
         self.splash = self._generate_screen(DisplayStateIDs.BACKGROUND)
-        board.DISPLAY.show(self.splash)
+        hardware.display.show(self.splash)
 
     @property
     def ip_address(self) -> Optional[str]:
@@ -178,13 +180,17 @@ class DiscordPyBadge:
     @ip_address.setter
     def ip_address(self, ip_address: str) -> None:
         self._ip_address = ip_address
+        # Screens showing the IP address need to be regenerated
+        for screen_id, splash_reqs in self._splashes.items():
+            if splash_reqs["type"] == "lts" and screen_id in self._screen_cache:
+                self._evict_screen(screen_id)
 
     def update_inputs(self) -> bool:
         """Get the latest button press Event"""
 
         new_event = self._pad.events.get_into(self._event)
         if self._event is None or self._event.released or not new_event:
-            self._event = Event(8)
+            self._event = self._hardware.make_event(8)
             return False
         return True
 
@@ -199,14 +205,34 @@ class DiscordPyBadge:
             self.update_inputs()
 
     @property
-    def animation(self) -> int:
+    def animation(self) -> Optional[int]:
         """The ID of the current animation"""
-        return self._current_animation
+        return self._current_animation_id
 
     @animation.setter
     def animation(self, animation_id: int) -> None:
-        self._current_animation = self._generate_led_animation(animation_id)
-        gc.collect()
+        start_time = self._hardware.monotonic()
+        start_free = self._hardware.mem_free()
+        animation = self._animation_pool.get(animation_id)
+        if animation is None:
+            animation = self._generate_led_animation(animation_id)
+            self._animation_pool[animation_id] = animation
+        else:
+            animation.reset()
+        self._current_animation = animation
+        self._current_animation_id = animation_id
+        self.animation_switch_alloc = start_free - self._hardware.mem_free()
+        self.animation_switch_time = self._hardware.monotonic() - start_time
+
+    def preload_animations(self) -> None:
+        """Generates every LED animation ahead of its first use, such as
+        while the DisBadge is booting"""
+
+        for animation_id in self._animations:
+            if animation_id not in self._animation_pool:
+                self._animation_pool[animation_id] = self._generate_led_animation(
+                    animation_id
+                )
 
     def animate_leds(self) -> None:
         """Animates the NeoPixels if there is a current animation"""
@@ -218,6 +244,14 @@ class DiscordPyBadge:
         :param int animation_id: The animation ID
         """
 
+        # pylint: disable=import-outside-toplevel
+        # The animation libraries are only imported once they are needed,
+        # so that they don't slow down showing the first splash screen
+        from adafruit_led_animation.animation.solid import Solid
+        from adafruit_led_animation.animation.pulse import Pulse
+        from adafruit_led_animation.animation.rainbow import Rainbow
+        from adafruit_led_animation.animation.rainbowsparkle import RainbowSparkle
+
         animation_reqs = self._animations[animation_id]
         if animation_reqs["type"] == "pulse":
             animation_class = Pulse
@@ -241,7 +275,6 @@ class DiscordPyBadge:
         :param displayio.Group message: (Optional) The message
         """
 
-        self._current_message = message if message else None
         splash_reqs = self._splashes[screen_id]
         if splash_reqs["type"] == "ts":
             new_splash = TextSplashScreen(screen_id, splash_reqs["text"])
@@ -255,20 +288,90 @@ class DiscordPyBadge:
             new_splash = SplashBackground(splash_reqs["bg"])
         return new_splash
 
+    def _evict_screen(self, screen_id: int) -> None:
+        """Removes a screen from the splash screen cache
+
+        :param int screen_id: The screen ID
+        """
+
+        screen = self._screen_cache.pop(screen_id)
+        self._screen_cache_order.remove(screen_id)
+        self.splash.remove(screen)
+        if screen is self._visible_screen:
+            self._visible_screen = None
+
+    def _cached_screen(self, screen_id: int) -> displayio.Group:
+        """Gets a screen from the splash screen cache, generating it and
+        evicting the least recently used screens if needed
+
+        :param int screen_id: The screen ID
+        """
+
+        screen = self._screen_cache.get(screen_id)
+        if screen is not None:
+            self._screen_cache_order.remove(screen_id)
+            self._screen_cache_order.append(screen_id)
+            return screen
+
+        screen = self._generate_screen(screen_id)
+        screen.hidden = True
+        self._screen_cache[screen_id] = screen
+        self._screen_cache_order.append(screen_id)
+        self.splash.append(screen)
+        evicted = False
+        while (
+            self.splash_cache_size > self.splash_cache_budget
+            and len(self._screen_cache_order) > 1
+        ):
+            self._evict_screen(self._screen_cache_order[0])
+            evicted = True
+        if evicted:
+            gc.collect()
+        return screen
+
     def set_splash(
         self, screen_id: int, message: Optional[displayio.Group] = None
     ) -> None:
-        """Sets the splash screen
+        """Sets the splash screen.  Static screens are generated once and
+        cached, and are switched between by hiding and showing them.
 
         :param int screen_id: The id of the splash screen
         :param display.Group message: The message or Group to display
         """
 
-        new_splash = self._generate_screen(screen_id, message)
-        self.splash.append(new_splash)
-        while len(self.splash) > 2:
-            self.splash.remove(self.splash[1])
-        gc.collect()
+        if self._splashes[screen_id]["type"] == "b":
+            new_splash = self._generate_screen(screen_id, message)
+            if new_splash is not self._message_screen:
+                if self._message_screen is not None:
+                    self.splash.remove(self._message_screen)
+                new_splash.hidden = True
+                self.splash.append(new_splash)
+                self._message_screen = new_splash
+        else:
+            new_splash = self._cached_screen(screen_id)
+
+        self._current_message = message if message else None
+        self._current_screen_id = screen_id
+        if new_splash is self._visible_screen:
+            return
+        if self._visible_screen is not None:
+            self._visible_screen.hidden = True
+        new_splash.hidden = False
+        self._visible_screen = new_splash
+
+    @property
+    def splash_cache_size(self) -> int:
+        """The estimated number of bytes used by the cached splash screens"""
+        return sum(screen.byte_size for screen in self._screen_cache.values())
+
+    @property
+    def splash_cache_info(self) -> Dict[int, int]:
+        """The estimated number of bytes used by each cached splash screen,
+        by screen ID"""
+        return {
+            screen_id: screen.byte_size
+            for screen_id, screen in self._screen_cache.items()
+        }
 
     @property
     def current_message(self) -> Optional[DiscordMessageGroup]:
@@ -276,53 +379,59 @@ class DiscordPyBadge:
         return self._current_message
 
     @property
-    def current_splash(self) -> int:
-        """Gets the current splash screen's title"""
-        current_splash: SplashBackground = self.splash[-1]
-        return current_splash.screen_id
+    def current_splash(self) -> Optional[int]:
+        """Gets the current splash screen's ID"""
+        return self._current_screen_id
 
-    def _generate_audio_file(self, sound_id: int) -> Union[MP3Decoder, WaveFile]:
-        """Dynamically generate the sound object
+    def _generate_audio_file(self, sound_id: int) -> Any:
+        """Gets the sound object, opening it the first time
 
         :param int sound_id: The sound ID
         """
 
+        sound = self._sound_pool.get(sound_id)
+        if sound is not None:
+            return sound
         sound_reqs = self._sounds.get(sound_id)
         if not sound_reqs:
             raise ValueError("Invalid sound id")
-        if sound_reqs["type"] == "mp3":
-            return MP3Decoder(open(sound_reqs["file"], "rb"))
-        return WaveFile(open(sound_reqs["file"], "rb"))
+        sound = self._hardware.open_sound(sound_reqs["file"], sound_reqs["type"])
+        self._sound_pool[sound_id] = sound
+        return sound
+
+    def preload_sounds(self) -> None:
+        """Opens every notification sound ahead of its first use, such as
+        while the DisBadge is booting"""
+
+        for sound_id in self._sounds:
+            self._generate_audio_file(sound_id)
 
     def play_notification(self, sound_id: Optional[int]) -> None:
-        """Plays a notification sound, and pauses execution while doing so
-        (still animates LEDs, however)
+        """Starts playing a notification sound without waiting for it to
+        finish; call `tick` from the main loop until it has
 
         :param int sound_id: (Optional) The id of the notification sound,
             stops playing if ``None``
         """
 
         if sound_id is None:
-            self._current_sound = None
-            gc.collect()
+            self._notification.stop()
             return
 
-        if self.muted:
-            start_time = time.monotonic()
-            end_time = start_time + 4
-            while time.monotonic() < end_time:
-                if self._current_animation:
-                    self._current_animation.animate()
-        else:
-            self._current_sound = self._generate_audio_file(sound_id)
-            if self._current_sound:
-                if self.external_speaker:
-                    self.speaker_enable.value = True
-                self.audio.play(self._current_sound)
-                while self.audio.playing:
-                    if self._current_animation:
-                        self._current_animation.animate()
-                if self.external_speaker:
-                    self.speaker_enable.value = False
-                self._current_sound.deinit()
-                gc.collect()
+        self._notification.start(sound_id, self.muted)
+
+    @property
+    def notification_playing(self) -> bool:
+        """Whether a notification is currently playing"""
+        return self._notification.playing
+
+    def tick(self) -> bool:
+        """Advances notification playback and animates the NeoPixels
+
+        :return: Whether a notification is still playing
+        :rtype: bool
+        """
+
+        if self._current_animation:
+            self._current_animation.animate()
+        return self._notification.tick()
@@ -0,0 +1,666 @@
+"""
+`fakes`
+====================================================
+
+Stand-ins for CircuitPython hardware objects, so that the hardware-free
+parts of the DisBadge can be exercised under CPython
+
+* Author(s): Alec Delaney
+
+"""
+
+import collections
+import io
+import weakref
+from shared import layout
+
+try:
+    from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+except ImportError:
+    pass
+
+
+class VirtualClock:
+    """A clock that only moves when advanced, for use in place of
+    ``time.monotonic``
+
+    :param float start: (Optional) The starting time, default is 0
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Moves the clock forward
+
+        :param float seconds: The amount of time to advance
+        """
+        self.now += seconds
+
+
+# pylint: disable=too-few-public-methods
+class FakeSound:
+    """A stand-in for a ``WaveFile``, which knows its own duration
+
+    :param float duration: (Optional) How long the sound plays for, in
+        seconds; default is 2
+    """
+
+    def __init__(self, duration: float = 2.0) -> None:
+        self.duration = duration
+        self.deinited = False
+
+    def deinit(self) -> None:
+        """Releases the sound"""
+        self.deinited = True
+
+
+class FakeAudioOut:
+    """A stand-in for ``audioio.AudioOut``, which plays a `FakeSound` for
+    its duration as measured by the given clock
+
+    :param monotonic: The clock function, such as a `VirtualClock`
+    """
+
+    def __init__(self, monotonic: Callable[[], float]) -> None:
+        self._monotonic = monotonic
+        self._sound = None
+        self._end_time = 0.0
+        self.play_count = 0
+
+    def play(self, sound: Any, *, loop: bool = False) -> None:
+        """Starts playing a sound
+
+        :param FakeSound sound: The sound to play
+        :param bool loop: Whether to loop the sound (ignored)
+        """
+        # pylint: disable=unused-argument
+        self._sound = sound
+        self._end_time = self._monotonic() + getattr(sound, "duration", 0.0)
+        self.play_count += 1
+
+    def stop(self) -> None:
+        """Stops playing"""
+        self._sound = None
+
+    @property
+    def playing(self) -> bool:
+        """Whether a sound is playing"""
+        return self._sound is not None and self._monotonic() < self._end_time
+
+
+# pylint: disable=too-few-public-methods
+class FakePin:
+    """A stand-in for a ``digitalio.DigitalInOut`` output"""
+
+    def __init__(self) -> None:
+        self.value = False
+
+    def switch_to_output(self, value: bool = False) -> None:
+        """Sets the pin as an output
+
+        :param bool value: The initial value
+        """
+        self.value = value
+
+
+# pylint: disable=too-few-public-methods
+class FakeDisplay:
+    """A stand-in for ``board.DISPLAY``, which keeps the group shown"""
+
+    def __init__(self) -> None:
+        self.root_group = None
+
+    def show(self, group: Any) -> None:
+        """Shows a group
+
+        :param group: The group to show
+        """
+        self.root_group = group
+
+
+# pylint: disable=too-few-public-methods
+class FakeEvent:
+    """A stand-in for a ``keypad.Event``
+
+    :param int key_number: (Optional) The key number, default is 0
+    :param bool pressed: (Optional) Whether the key was pressed rather
+        than released, default is True
+    """
+
+    def __init__(self, key_number: int = 0, pressed: bool = True) -> None:
+        self.key_number = key_number
+        self.pressed = pressed
+
+    @property
+    def released(self) -> bool:
+        """Whether the key was released"""
+        return not self.pressed
+
+
+class FakeEventQueue:
+    """A stand-in for a ``keypad.EventQueue``"""
+
+    def __init__(self) -> None:
+        self._events: Deque[Tuple[int, bool]] = collections.deque()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, key_number: int, pressed: bool) -> None:
+        """Adds an event to the queue
+
+        :param int key_number: The key number
+        :param bool pressed: Whether the key was pressed or released
+        """
+        self._events.append((key_number, pressed))
+
+    def get_into(self, event: FakeEvent) -> bool:
+        """Takes the oldest event, copying it into the given event
+
+        :param FakeEvent event: The event to copy into
+        :return: Whether there was an event
+        :rtype: bool
+        """
+
+        if not self._events:
+            return False
+        event.key_number, event.pressed = self._events.popleft()
+        return True
+
+
+# pylint: disable=too-few-public-methods
+class FakeKeys:
+    """A stand-in for a ``keypad.ShiftRegisterKeys``"""
+
+    def __init__(self) -> None:
+        self.events = FakeEventQueue()
+
+    def press(self, key_number: int) -> None:
+        """Presses and releases a key
+
+        :param int key_number: The key number
+        """
+        self.events.put(key_number, True)
+        self.events.put(key_number, False)
+
+
+class FakeNeoPixels:
+    """A stand-in for a ``neopixel.NeoPixel``, which counts how many times
+    the pixels are shown
+
+    :param int count: (Optional) The number of pixels, default is 5
+    """
+
+    def __init__(self, count: int = 5) -> None:
+        self._pixels = [(0, 0, 0)] * count
+        self.brightness = 0.25
+        self.auto_write = True
+        self.shows = 0
+
+    def __len__(self) -> int:
+        return len(self._pixels)
+
+    def __getitem__(self, index: int) -> Tuple[int, int, int]:
+        return self._pixels[index]
+
+    def __setitem__(self, index: int, color: Any) -> None:
+        self._pixels[index] = color
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color: Any) -> None:
+        """Sets every pixel to a color
+
+        :param color: The color
+        """
+        self._pixels[:] = [color] * len(self._pixels)
+        if self.auto_write:
+            self.show()
+
+    def show(self) -> None:
+        """Shows the pixels"""
+        self.shows += 1
+
+
+# pylint: disable=too-few-public-methods
+class FakeRequest:
+    """A stand-in for an ``adafruit_wsgi.request.Request``
+
+    :param dict environ: The WSGI environment
+    """
+
+    def __init__(self, environ: Dict[str, Any]) -> None:
+        self.method = environ["REQUEST_METHOD"]
+        self.path = environ["PATH_INFO"]
+        self.body = environ["wsgi.input"]
+        self.headers = {
+            key[5:].replace("_", "-").lower(): value
+            for key, value in environ.items()
+            if key.startswith("HTTP_")
+        }
+        if "CONTENT_TYPE" in environ:
+            self.headers["content-type"] = environ["CONTENT_TYPE"]
+
+
+class FakeWSGIApp:
+    """A stand-in for an ``adafruit_wsgi.wsgi_app.WSGIApp``, which routes
+    requests by method and path, including ``<name>`` path parameters"""
+
+    def __init__(self) -> None:
+        self._routes: List[Tuple[List[str], List[str], Callable]] = []
+
+    def route(self, rule: str, methods: Optional[List[str]] = None) -> Callable:
+        """Decorator that adds a route
+
+        :param str rule: The path, which may contain ``<name>`` parameters
+        :param list methods: (Optional) The allowed methods, default is
+            GET only
+        """
+
+        def decorator(func: Callable) -> Callable:
+            self._routes.append((rule.strip("/").split("/"), methods or ["GET"], func))
+            return func
+
+        return decorator
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> List[str]:
+        request = FakeRequest(environ)
+        parts = request.path.strip("/").split("/")
+        for rule_parts, methods, func in self._routes:
+            if request.method not in methods or len(rule_parts) != len(parts):
+                continue
+            params = {}
+            for rule_part, part in zip(rule_parts, parts):
+                if rule_part.startswith("<") and rule_part.endswith(">"):
+                    params[rule_part[1:-1]] = part
+                elif rule_part != part:
+                    break
+            else:
+                status, headers, body = func(request, **params)
+                start_response(status, headers)
+                return [body]
+        start_response("404 Not Found", [])
+        return [""]
+
+
+# pylint: disable=too-few-public-methods
+class FakeWSGIServer:
+    """A stand-in for an ``adafruit_esp32spi_wsgiserver.WSGIServer``,
+    which handles one waiting request each time it is polled
+
+    :param application: The WSGI application
+    :param requests: The waiting WSGI environments, oldest first
+    :param list responses: The list the status and body of each response
+        is added to
+    """
+
+    def __init__(
+        self,
+        application: Callable,
+        requests: Deque[Dict[str, Any]],
+        responses: List[Tuple[str, str]],
+    ) -> None:
+        self._application = application
+        self._requests = requests
+        self._responses = responses
+        self.polls = 0
+
+    def update_poll(self) -> None:
+        """Handles the oldest waiting request, if there is one"""
+
+        self.polls += 1
+        if not self._requests:
+            return
+        statuses = []
+        body = self._application(
+            self._requests.popleft(), lambda status, _headers: statuses.append(status)
+        )
+        self._responses.append((statuses[0], "".join(body)))
+
+
+class FakeNetwork:
+    """A stand-in for a `hal.ESP32Network`, whose server is a
+    `FakeWSGIServer`.  Requests can be made before the server starts,
+    and wait until it does.
+
+    :param str ip_address: (Optional) The IP address, default is
+        127.0.0.1
+    """
+
+    def __init__(self, ip_address: str = "127.0.0.1") -> None:
+        self.ip_address = ip_address
+        self.is_connected = False
+        self.server = None
+        self.reconnects = 0
+        self.requests: Deque[Dict[str, Any]] = collections.deque()
+        self.responses: List[Tuple[str, str]] = []
+        """The status and body of each response, in the order handled"""
+
+    def connect(self, secrets: Any) -> None:
+        """Connects to the network
+
+        :param secrets: The secrets (ignored)
+        """
+        # pylint: disable=unused-argument
+        self.is_connected = True
+
+    def start_connect(self, secrets: Any) -> None:
+        """Starts connecting to the network, which connects immediately
+
+        :param secrets: The secrets (ignored)
+        """
+        self.connect(secrets)
+
+    def reconnect(self) -> None:
+        """Reconnects to the network"""
+        self.reconnects += 1
+        self.is_connected = True
+
+    def serve(self, application: Callable, port: int = 80) -> FakeWSGIServer:
+        """Starts a server for a WSGI application
+
+        :param application: The WSGI application
+        :param int port: The port (ignored)
+        """
+        # pylint: disable=unused-argument
+        self.server = FakeWSGIServer(application, self.requests, self.responses)
+        return self.server
+
+    def request(
+        self, method: str, path: str, body: str = "", content_type: str = ""
+    ) -> None:
+        """Adds a request for the server to handle
+
+        :param str method: The HTTP method
+        :param str path: The path
+        :param str body: (Optional) The request body, default is empty
+        :param str content_type: (Optional) The content type, default is
+            none
+        """
+
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "wsgi.input": io.StringIO(body),
+        }
+        if content_type:
+            environ["CONTENT_TYPE"] = content_type
+        self.requests.append(environ)
+
+
+class FakeGroup:
+    """A stand-in for a ``displayio.Group``
+
+    :param int scale: (Optional) The scale, default is 1
+    :param int x: (Optional) The x position, default is 0
+    :param int y: (Optional) The y position, default is 0
+    """
+
+    def __init__(self, *, scale: int = 1, x: int = 0, y: int = 0) -> None:
+        self._children = []
+        self.scale = scale
+        self.x = x  # pylint: disable=invalid-name
+        self.y = y  # pylint: disable=invalid-name
+        self.hidden = False
+
+    def __len__(self) -> int:
+        return len(self._children)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._children[index]
+
+    def __iter__(self):
+        return iter(self._children)
+
+    def append(self, layer: Any) -> None:
+        """Adds a layer on top
+
+        :param layer: The layer
+        """
+        self._children.append(layer)
+
+    def insert(self, index: int, layer: Any) -> None:
+        """Adds a layer at an index
+
+        :param int index: The index
+        :param layer: The layer
+        """
+        self._children.insert(index, layer)
+
+    def remove(self, layer: Any) -> None:
+        """Removes a layer
+
+        :param layer: The layer
+        """
+        self._children.remove(layer)
+
+    def pop(self, index: int = -1) -> Any:
+        """Removes and returns a layer
+
+        :param int index: (Optional) The index, default is the top layer
+        """
+        return self._children.pop(index)
+
+    def index(self, layer: Any) -> int:
+        """The index of a layer
+
+        :param layer: The layer
+        """
+        return self._children.index(layer)
+
+
+class FakeBitmap:
+    """A stand-in for a ``displayio.Bitmap``, which allocates the same
+    number of bytes as the real one and counts the bitmap memory used by
+    every `FakeBitmap`
+
+    :param int width: The width
+    :param int height: The height
+    :param int value_count: The number of values (colors)
+    """
+
+    created = 0
+    """The number of bitmaps created"""
+
+    allocated_bytes = 0
+    """The number of bytes allocated for bitmaps"""
+
+    live_bytes = 0
+    """The number of bytes used by bitmaps that still exist"""
+
+    def __init__(self, width: int, height: int, value_count: int) -> None:
+        bits_per_value = 1
+        while (1 << bits_per_value) < value_count:
+            bits_per_value *= 2
+        # Each row is stored as whole 32-bit words
+        size = (width * bits_per_value + 31) // 32 * 4 * height
+        self.width = width
+        self.height = height
+        self._buffer = bytearray(size)
+        FakeBitmap.created += 1
+        FakeBitmap.allocated_bytes += size
+        FakeBitmap.live_bytes += size
+        weakref.finalize(self, FakeBitmap._release, size)
+
+    @staticmethod
+    def _release(size: int) -> None:
+        FakeBitmap.live_bytes -= size
+
+    @classmethod
+    def reset_counts(cls) -> None:
+        """Resets the number of bitmaps created and bytes allocated"""
+        cls.created = 0
+        cls.allocated_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def readinto(self, stream: Any) -> None:
+        """Copies packed pixels into the bitmap, as
+        ``bitmaptools.readinto`` does
+
+        :param stream: The stream to read the pixels from
+        """
+        data = stream.read(len(self._buffer))
+        self._buffer[: len(data)] = data
+
+    def fill(self, value: int) -> None:
+        """Sets every pixel to a value
+
+        :param int value: The value
+        """
+        self._buffer[:] = bytes((value,)) * len(self._buffer)
+
+
+class FakePalette:
+    """A stand-in for a ``displayio.Palette``
+
+    :param int color_count: The number of colors
+    """
+
+    def __init__(self, color_count: int) -> None:
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+    def __getitem__(self, index: int) -> int:
+        return self._colors[index]
+
+    def __setitem__(self, index: int, color: int) -> None:
+        self._colors[index] = color
+
+    def make_transparent(self, index: int) -> None:
+        """Makes a color transparent
+
+        :param int index: The index of the color
+        """
+        self._transparent.add(index)
+
+    def make_opaque(self, index: int) -> None:
+        """Makes a color opaque
+
+        :param int index: The index of the color
+        """
+        self._transparent.discard(index)
+
+
+# pylint: disable=too-few-public-methods
+class FakeTileGrid:
+    """A stand-in for a ``displayio.TileGrid`` showing a whole bitmap
+
+    :param FakeBitmap bitmap: The bitmap
+    :param pixel_shader: The palette
+    :param int x: (Optional) The x position, default is 0
+    :param int y: (Optional) The y position, default is 0
+    """
+
+    def __init__(
+        self, bitmap: FakeBitmap, *, pixel_shader: Any, x: int = 0, y: int = 0, **_
+    ) -> None:
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x  # pylint: disable=invalid-name
+        self.y = y  # pylint: disable=invalid-name
+        self.hidden = False
+
+
+class FakeFont:
+    """A stand-in for a font loaded by ``adafruit_bitmap_font``, which
+    reads the glyph widths and height of a BDF font
+
+    :param str filename: The filename of the BDF font
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.widths = layout.GlyphWidths.from_bdf(filename)
+        self.height = 0
+        with open(filename, "r", encoding="utf-8") as font_file:
+            for line in font_file:
+                if line.startswith("FONTBOUNDINGBOX "):
+                    self.height = int(line.split()[2])
+                    break
+
+    def get_bounding_box(self) -> Tuple[int, int, int, int]:
+        """The bounding box of the font's glyphs"""
+        return (0, self.height, 0, 0)
+
+
+class FakeLabel(FakeGroup):
+    """A stand-in for an ``adafruit_display_text`` label, which renders
+    its text into a `FakeBitmap` each time the text changes, as
+    ``bitmap_label.Label`` does
+
+    :param FakeFont font: The font
+    :param str text: (Optional) The text, default is empty
+    :param int color: (Optional) The text color, default is white
+    """
+
+    def __init__(
+        self, font: FakeFont, *, text: str = "", color: int = 0xFFFFFF, **kwargs
+    ) -> None:
+        super().__init__(
+            scale=kwargs.get("scale", 1), x=kwargs.get("x", 0), y=kwargs.get("y", 0)
+        )
+        self.font = font
+        self.color = color
+        self.width = 0
+        self.height = 0
+        self.bitmap = None
+        self._text = ""
+        self.text = text
+
+    @property
+    def text(self) -> str:
+        """The text shown"""
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        self._text = text
+        lines = text.split("\n")
+        self.width = max(
+            sum(self.font.widths.width(char) for char in line) for line in lines
+        )
+        self.height = self.font.height * len(lines) if text else 0
+        self.bitmap = FakeBitmap(self.width, self.height, 2)
+
+    @property
+    def bounding_box(self) -> Tuple[int, int, int, int]:
+        """The position and size of the text"""
+        return (0, 0, self.width, self.height)
+
+
+class FakeAnimation:
+    """A stand-in for an ``adafruit_led_animation`` animation, which shows
+    the pixels each time it is animated
+
+    :param pixel_object: The pixels
+    :param float speed: (Optional) The time between frames, in seconds;
+        default is 0, as for a ``Solid`` animation
+    """
+
+    def __init__(self, pixel_object: Any, speed: float = 0.0, **kwargs) -> None:
+        self.pixel_object = pixel_object
+        self.speed = speed
+        self.color = kwargs.get("color", 0)
+        self.frames = 0
+
+    def animate(self) -> bool:
+        """Draws the next frame
+
+        :return: Whether a frame was drawn
+        :rtype: bool
+        """
+        self.frames += 1
+        self.pixel_object.fill(self.color)
+        return True
+
+    def reset(self) -> None:
+        """Restarts the animation"""
+        self.frames = 0
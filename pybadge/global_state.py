@@ -1,4 +1,17 @@
-from pybadge_messages import DiscordMessageGroup
+import hal
+from message_queue import MessageQueue
+from trace_log import TraceLog
+from stats import BadgeStats
+from startup import BootSequence
 
-CURRENT_MESSAGE = None
+HISTORY_SIZE = 8
+"""How many received messages are kept for browsing"""
+
+# The boot clock starts before the hardware is set up, so that setting
+# it up counts towards the time to the first splash screen
+BOOT = BootSequence(hal.ticks_ms)
+HARDWARE = hal.get_hardware()
+MESSAGE_QUEUE = MessageQueue(HISTORY_SIZE)
+TRACE_LOG = TraceLog(HISTORY_SIZE, HARDWARE.ticks_ms)
+STATS = BadgeStats(HARDWARE.ticks_ms, HARDWARE.mem_free, HARDWARE.mem_alloc)
 DISCORD_CONNECTION = False
@@ -0,0 +1,266 @@
+"""
+`hal`
+====================================================
+
+The boundary between the DisBadge and its hardware.  Everything that
+touches the PyBadge's peripherals, clocks, heap, or network goes through
+a `BadgeHardware`, so that the rest of the DisBadge can run on other
+hardware, such as the headless simulator in `simulator`.
+
+* Author(s): Alec Delaney
+
+"""
+
+import gc
+import time
+
+try:
+    from typing import Any, Callable, Dict, Optional
+except ImportError:
+    pass
+
+_hardware = None  # pylint: disable=invalid-name
+
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class BadgeHardware:
+    """The hardware the DisBadge runs on
+
+    :param display: The display, which has a ``show()`` method taking
+        the root ``displayio.Group``
+    :param neopixels: The NeoPixels
+    :param keys: The buttons, as a ``keypad`` object with an ``events``
+        queue
+    :param audio: The audio output, such as an ``audioio.AudioOut``
+    :param speaker_enable: The pin that enables the external speaker
+    :param network: The network, see `ESP32Network` for its methods
+    :param event_factory: Function that takes a key number and returns a
+        new ``keypad.Event``
+    :param sound_factory: Function that takes a filename and a sound type
+        ("wav" or "mp3") and returns the sound to play
+    :param monotonic: (Optional) The clock function, default is
+        ``time.monotonic``
+    :param sleep: (Optional) The sleep function, default is ``time.sleep``
+    :param ticks_ms: (Optional) The millisecond clock function, default
+        is ``supervisor.ticks_ms``
+    :param mem_free: (Optional) The function returning the free heap
+        memory, default is ``gc.mem_free``
+    :param mem_alloc: (Optional) The function returning the allocated heap
+        memory, default is ``gc.mem_alloc``
+    """
+
+    # pylint: disable=too-many-arguments,redefined-outer-name
+    def __init__(
+        self,
+        display: Any,
+        neopixels: Any,
+        keys: Any,
+        audio: Any,
+        speaker_enable: Any,
+        network: Any,
+        event_factory: Callable[[int], Any],
+        sound_factory: Callable[[str, str], Any],
+        monotonic: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        ticks_ms: Optional[Callable[[], int]] = None,
+        mem_free: Optional[Callable[[], int]] = None,
+        mem_alloc: Optional[Callable[[], int]] = None,
+    ) -> None:
+
+        self.display = display
+        self.neopixels = neopixels
+        self.keys = keys
+        self.audio = audio
+        self.speaker_enable = speaker_enable
+        self.network = network
+        self.make_event = event_factory
+        self.open_sound = sound_factory
+        self.monotonic = monotonic
+        self.sleep = sleep
+        if ticks_ms is None:
+            # pylint: disable=import-outside-toplevel
+            from supervisor import ticks_ms
+        self.ticks_ms = ticks_ms
+        # pylint: disable=no-member
+        self.mem_free = mem_free if mem_free is not None else gc.mem_free
+        self.mem_alloc = mem_alloc if mem_alloc is not None else gc.mem_alloc
+
+    @classmethod
+    def from_board(cls) -> "BadgeHardware":
+        """Sets up the PyBadge's own hardware"""
+
+        # pylint: disable=import-outside-toplevel
+        import board
+        import digitalio
+        import neopixel
+        from keypad import ShiftRegisterKeys, Event
+        from audioio import AudioOut
+        from audiocore import WaveFile
+        from audiomp3 import MP3Decoder
+
+        def open_sound(filename: str, sound_type: str) -> Any:
+            if sound_type == "mp3":
+                return MP3Decoder(open(filename, "rb"))
+            return WaveFile(open(filename, "rb"))
+
+        keys = ShiftRegisterKeys(
+            clock=board.BUTTON_CLOCK,
+            data=board.BUTTON_OUT,
+            latch=board.BUTTON_LATCH,
+            key_count=8,
+            value_when_pressed=True,
+            interval=0.1,
+            max_events=1,
+        )
+        return cls(
+            board.DISPLAY,
+            neopixel.NeoPixel(board.NEOPIXEL, 5, brightness=0.25),
+            keys,
+            AudioOut(board.SPEAKER),
+            digitalio.DigitalInOut(board.SPEAKER_ENABLE),
+            ESP32Network.from_board(),
+            Event,
+            open_sound,
+        )
+
+
+class ESP32Network:
+    """The Wi-Fi connection and web server of the PyBadge's ESP32 AirLift.
+    Setting up the ESP32 resets it, which takes most of a second, so it
+    isn't set up until it is first used.
+
+    :param esp32_factory: Function that sets up and returns the ESP32, as
+        an ``adafruit_esp32spi.ESP_SPIcontrol``
+    """
+
+    def __init__(self, esp32_factory: Callable[[], Any]) -> None:
+
+        self._esp32_factory = esp32_factory
+        self._esp32_device = None
+        self._wifi = None
+
+    @property
+    def _esp32(self) -> Any:
+        if self._esp32_device is None:
+            self._esp32_device = self._esp32_factory()
+        return self._esp32_device
+
+    @classmethod
+    def from_board(cls) -> "ESP32Network":
+        """Sets up the ESP32 AirLift wired to the PyBadge, once it is first
+        used"""
+
+        def setup_esp32() -> Any:
+            # pylint: disable=import-outside-toplevel
+            import board
+            from digitalio import DigitalInOut
+            from adafruit_esp32spi import adafruit_esp32spi
+
+            esp32_cs = DigitalInOut(board.D13)
+            esp32_ready = DigitalInOut(board.D11)
+            esp32_reset = DigitalInOut(board.D12)
+            return adafruit_esp32spi.ESP_SPIcontrol(
+                board.SPI(), esp32_cs, esp32_ready, esp32_reset
+            )
+
+        return cls(setup_esp32)
+
+    def _manager(self, secrets: Dict[str, str]) -> Any:
+        if self._wifi is None:
+            # pylint: disable=import-outside-toplevel
+            import adafruit_esp32spi.adafruit_esp32spi_wifimanager as wifimanager
+
+            self._wifi = wifimanager.ESPSPI_WiFiManager(
+                self._esp32, secrets, attempts=3, debug=True
+            )
+        return self._wifi
+
+    def start_connect(self, secrets: Dict[str, str]) -> None:
+        """Starts connecting to Wi-Fi without waiting for it to connect;
+        check `is_connected` to see when it has, or call `connect` to wait
+        and retry
+
+        :param dict secrets: The secrets, with the Wi-Fi network details
+        """
+
+        self._manager(secrets)
+        self._esp32.wifi_set_passphrase(
+            bytes(secrets["ssid"], "utf-8"), bytes(secrets["password"], "utf-8")
+        )
+
+    def connect(self, secrets: Dict[str, str]) -> None:
+        """Connects to Wi-Fi
+
+        :param dict secrets: The secrets, with the Wi-Fi network details
+        """
+
+        self._manager(secrets).connect()
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether Wi-Fi is connected"""
+        return self._esp32.is_connected
+
+    def reconnect(self) -> None:
+        """Resets Wi-Fi until it is connected again"""
+
+        while not self._esp32.is_connected:
+            self._wifi.reset()
+
+    @property
+    def ip_address(self) -> str:
+        """The IP address, as a string"""
+        return self._esp32.pretty_ip(self._esp32.ip_address)
+
+    def serve(self, application: Any, port: int = 80) -> Any:
+        """Starts a web server for a WSGI application
+
+        :param application: The WSGI application
+        :param int port: (Optional) The port to serve on, default is 80
+        :return: The server, whose ``update_poll()`` handles any incoming
+            request
+        """
+
+        # pylint: disable=import-outside-toplevel
+        import adafruit_esp32spi.adafruit_esp32spi_wsgiserver as server
+
+        server.set_interface(self._esp32)
+        wsgi_server = server.WSGIServer(port, application=application)
+        wsgi_server.start()
+        return wsgi_server
+
+
+def set_hardware(hardware: BadgeHardware) -> None:
+    """Sets the hardware the DisBadge runs on, in place of the PyBadge's
+    own; this must be done before `global_state` is imported
+
+    :param BadgeHardware hardware: The hardware
+    """
+
+    global _hardware  # pylint: disable=global-statement
+    _hardware = hardware
+
+
+def ticks_ms() -> int:
+    """The millisecond clock of the hardware the DisBadge runs on, which
+    can be read before the PyBadge's own hardware is set up
+
+    :return: The time, in milliseconds
+    """
+
+    if _hardware is not None:
+        return _hardware.ticks_ms()
+    # pylint: disable=import-outside-toplevel
+    from supervisor import ticks_ms as supervisor_ticks_ms
+
+    return supervisor_ticks_ms()
+
+
+def get_hardware() -> BadgeHardware:
+    """Gets the hardware the DisBadge runs on, setting up the PyBadge's
+    own hardware the first time if no other hardware has been set"""
+
+    global _hardware  # pylint: disable=global-statement
+    if _hardware is None:
+        _hardware = BadgeHardware.from_board()
+    return _hardware
@@ -0,0 +1,207 @@
+"""
+`message_queue`
+====================================================
+
+Fixed-capacity queue and history of received Discord messages
+
+* Author(s): Alec Delaney
+
+"""
+
+from shared import messages
+from shared.uri_codec import iter_decode_payload
+from shared.record_codec import read_record, iter_records
+from shared.bitmap_codec import read_bitmap
+
+try:
+    from typing import Iterator, Optional
+    from io import StringIO
+except ImportError:
+    pass
+
+
+class MessageRecord(messages.DiscordMessageBase):
+    """A received Discord message, stored as plain data without any
+    display objects"""
+
+    bitmap = None
+    """The width, height, and packed pixels of the message if it was
+    rendered by the Raspberry Pi, otherwise None"""
+
+    trace_id = None
+    """The trace ID sent with the message by the Raspberry Pi, if any"""
+
+    trace_slot = -1
+    """The slot of the message in a `trace_log.TraceLog`, if it is traced"""
+
+    def from_json(self, payload: StringIO) -> None:
+        """Reads the message from a URI encoded form payload.  The payload
+        must have keys for 'message', 'user', and 'cmdtype', and may have
+        'prewrapped' if the message has already been wrapped and 'trace' if
+        it is being traced
+
+        :param StringIO payload: The payload string
+        """
+
+        self._prewrapped = False
+        for key, value in iter_decode_payload(payload):
+            if key == "message":
+                self._message = value
+            elif key == "user":
+                self._user = value
+            elif key == "cmdtype":
+                self._cmd_type = int(value)
+            elif key == "prewrapped":
+                self._prewrapped = value == "1"
+            elif key == "trace":
+                self.trace_id = int(value)
+
+    def from_record(self, payload: StringIO) -> None:
+        """Reads the message from a compact record (see
+        `shared.record_codec`)
+
+        :param StringIO payload: The payload string
+        """
+
+        (
+            self._message,
+            self._user,
+            self._cmd_type,
+            self._prewrapped,
+            self.trace_id,
+        ) = read_record(payload)
+
+    def from_bitmap(self, payload: StringIO) -> None:
+        """Reads the message from a compact record followed by the message
+        rendered as a bitmap (see `shared.bitmap_codec`)
+
+        :param StringIO payload: The payload string
+        """
+
+        self.from_record(payload)
+        self.bitmap = read_bitmap(payload)
+
+    @classmethod
+    def iter_from_records(cls, payload: StringIO) -> Iterator["MessageRecord"]:
+        """Reads every compact record in a payload, such as the body of a
+        batch of messages
+
+        :param StringIO payload: The payload string
+        :return: An iterator of the messages
+        :rtype: Iterator[MessageRecord]
+        """
+
+        for message, user, cmd_type, prewrapped, trace_id in iter_records(payload):
+            record = cls(message, user, cmd_type, prewrapped)
+            record.trace_id = trace_id
+            yield record
+
+
+# pylint: disable=too-many-instance-attributes
+class MessageQueue:
+    """A ring buffer of received messages.  Messages that have not been
+    shown yet are pending, and are taken in the order they arrived; the
+    buffer also serves as a history of shown messages that can be browsed.
+    Once full, the oldest message is overwritten, even if it is still
+    pending.
+
+    :param int capacity: The maximum number of messages to hold
+    """
+
+    def __init__(self, capacity: int) -> None:
+
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+
+        self._records = [None] * capacity
+        self._capacity = capacity
+        self._write_index = 0
+        self._count = 0
+        self._pending = 0
+        self._cursor = 0
+
+        self.received = 0
+        """The total number of messages added to the queue"""
+
+        self.dropped = 0
+        """The number of pending messages overwritten before being shown"""
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _index(self, age: int) -> int:
+        """The buffer index of the message ``age`` places before the newest"""
+        return (self._write_index - 1 - age) % self._capacity
+
+    def push(self, record: MessageRecord) -> None:
+        """Adds a newly received message to the queue
+
+        :param MessageRecord record: The received message
+        """
+
+        if self._pending == self._capacity:
+            self.dropped += 1
+        else:
+            self._pending += 1
+        self._records[self._write_index] = record
+        self._write_index = (self._write_index + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+        # Keep the history cursor on the same message as it ages
+        self._cursor = min(self._cursor + 1, self._count - 1)
+        self.received += 1
+
+    @property
+    def pending(self) -> int:
+        """The number of messages that have not been shown yet"""
+        return self._pending
+
+    @property
+    def space(self) -> int:
+        """The number of messages that can be added without overwriting
+        one that has not been shown yet"""
+        return self._capacity - self._pending
+
+    def pop_pending(self) -> Optional[MessageRecord]:
+        """Takes the oldest message that has not been shown yet, and moves
+        the history cursor to it
+
+        :return: The message, or None if there are no pending messages
+        :rtype: MessageRecord|None
+        """
+
+        if not self._pending:
+            return None
+        self._pending -= 1
+        self._cursor = self._pending
+        return self._records[self._index(self._cursor)]
+
+    @property
+    def current(self) -> Optional[MessageRecord]:
+        """The message at the history cursor"""
+        if not self._count:
+            return None
+        return self._records[self._index(self._cursor)]
+
+    def older(self) -> Optional[MessageRecord]:
+        """Moves the history cursor to the previous shown message
+
+        :return: The message, or None if already at the oldest message
+        :rtype: MessageRecord|None
+        """
+
+        if self._cursor + 1 >= self._count:
+            return None
+        self._cursor += 1
+        return self._records[self._index(self._cursor)]
+
+    def newer(self) -> Optional[MessageRecord]:
+        """Moves the history cursor to the next shown message
+
+        :return: The message, or None if already at the newest shown message
+        :rtype: MessageRecord|None
+        """
+
+        if self._cursor <= self._pending:
+            return None
+        self._cursor -= 1
+        return self._records[self._index(self._cursor)]
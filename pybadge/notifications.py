@@ -0,0 +1,126 @@
+"""
+`notifications`
+====================================================
+
+Non-blocking playback of notification sounds, advanced by calling
+`NotificationPlayer.tick` from the main loop
+
+* Author(s): Alec Delaney
+
+"""
+
+import time
+
+try:
+    from typing import Any, Callable, Optional
+except ImportError:
+    pass
+
+
+# pylint: disable=too-few-public-methods
+class NotificationStates:
+    """Enum-like class for the state of notification playback"""
+
+    IDLE = 0
+    PLAYING = 1
+    MUTED = 2
+
+
+# pylint: disable=too-many-instance-attributes
+class NotificationPlayer:
+    """State machine that plays notification sounds without blocking
+
+    :param audio: The audio output, such as an ``audioio.AudioOut``
+    :param sound_loader: Function that takes a sound ID and returns the
+        sound to play
+    :param speaker_enable: (Optional) The pin that enables the external
+        speaker, default is None
+    :param float muted_duration: (Optional) How long a notification lasts
+        when muted, in seconds; default is 4
+    :param monotonic: (Optional) The clock function, default is
+        ``time.monotonic``
+    :param bool release_sounds: (Optional) Whether to release each sound
+        once it has played, default is True.  Turn this off if the sound
+        loader reuses its sounds.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        audio: Any,
+        sound_loader: Callable[[int], Any],
+        speaker_enable: Optional[Any] = None,
+        muted_duration: float = 4,
+        monotonic: Callable[[], float] = time.monotonic,
+        release_sounds: bool = True,
+    ) -> None:
+
+        self._audio = audio
+        self._sound_loader = sound_loader
+        self._speaker_enable = speaker_enable
+        self._muted_duration = muted_duration
+        self._monotonic = monotonic
+        self._release_sounds = release_sounds
+
+        self._state = NotificationStates.IDLE
+        self._sound = None
+        self._end_time = 0.0
+
+    @property
+    def state(self) -> int:
+        """The current state, as a `NotificationStates` value"""
+        return self._state
+
+    @property
+    def playing(self) -> bool:
+        """Whether a notification is currently playing"""
+        return self._state != NotificationStates.IDLE
+
+    def start(self, sound_id: int, muted: bool = False) -> None:
+        """Starts playing a notification, stopping any that is playing
+
+        :param int sound_id: The id of the notification sound
+        :param bool muted: (Optional) Whether to wait silently for the
+            muted duration instead of playing the sound, default is False
+        """
+
+        self.stop()
+        if muted:
+            self._end_time = self._monotonic() + self._muted_duration
+            self._state = NotificationStates.MUTED
+            return
+
+        self._sound = self._sound_loader(sound_id)
+        if self._speaker_enable is not None:
+            self._speaker_enable.value = True
+        self._audio.play(self._sound)
+        self._state = NotificationStates.PLAYING
+
+    def tick(self) -> bool:
+        """Advances playback, finishing the notification once the sound
+        has played
+
+        :return: Whether the notification is still playing
+        :rtype: bool
+        """
+
+        if self._state == NotificationStates.PLAYING:
+            if not self._audio.playing:
+                self.stop()
+        elif self._state == NotificationStates.MUTED:
+            if self._monotonic() >= self._end_time:
+                self.stop()
+        return self.playing
+
+    def stop(self) -> None:
+        """Stops the current notification, if any"""
+
+        if self._state == NotificationStates.PLAYING:
+            if self._audio.playing:
+                self._audio.stop()
+            if self._speaker_enable is not None:
+                self._speaker_enable.value = False
+            if self._release_sounds:
+                self._sound.deinit()
+            self._sound = None
+        self._state = NotificationStates.IDLE
@@ -9,12 +9,13 @@ displayio.Group
 
 """
 
+import io
 import displayio
+import bitmaptools
 from adafruit_display_text.label import Label
-from adafruit_bitmap_font import bitmap_font
 from shared import layout, messages
-from shared.uri_codec import decode_payload
-
+from message_queue import MessageRecord
+import assets
 
 try:
     import typing  # pylint: disable=unused-import
@@ -22,13 +23,31 @@ try:
 except ImportError:
     pass
 
-# Load the title font
-TITLE_FONTNAME = "/fonts/cherry-13-b.bdf"
-TITLE_FONT = bitmap_font.load_font(TITLE_FONTNAME)
+# The fonts are loaded on first use, see `assets`
+TITLE_FONTNAME = "fonts/cherry-13-b.bdf"
+MESSAGE_FONTNAME = "fonts/cherry-11-r.bdf"
+
+MESSAGE_WRAPPER = None
+"""The wrapper for message text, built by `load_message_wrapper`"""
+
+MESSAGE_WIDTH = layout.MESSAGE_WIDTH
+"""The width available to the message text, in pixels"""
+
+
+def load_message_wrapper() -> layout.PixelWrapper:
+    """Builds the wrapper for message text from the glyph widths of the
+    message font, or gets it if it has already been built
 
-# Load the message font
-MESSAGE_FONTNAME = "/fonts/cherry-11-r.bdf"
-MESSAGE_FONT = bitmap_font.load_font(MESSAGE_FONTNAME)
+    :return: The wrapper
+    :rtype: PixelWrapper
+    """
+
+    global MESSAGE_WRAPPER  # pylint: disable=global-statement
+    if MESSAGE_WRAPPER is None:
+        MESSAGE_WRAPPER = layout.PixelWrapper(
+            layout.GlyphWidths.from_bdf(MESSAGE_FONTNAME)
+        )
+    return MESSAGE_WRAPPER
 
 
 # pylint: disable=too-many-instance-attributes,abstract-method
@@ -46,7 +65,7 @@ class DiscordMessageGroup(displayio.Group, messages.DiscordMessageBase):
         for text color, default is True
     """
 
-    max_lines = 5
+    max_lines = layout.MESSAGE_MAX_LINES
     """The max number of lines the message can be"""
 
     def __init__(
@@ -62,12 +81,17 @@ class DiscordMessageGroup(displayio.Group, messages.DiscordMessageBase):
         self._text_color = 0xFFFFFF if dark_mode else 0x000000
         self._message_label = None
         self._username_label = None
+        self._bitmap = None
+        self._bitmap_grid = None
+        self._bitmap_palette = displayio.Palette(2)
+        self._bitmap_palette[1] = self._text_color
+        self._bitmap_palette.make_transparent(0)
         self._cmd_type = cmd_type
+        self._prewrapped = False
 
         self._user = user
         self._message = message
-        self.user = self._user
-        self.message = self._message
+        self._wrapped_message = None
 
     @property
     def user(self) -> str:
@@ -80,13 +104,7 @@ class DiscordMessageGroup(displayio.Group, messages.DiscordMessageBase):
         self._user = name
 
         if self._username_label:
-            self.remove(self._username_label)
-
-        self._username_label = Label(
-            TITLE_FONT, text=self.username, color=self._text_color, y=8
-        )
-        self.append(self._username_label)
-        self._message_label = None
+            self._username_label.text = self.username
 
     @property
     def message(self) -> str:
@@ -97,27 +115,114 @@ class DiscordMessageGroup(displayio.Group, messages.DiscordMessageBase):
     def message(self, text: str) -> None:
 
         self._message = text
+        self._wrapped_message = None
 
         if self._message_label:
-            self.remove(self._message_label)
+            self._message_label.text = self.wrapped_message
 
-        message_lines = layout.wrap_text(text, 26)
-        self._wrapped_message = "\n".join(message_lines[: self.max_lines])
+    @property
+    def wrapped_message(self) -> str:
+        """The message as it is displayed, wrapped to the screen width and
+        truncated to `max_lines` lines.  Messages that were wrapped by the
+        Raspberry Pi are displayed as-is."""
+        if self._wrapped_message is None:
+            if self._prewrapped:
+                self._wrapped_message = self._message
+            else:
+                message_lines = load_message_wrapper().wrap(
+                    self._message, MESSAGE_WIDTH, self.max_lines
+                )
+                self._wrapped_message = "\n".join(message_lines)
+        return self._wrapped_message
+
+    def refresh(self) -> None:
+        """Creates the labels for the username and message the first time
+        the message is displayed; afterwards, the labels are updated as
+        the message changes"""
+
+        if self._bitmap_grid is not None:
+            self._bitmap_grid.hidden = True
+        if self._username_label is None:
+            self._username_label = Label(
+                assets.load_font(TITLE_FONTNAME),
+                text=self.username,
+                color=self._text_color,
+                y=8,
+            )
+            self.append(self._username_label)
+        if self._message_label is None:
+            self._message_label = Label(
+                assets.load_font(MESSAGE_FONTNAME),
+                text=self.wrapped_message,
+                color=self._text_color,
+                y=32,
+            )
+            self.append(self._message_label)
+        self._username_label.hidden = False
+        self._message_label.hidden = False
+
+    def _show_bitmap(self, width: int, height: int, pixels: bytes) -> None:
+        """Displays a message rendered by the Raspberry Pi in place of the
+        labels, reusing the bitmap if it is the same size"""
+
+        if (
+            self._bitmap is None
+            or self._bitmap.width != width
+            or self._bitmap.height != height
+        ):
+            if self._bitmap_grid is not None:
+                self.remove(self._bitmap_grid)
+            self._bitmap = displayio.Bitmap(width, height, 2)
+            self._bitmap_grid = displayio.TileGrid(
+                self._bitmap, pixel_shader=self._bitmap_palette
+            )
+            self.append(self._bitmap_grid)
+        bitmaptools.readinto(self._bitmap, io.BytesIO(pixels), bits_per_pixel=1)
+        self._bitmap_grid.hidden = False
+        if self._username_label is not None:
+            self._username_label.hidden = True
+            self._message_label.hidden = True
+
+    def from_message(self, record: messages.DiscordMessageBase) -> None:
+        """Displays the contents of another message, such as a
+        `MessageRecord` taken from the message queue, reusing this group's
+        labels.  Messages rendered by the Raspberry Pi are displayed as a
+        bitmap instead, without updating the labels.
+
+        :param DiscordMessageBase record: The message to display
+        """
 
-        self._message_label = Label(
-            MESSAGE_FONT, text=self._wrapped_message, color=self._text_color, y=32
-        )
-        self.append(self._message_label)
+        self._prewrapped = record.prewrapped
+        self._cmd_type = record.cmd_type
+        bitmap = getattr(record, "bitmap", None)
+        if bitmap is not None:
+            self._message = record.message
+            self._user = record.user
+            self._wrapped_message = None
+            self._show_bitmap(*bitmap)
+            return
+        self.message = record.message
+        self.user = record.user
+        self.refresh()
 
     def from_json(self, payload: StringIO) -> None:
-        """Turns a dict into a DiscordMessageGroup.  The dict must have keys
-        for 'message', 'user', and 'cmd_type'
+        """Turns a URI encoded form payload into a DiscordMessageGroup.  The
+        payload must have keys for 'message', 'user', and 'cmdtype'
+
+        :param StringIO payload: The payload string
+        """
+
+        record = MessageRecord()
+        record.from_json(payload)
+        self.from_message(record)
+
+    def from_record(self, payload: StringIO) -> None:
+        """Turns a compact record (see `shared.record_codec`) into a
+        DiscordMessageGroup
 
         :param StringIO payload: The payload string
         """
 
-        payload = payload.read()
-        dict_object = decode_payload(payload)
-        self.message = dict_object["message"]
-        self.user = dict_object["user"]
-        self._cmd_type = int(dict_object["cmdtype"])
+        record = MessageRecord()
+        record.from_record(payload)
+        self.from_message(record)
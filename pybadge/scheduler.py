@@ -0,0 +1,166 @@
+"""
+`scheduler`
+====================================================
+
+Tick-based cooperative scheduler for the main loop, which runs each task
+at its own rate and records how late and how long each task runs
+
+* Author(s): Alec Delaney
+
+"""
+
+import time
+
+try:
+    from typing import Callable, Dict, Optional, Tuple
+except ImportError:
+    pass
+
+
+# pylint: disable=too-few-public-methods
+class Task:
+    """A periodic task run by the `Scheduler`
+
+    :param str name: The name of the task
+    :param callback: The function to run
+    :param float interval: The time between runs, in seconds
+    """
+
+    def __init__(self, name: str, callback: Callable[[], None], interval: float):
+
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.next_run = 0.0
+
+        self.runs = 0
+        """The number of times the task has run"""
+
+        self.worst_latency = 0.0
+        """The longest the task has started after it was due, in seconds"""
+
+        self.worst_duration = 0.0
+        """The longest the task has taken to run, in seconds"""
+
+
+class Scheduler:
+    """Runs tasks at their configured rates, sleeping when none are due
+
+    :param monotonic: (Optional) The clock function, default is
+        ``time.monotonic``
+    :param sleep: (Optional) The sleep function, default is ``time.sleep``
+    """
+
+    def __init__(
+        self,
+        monotonic: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+
+        self._monotonic = monotonic
+        self._sleep = sleep
+        self._tasks = []
+
+        self.passes = 0
+        """The number of passes made over the tasks"""
+
+    def add_task(
+        self, name: str, callback: Callable[[], None], interval: float
+    ) -> Task:
+        """Adds a task, which is first run on the next pass
+
+        :param str name: The name of the task
+        :param callback: The function to run
+        :param float interval: The time between runs, in seconds; 0 runs
+            the task on every pass
+        """
+
+        task = Task(name, callback, interval)
+        task.next_run = self._monotonic()
+        self._tasks.append(task)
+        return task
+
+    def remove_task(self, name: str) -> None:
+        """Removes a task, which can be done from within a task
+
+        :param str name: The name of the task
+        """
+
+        # Replace the list rather than changing it, as it may be being run
+        self._tasks = [task for task in self._tasks if task.name != name]
+
+    def get_task(self, name: str) -> Optional[Task]:
+        """Gets a task by name
+
+        :param str name: The name of the task
+        """
+
+        for task in self._tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def set_interval(self, name: str, interval: float) -> None:
+        """Changes the rate of a task
+
+        :param str name: The name of the task
+        :param float interval: The time between runs, in seconds
+        """
+
+        task = self.get_task(name)
+        if task is None:
+            raise ValueError("No task named {}".format(name))
+        task.next_run += interval - task.interval
+        task.interval = interval
+
+    def run_once(self) -> float:
+        """Runs every task that is due
+
+        :return: The time until the next task is due, in seconds
+        :rtype: float
+        """
+
+        self.passes += 1
+        for task in self._tasks:
+            start = self._monotonic()
+            if start < task.next_run:
+                continue
+            latency = start - task.next_run
+            task.callback()
+            end = self._monotonic()
+            task.runs += 1
+            task.worst_latency = max(task.worst_latency, latency)
+            task.worst_duration = max(task.worst_duration, end - start)
+            task.next_run += task.interval
+            if task.next_run < end:
+                # Don't try to catch up on missed runs
+                task.next_run = end + task.interval
+
+        now = self._monotonic()
+        wait = min(task.next_run for task in self._tasks) - now
+        return wait if wait > 0 else 0.0
+
+    def run(self) -> None:
+        """Runs the tasks forever"""
+
+        while True:
+            wait = self.run_once()
+            if wait:
+                self._sleep(wait)
+
+    def task_stats(self) -> Dict[str, Tuple[int, float, float]]:
+        """The number of runs, worst latency, and worst duration of each
+        task, by name"""
+        return {
+            task.name: (task.runs, task.worst_latency, task.worst_duration)
+            for task in self._tasks
+        }
+
+    def reset_stats(self) -> None:
+        """Resets the recorded statistics"""
+
+        self.passes = 0
+        for task in self._tasks:
+            task.runs = 0
+            task.worst_latency = 0.0
+            task.worst_duration = 0.0
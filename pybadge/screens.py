@@ -9,10 +9,10 @@ Screens that are generated as part of the Discord PyBadge program
 """
 
 import displayio
-from adafruit_bitmap_font import bitmap_font
 import adafruit_imageload
 from adafruit_display_text.label import Label
-from pybadge_messages import MESSAGE_FONT
+from pybadge_messages import MESSAGE_FONTNAME
+import assets
 
 try:
     from typing import Tuple
@@ -23,9 +23,33 @@ except ImportError:
 SCREEN_HEIGHT = 128
 SCREEN_WIDTH = 160
 
-# Load the splash font
-SPLASH_FONTNAME = "/fonts/Noto-18.bdf"
-SPLASH_FONT = bitmap_font.load_font(SPLASH_FONTNAME)
+# The splash font is loaded on first use, see `assets`
+SPLASH_FONTNAME = "fonts/Noto-18.bdf"
+
+
+def bitmap_byte_size(width: int, height: int, value_count: int) -> int:
+    """Estimates the memory used by a displayio.Bitmap, which stores each
+    row as whole 32-bit words
+
+    :param int width: The width of the bitmap
+    :param int height: The height of the bitmap
+    :param int value_count: The number of values (colors) in the bitmap
+    """
+
+    bits_per_value = 1
+    while (1 << bits_per_value) < value_count:
+        bits_per_value *= 2
+    return (width * bits_per_value + 31) // 32 * 4 * height
+
+
+def label_byte_size(label: Label) -> int:
+    """Estimates the memory used by the rendered text of a label
+
+    :param Label label: The label
+    """
+
+    _, _, width, height = label.bounding_box
+    return bitmap_byte_size(width, height, 2)
 
 
 class SplashBackground(displayio.Group):
@@ -50,6 +74,11 @@ class SplashBackground(displayio.Group):
 
         self.append(self._bg)
 
+    @property
+    def byte_size(self) -> int:
+        """An estimate of the memory used by the screen's bitmaps"""
+        return bitmap_byte_size(SCREEN_WIDTH, SCREEN_HEIGHT, 1)
+
 
 class TextSplashScreen(displayio.Group):
     """A splash screen with a text label in the center
@@ -67,11 +96,23 @@ class TextSplashScreen(displayio.Group):
         self._text = text
         self._text_color = text_color
 
-        self._label = Label(SPLASH_FONT, text=text, color=self._text_color)
+        self._label = Label(
+            assets.load_font(SPLASH_FONTNAME), text=text, color=self._text_color
+        )
         self._label.x = (SCREEN_WIDTH - self._label.width) // 2
         self._label.y = (SCREEN_HEIGHT - self._label.height) // 2
         self.append(self._label)
 
+    @property
+    def screen_id(self) -> int:
+        """The ID of this splash screen"""
+        return self._screen_id
+
+    @property
+    def byte_size(self) -> int:
+        """An estimate of the memory used by the screen's text"""
+        return label_byte_size(self._label)
+
 
 class LabeledTextSplashScreen(displayio.Group):
     """A TextSplashScreen with a label for the given text
@@ -91,11 +132,22 @@ class LabeledTextSplashScreen(displayio.Group):
         self._screen_id = screen_id
         self._text = message
         self._text_color = text_color
-        self._label_label = Label(MESSAGE_FONT, text=label, color=self._text_color)
+        message_font = assets.load_font(MESSAGE_FONTNAME)
+        self._label_label = Label(message_font, text=label, color=self._text_color)
         self._label_label.x = (SCREEN_WIDTH - self._label_label.width) // 2
         self._label_label.y = SCREEN_HEIGHT // 2 - self._label_label.height
-        self._message_label = Label(MESSAGE_FONT, text=message, color=self._text_color)
+        self._message_label = Label(message_font, text=message, color=self._text_color)
         self._message_label.x = (SCREEN_WIDTH - self._message_label.width) // 2
         self._message_label.y = SCREEN_HEIGHT // 2
         self.append(self._label_label)
         self.append(self._message_label)
+
+    @property
+    def screen_id(self) -> int:
+        """The ID of this splash screen"""
+        return self._screen_id
+
+    @property
+    def byte_size(self) -> int:
+        """An estimate of the memory used by the screen's text"""
+        return label_byte_size(self._label_label) + label_byte_size(self._message_label)
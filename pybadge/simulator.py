@@ -0,0 +1,344 @@
+"""
+`simulator`
+====================================================
+
+Headless simulator that runs the DisBadge's ``code.py`` under CPython on
+Linux.  The PyBadge's hardware is replaced by the stand-ins in `fakes`,
+the CircuitPython display and animation libraries by lightweight fakes,
+and time by a `fakes.VirtualClock`, so the main loop runs
+deterministically and as fast as the host allows.  The simulator counts
+heap allocations and bitmap memory while it runs, so that performance
+regressions can be caught without a PyBadge.
+
+Run from the repository root with ``python3 pybadge/simulator.py``
+
+* Author(s): Alec Delaney
+
+"""
+
+import contextlib
+import importlib.util
+import os
+import sys
+import tracemalloc
+import types
+
+PYBADGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIRECTORY = os.path.dirname(PYBADGE_DIRECTORY)
+for _directory in (REPOSITORY_DIRECTORY, PYBADGE_DIRECTORY):
+    if _directory not in sys.path:
+        sys.path.insert(0, _directory)
+
+# pylint: disable=wrong-import-position
+import hal
+from fakes import (
+    FakeAnimation,
+    FakeAudioOut,
+    FakeBitmap,
+    FakeDisplay,
+    FakeEvent,
+    FakeFont,
+    FakeGroup,
+    FakeKeys,
+    FakeLabel,
+    FakeNeoPixels,
+    FakeNetwork,
+    FakePalette,
+    FakePin,
+    FakeRequest,
+    FakeSound,
+    FakeTileGrid,
+    FakeWSGIApp,
+    VirtualClock,
+)
+
+try:
+    from typing import Any, Dict, Tuple
+except ImportError:
+    pass
+
+HEAP_SIZE = 192 * 1024
+"""The heap size the simulated ``gc.mem_free`` is reported against,
+roughly the RAM of the PyBadge's SAMD51.  CPython objects are larger
+than CircuitPython's, so only changes in heap use are meaningful."""
+
+_KEEP_MODULES = ("hal", "fakes", "simulator")
+
+
+def _readinto(bitmap: FakeBitmap, stream: Any, **_kwargs) -> None:
+    bitmap.readinto(stream)
+
+
+def _not_simulated(*_args, **_kwargs) -> None:
+    raise NotImplementedError("Not supported by the simulator")
+
+
+@contextlib.contextmanager
+def _on_circuitpy_drive():
+    # Fonts and sounds are loaded relative to the CIRCUITPY drive
+    working_directory = os.getcwd()
+    os.chdir(PYBADGE_DIRECTORY)
+    try:
+        yield
+    finally:
+        os.chdir(working_directory)
+
+
+def install_fake_modules() -> None:
+    """Installs the fakes in place of the CircuitPython modules and
+    libraries that the DisBadge imports outside of `hal`"""
+
+    modules = {
+        "displayio": {
+            "Group": FakeGroup,
+            "Bitmap": FakeBitmap,
+            "Palette": FakePalette,
+            "TileGrid": FakeTileGrid,
+        },
+        "bitmaptools": {"readinto": _readinto},
+        "adafruit_bitmap_font": {},
+        "adafruit_bitmap_font.bitmap_font": {"load_font": FakeFont},
+        "adafruit_display_text": {},
+        "adafruit_display_text.label": {"Label": FakeLabel},
+        "adafruit_imageload": {"load": _not_simulated},
+        "adafruit_led_animation": {},
+        "adafruit_led_animation.color": {"RED": (255, 0, 0), "BLACK": (0, 0, 0)},
+        "adafruit_led_animation.animation": {"Animation": FakeAnimation},
+        "adafruit_led_animation.animation.solid": {"Solid": FakeAnimation},
+        "adafruit_led_animation.animation.pulse": {"Pulse": FakeAnimation},
+        "adafruit_led_animation.animation.rainbow": {"Rainbow": FakeAnimation},
+        "adafruit_led_animation.animation.rainbowsparkle": {
+            "RainbowSparkle": FakeAnimation
+        },
+        "adafruit_wsgi": {},
+        "adafruit_wsgi.wsgi_app": {"WSGIApp": FakeWSGIApp},
+        "adafruit_wsgi.request": {"Request": FakeRequest},
+        "shared.secrets": {"secrets": {}},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent in modules:
+            setattr(sys.modules[parent], child, module)
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class SimulationStats:
+    """What happened during a call to `Simulator.run`"""
+
+    def __init__(self) -> None:
+
+        self.duration = 0.0
+        """The simulated time, in seconds"""
+
+        self.passes = 0
+        """The number of passes of the main loop"""
+
+        self.allocated_blocks = 0
+        """The net number of heap blocks allocated"""
+
+        self.peak_heap = 0
+        """The most heap memory in use at once, in bytes"""
+
+        self.bitmaps = 0
+        """The number of bitmaps created"""
+
+        self.bitmap_bytes = 0
+        """The number of bytes allocated for bitmaps"""
+
+        self.live_bitmap_bytes = 0
+        """The number of bytes used by bitmaps at the end"""
+
+        self.tasks: Dict[str, Tuple[int, float, float]] = {}
+        """The number of runs, worst latency, and worst duration of each
+        main loop task since the simulator started, by name.  Time only
+        passes on the virtual clock while the main loop sleeps, so these
+        show how tasks are scheduled rather than how long they take."""
+
+    def __str__(self) -> str:
+        lines = [
+            "{:.1f}s simulated, {} passes".format(self.duration, self.passes),
+            "heap: {} blocks allocated, {} bytes peak".format(
+                self.allocated_blocks, self.peak_heap
+            ),
+            "bitmaps: {} created, {} bytes allocated, {} bytes live".format(
+                self.bitmaps, self.bitmap_bytes, self.live_bitmap_bytes
+            ),
+        ]
+        for name, (runs, latency, duration) in self.tasks.items():
+            lines.append(
+                "{:>8}: {:>6} runs, worst latency {:.1f} ms, "
+                "worst duration {:.1f} ms".format(
+                    name, runs, latency * 1000, duration * 1000
+                )
+            )
+        return "\n".join(lines)
+
+
+# pylint: disable=too-many-instance-attributes
+class Simulator:
+    """Runs the DisBadge's ``code.py`` on simulated hardware.  Requests are
+    made with `request` and buttons pressed with `press`, and are handled
+    as the main loop runs during `run`.
+
+    :param float sound_duration: (Optional) How long each notification
+        sound plays for, in seconds; default is 2
+    """
+
+    def __init__(self, sound_duration: float = 2.0) -> None:
+
+        self.clock = VirtualClock()
+        self.display = FakeDisplay()
+        self.keys = FakeKeys()
+        self.neopixels = FakeNeoPixels()
+        self.audio = FakeAudioOut(self.clock)
+        self.network = FakeNetwork()
+        self.sound_duration = sound_duration
+        self.hardware = hal.BadgeHardware(
+            self.display,
+            self.neopixels,
+            self.keys,
+            self.audio,
+            FakePin(),
+            self.network,
+            FakeEvent,
+            self._open_sound,
+            monotonic=self.clock,
+            sleep=self.clock.advance,
+            ticks_ms=self._ticks_ms,
+            mem_free=self._mem_free,
+            mem_alloc=self._mem_alloc,
+        )
+        self.code = None
+        """The loaded ``code.py`` module"""
+
+    def _open_sound(self, filename: str, sound_type: str) -> FakeSound:
+        # pylint: disable=unused-argument
+        return FakeSound(self.sound_duration)
+
+    def _ticks_ms(self) -> int:
+        return int(self.clock.now * 1000)
+
+    @staticmethod
+    def _mem_alloc() -> int:
+        return tracemalloc.get_traced_memory()[0]
+
+    def _mem_free(self) -> int:
+        return HEAP_SIZE - self._mem_alloc()
+
+    def start(self) -> None:
+        """Runs ``code.py`` up to its main loop, activating the DisBadge as
+        the Raspberry Pi would"""
+
+        install_fake_modules()
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None) or ""
+            if (
+                os.path.dirname(os.path.abspath(module_file)) == PYBADGE_DIRECTORY
+                and name not in _KEEP_MODULES
+            ):
+                del sys.modules[name]
+        hal.set_hardware(self.hardware)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        FakeBitmap.reset_counts()
+
+        # code.py waits to be activated before starting its main loop
+        self.request("POST", "/activate")
+        spec = importlib.util.spec_from_file_location(
+            "disbadge_code", os.path.join(PYBADGE_DIRECTORY, "code.py")
+        )
+        self.code = importlib.util.module_from_spec(spec)
+        with _on_circuitpy_drive():
+            spec.loader.exec_module(self.code)
+
+    def request(
+        self, method: str, path: str, body: str = "", content_type: str = ""
+    ) -> None:
+        """Makes a request to the DisBadge, which is handled as the main
+        loop runs; responses are added to ``network.responses``
+
+        :param str method: The HTTP method
+        :param str path: The path
+        :param str body: (Optional) The request body, default is empty
+        :param str content_type: (Optional) The content type, default is
+            none
+        """
+
+        self.network.request(method, path, body, content_type)
+
+    def press(self, button: int) -> None:
+        """Presses and releases a button
+
+        :param int button: The button, as a `states.Buttons` value
+        """
+
+        self.keys.press(button)
+
+    def run(self, seconds: float) -> SimulationStats:
+        """Runs the main loop for an amount of simulated time
+
+        :param float seconds: The amount of time to run for
+        :return: What happened while running
+        :rtype: SimulationStats
+        """
+
+        if self.code is None:
+            self.start()
+        scheduler = self.code.scheduler
+        start_passes = scheduler.passes
+        FakeBitmap.reset_counts()
+        tracemalloc.reset_peak()
+        start_blocks = sys.getallocatedblocks()
+        end = self.clock.now + seconds
+        with _on_circuitpy_drive():
+            while self.clock.now < end:
+                wait = scheduler.run_once()
+                if not wait:
+                    # Always move forward, so a task that is always due can't stall
+                    wait = 0.001
+                self.clock.advance(min(wait, end - self.clock.now))
+
+        stats = SimulationStats()
+        stats.duration = seconds
+        stats.passes = scheduler.passes - start_passes
+        stats.allocated_blocks = sys.getallocatedblocks() - start_blocks
+        stats.peak_heap = tracemalloc.get_traced_memory()[1]
+        stats.bitmaps = FakeBitmap.created
+        stats.bitmap_bytes = FakeBitmap.allocated_bytes
+        stats.live_bitmap_bytes = FakeBitmap.live_bytes
+        stats.tasks = scheduler.task_stats()
+        return stats
+
+
+def main() -> None:
+    """Simulates the DisBadge receiving a few messages and prints what
+    happened"""
+
+    # pylint: disable=import-outside-toplevel
+    from shared.messages import CommandType
+    from shared.record_codec import RECORD_CONTENT_TYPE, encode_record
+
+    simulator = Simulator()
+    simulator.start()
+    print("Idle:")
+    print(simulator.run(5))
+    for index, cmd_type in enumerate(
+        (CommandType.PING, CommandType.CHEER, CommandType.HYPE)
+    ):
+        simulator.request(
+            "POST",
+            "/message",
+            encode_record(
+                "Message number {}".format(index), "User#0001", cmd_type
+            ).decode(),
+            RECORD_CONTENT_TYPE,
+        )
+    print("Three messages:")
+    print(simulator.run(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+`startup`
+====================================================
+
+Staged boot for the DisBadge.  Only what the first splash screen needs
+is loaded before it is shown; the rest of the fonts, sounds and LED
+animations are loaded one step at a time while Wi-Fi connects and from
+the main loop.  The time each milestone is reached and each step takes
+is recorded, so that time-to-first-pixel and time-to-ready can be
+tracked.
+
+* Author(s): Alec Delaney
+
+"""
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    from trace_log import monotonic_ms as ticks_ms
+
+try:
+    from typing import Callable
+except ImportError:
+    pass
+
+# supervisor.ticks_ms() wraps around at 2**29
+_TICKS_MASK = (1 << 29) - 1
+
+_UNREACHED = -1
+
+
+# pylint: disable=too-few-public-methods
+class BootStages:
+    """Enum-like class for the milestones of booting, in the order they
+    are normally reached"""
+
+    FIRST_PIXEL = 0
+    CONNECTED = 1
+    SERVING = 2
+    ACTIVATED = 3
+    READY = 4
+
+    COUNT = 5
+    NAMES = ("first_pixel", "connected", "serving", "activated", "ready")
+
+
+class BootSequence:
+    """Times the milestones of booting, and runs the steps that load the
+    DisBadge's assets one at a time
+
+    :param clock: (Optional) The clock function, returning milliseconds;
+        default is ``supervisor.ticks_ms``
+    """
+
+    def __init__(self, clock: Callable[[], int] = ticks_ms) -> None:
+
+        self._clock = clock
+        self._started = clock()
+        self._milestones = [_UNREACHED] * BootStages.COUNT
+        self._steps = []
+        self._next_step = 0
+        self._step_times = []
+
+    def elapsed(self) -> int:
+        """The time since booting started, in milliseconds"""
+        return (self._clock() - self._started) & _TICKS_MASK
+
+    def mark(self, stage: int) -> None:
+        """Records that a milestone has been reached, if it hasn't been
+        already
+
+        :param int stage: The milestone, as a `BootStages` value
+        """
+
+        if self._milestones[stage] == _UNREACHED:
+            self._milestones[stage] = self.elapsed()
+
+    def milestone(self, stage: int) -> int:
+        """The time a milestone was reached, in milliseconds since booting
+        started, or -1 if it hasn't been
+
+        :param int stage: The milestone, as a `BootStages` value
+        """
+
+        return self._milestones[stage]
+
+    def add_step(self, name: str, step: Callable[[], None]) -> None:
+        """Adds a step that loads part of the DisBadge, run in the order
+        added
+
+        :param str name: The name of the step
+        :param step: The function that runs the step
+        """
+
+        self._steps.append((name, step))
+
+    @property
+    def pending(self) -> int:
+        """The number of steps still to run"""
+        return len(self._steps) - self._next_step
+
+    def run_step(self) -> bool:
+        """Runs the next step, if there is one
+
+        :return: Whether a step was run
+        :rtype: bool
+        """
+
+        if not self.pending:
+            return False
+        name, step = self._steps[self._next_step]
+        self._next_step += 1
+        start = self._clock()
+        step()
+        self._step_times.append((name, (self._clock() - start) & _TICKS_MASK))
+        return True
+
+    def report(self) -> str:
+        """Reports the time each milestone was reached, since booting
+        started, and how long each step took, one per line as its name and
+        value in milliseconds
+
+        :return: The report
+        :rtype: str
+        """
+
+        lines = [
+            "boot_{}_ms {}".format(name, self._milestones[stage])
+            for stage, name in enumerate(BootStages.NAMES)
+            if self._milestones[stage] != _UNREACHED
+        ]
+        for name, duration in self._step_times:
+            lines.append("load_{}_ms {}".format(name, duration))
+        return "\n".join(lines)
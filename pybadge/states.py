@@ -32,3 +32,18 @@ class LEDStateIDs:
     PING = 1
     CHEER = 2
     HYPE = 3
+
+
+# pylint: disable=too-few-public-methods
+class Buttons:
+    """An enum-like class for the button constants"""
+
+    NONE = 8
+    BUTTON_LEFT = 7
+    BUTTON_UP = 6
+    BUTTON_DOWN = 5
+    BUTTON_RIGHT = 4
+    BUTTON_SEL = 3
+    BUTTON_START = 2
+    BUTTON_A = 1
+    BUTTON_B = 0
@@ -0,0 +1,228 @@
+"""
+`stats`
+====================================================
+
+Fixed-size diagnostic counters for the DisBadge, covering the heap, the
+messages received, and the timing of the main loop.  Every counter lives
+in one preallocated array of small integers, so recording them doesn't
+allocate anything on the heap.
+
+* Author(s): Alec Delaney
+
+"""
+
+import array
+import gc
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    from trace_log import monotonic_ms as ticks_ms
+
+try:
+    from typing import Callable, Optional
+    from message_queue import MessageQueue
+    from scheduler import Scheduler
+except ImportError:
+    pass
+
+# supervisor.ticks_ms() wraps around at 2**29
+_TICKS_MASK = (1 << 29) - 1
+
+_UNSET = -1
+
+
+# pylint: disable=too-few-public-methods
+class StatIDs:
+    """Enum-like class for the counters of a `BadgeStats`.  The timed
+    operations have three counters in a row: the number of times, the
+    total time, and the worst time, in milliseconds."""
+
+    MEM_FREE_LOW = 0
+    MEM_FREE_HIGH = 1
+    MEM_ALLOC_LOW = 2
+    MEM_ALLOC_HIGH = 3
+    RECEIVED = 4
+    DROPPED = 5
+    DECODES = 6
+    DECODE_TOTAL = 7
+    DECODE_WORST = 8
+    LAYOUTS = 9
+    LAYOUT_TOTAL = 10
+    LAYOUT_WORST = 11
+    LOOP_PASSES = 12
+    POLLS = 13
+    POLL_GAP_WORST = 14
+
+    COUNT = 15
+    NAMES = (
+        "mem_free_low",
+        "mem_free_high",
+        "mem_alloc_low",
+        "mem_alloc_high",
+        "received",
+        "dropped",
+        "decodes",
+        "decode_total_ms",
+        "decode_worst_ms",
+        "layouts",
+        "layout_total_ms",
+        "layout_worst_ms",
+        "loop_passes",
+        "polls",
+        "poll_gap_worst_ms",
+    )
+
+
+class BadgeStats:
+    """Diagnostic counters for the DisBadge, reported as plain text for
+    the Raspberry Pi to scrape
+
+    :param clock: (Optional) The clock function, returning milliseconds;
+        default is ``supervisor.ticks_ms``
+    :param mem_free: (Optional) The function returning the free heap
+        memory, default is ``gc.mem_free``
+    :param mem_alloc: (Optional) The function returning the allocated heap
+        memory, default is ``gc.mem_alloc``
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], int] = ticks_ms,
+        mem_free: Optional[Callable[[], int]] = None,
+        mem_alloc: Optional[Callable[[], int]] = None,
+    ) -> None:
+
+        self._clock = clock
+        # pylint: disable=no-member
+        self._mem_free = mem_free if mem_free is not None else gc.mem_free
+        self._mem_alloc = mem_alloc if mem_alloc is not None else gc.mem_alloc
+        self._counters = array.array("l", [0] * StatIDs.COUNT)
+        self._started = 0
+        self._last_poll = 0
+        self.reset()
+
+    def __getitem__(self, stat: int) -> int:
+        return self._counters[stat]
+
+    def now(self) -> int:
+        """The current time, for passing to `record_time`"""
+        return self._clock()
+
+    def elapsed(self, start: int) -> int:
+        """The time since a time from `now`, in milliseconds
+
+        :param int start: The earlier time
+        """
+        return (self._clock() - start) & _TICKS_MASK
+
+    def set(self, stat: int, value: int) -> None:
+        """Sets a counter
+
+        :param int stat: The counter, as a `StatIDs` value
+        :param int value: The new value
+        """
+
+        self._counters[stat] = value
+
+    def record_time(self, stat: int, start: int) -> None:
+        """Records how long an operation took
+
+        :param int stat: The count of the operation, as a `StatIDs` value
+            (`StatIDs.DECODES` or `StatIDs.LAYOUTS`)
+        :param int start: When the operation started, from `now`
+        """
+
+        duration = self.elapsed(start)
+        counters = self._counters
+        counters[stat] += 1
+        counters[stat + 1] += duration
+        if duration > counters[stat + 2]:
+            counters[stat + 2] = duration
+
+    def sample_memory(self) -> None:
+        """Updates the heap watermarks with the current heap usage"""
+
+        counters = self._counters
+        free = self._mem_free()
+        alloc = self._mem_alloc()
+        if counters[StatIDs.MEM_FREE_LOW] == _UNSET:
+            counters[StatIDs.MEM_FREE_LOW] = free
+            counters[StatIDs.MEM_FREE_HIGH] = free
+            counters[StatIDs.MEM_ALLOC_LOW] = alloc
+            counters[StatIDs.MEM_ALLOC_HIGH] = alloc
+        if free < counters[StatIDs.MEM_FREE_LOW]:
+            counters[StatIDs.MEM_FREE_LOW] = free
+        if free > counters[StatIDs.MEM_FREE_HIGH]:
+            counters[StatIDs.MEM_FREE_HIGH] = free
+        if alloc < counters[StatIDs.MEM_ALLOC_LOW]:
+            counters[StatIDs.MEM_ALLOC_LOW] = alloc
+        if alloc > counters[StatIDs.MEM_ALLOC_HIGH]:
+            counters[StatIDs.MEM_ALLOC_HIGH] = alloc
+
+    def record_poll(self) -> None:
+        """Records that the network is being polled, tracking the longest
+        gap between polls, and samples the heap"""
+
+        counters = self._counters
+        now = self._clock()
+        if counters[StatIDs.POLLS]:
+            gap = (now - self._last_poll) & _TICKS_MASK
+            if gap > counters[StatIDs.POLL_GAP_WORST]:
+                counters[StatIDs.POLL_GAP_WORST] = gap
+        self._last_poll = now
+        counters[StatIDs.POLLS] += 1
+        self.sample_memory()
+
+    def reset(self) -> None:
+        """Resets every counter"""
+
+        for stat in range(StatIDs.COUNT):
+            self._counters[stat] = 0
+        self._counters[StatIDs.MEM_FREE_LOW] = _UNSET
+        self._counters[StatIDs.MEM_ALLOC_LOW] = _UNSET
+        self._started = self._clock()
+
+    def report(
+        self,
+        queue: Optional[MessageQueue] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> str:
+        """Reports every counter, one per line as its name and value,
+        followed by the time since the counters were reset, the average
+        decode and layout times, and the main loop rate
+
+        :param MessageQueue queue: (Optional) The message queue, whose
+            received and dropped counts are reported
+        :param Scheduler scheduler: (Optional) The main loop scheduler,
+            whose number of passes is reported
+        :return: The report
+        :rtype: str
+        """
+
+        if queue is not None:
+            self.set(StatIDs.RECEIVED, queue.received)
+            self.set(StatIDs.DROPPED, queue.dropped)
+        if scheduler is not None:
+            self.set(StatIDs.LOOP_PASSES, scheduler.passes)
+        counters = self._counters
+        uptime = self.elapsed(self._started)
+        lines = [
+            "{} {}".format(name, counters[stat])
+            for stat, name in enumerate(StatIDs.NAMES)
+        ]
+        lines.append("uptime_ms {}".format(uptime))
+        lines.append(
+            "decode_avg_ms {}".format(
+                counters[StatIDs.DECODE_TOTAL] // max(1, counters[StatIDs.DECODES])
+            )
+        )
+        lines.append(
+            "layout_avg_ms {}".format(
+                counters[StatIDs.LAYOUT_TOTAL] // max(1, counters[StatIDs.LAYOUTS])
+            )
+        )
+        lines.append(
+            "loop_hz {}".format(counters[StatIDs.LOOP_PASSES] * 1000 // max(1, uptime))
+        )
+        return "\n".join(lines)
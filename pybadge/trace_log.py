@@ -0,0 +1,120 @@
+"""
+`trace_log`
+====================================================
+
+Records when each stage of showing a traced message happens, so the
+Raspberry Pi can collect where the time goes between a message being
+received and it being on screen
+
+* Author(s): Alec Delaney
+
+"""
+
+import time
+
+try:
+    from typing import Callable
+    from message_queue import MessageRecord
+except ImportError:
+    pass
+
+
+# pylint: disable=too-few-public-methods
+class TraceStages:
+    """Enum-like class for the stages of showing a message, in the order
+    they happen"""
+
+    RECEIVED = 0
+    DECODED = 1
+    SPLASH = 2
+    LAYOUT = 3
+    SOUND = 4
+
+    COUNT = 5
+    NAMES = ("received", "decoded", "splash", "layout", "sound")
+
+
+def monotonic_ms() -> int:
+    """The time of the monotonic clock in milliseconds"""
+    return time.monotonic_ns() // 1000000
+
+
+class TraceLog:
+    """A fixed number of slots holding the stage times of the most
+    recently received traced messages, in milliseconds
+
+    :param int capacity: The number of messages that can be traced at once
+    :param clock: (Optional) The clock function, returning milliseconds;
+        default is `monotonic_ms`
+    """
+
+    def __init__(self, capacity: int, clock: Callable[[], int] = monotonic_ms) -> None:
+
+        self._capacity = capacity
+        self._clock = clock
+        self._trace_ids = [None] * capacity
+        self._times = [-1] * (capacity * TraceStages.COUNT)
+        self._reported = [True] * capacity
+        self._next_slot = 0
+
+    def now(self) -> int:
+        """The current time, for passing to `begin` once the message has
+        been decoded"""
+        return self._clock()
+
+    def begin(self, record: MessageRecord, received: int) -> None:
+        """Starts tracing a message, if it has a trace ID, overwriting the
+        oldest traced message if every slot is in use
+
+        :param MessageRecord record: The decoded message
+        :param int received: When the message was received, from `now`
+        """
+
+        if record.trace_id is None:
+            return
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self._capacity
+        self._trace_ids[slot] = record.trace_id
+        self._reported[slot] = False
+        base = slot * TraceStages.COUNT
+        for stage in range(TraceStages.COUNT):
+            self._times[base + stage] = -1
+        self._times[base + TraceStages.RECEIVED] = received
+        self._times[base + TraceStages.DECODED] = self._clock()
+        record.trace_slot = slot
+
+    def mark(self, record: MessageRecord, stage: int) -> None:
+        """Records that a traced message has reached a stage
+
+        :param MessageRecord record: The message
+        :param int stage: The stage reached, as a `TraceStages` value
+        """
+
+        slot = record.trace_slot
+        if slot < 0 or self._trace_ids[slot] != record.trace_id:
+            return  # Not traced, or overwritten by a newer message
+        self._times[slot * TraceStages.COUNT + stage] = self._clock()
+
+    def report(self) -> str:
+        """Reports every finished trace that hasn't been reported yet, one
+        per line: the trace ID followed by the time each stage after
+        receiving the message was reached, in milliseconds after it was
+        received (or -1 if it was skipped)
+
+        :return: The report
+        :rtype: str
+        """
+
+        lines = []
+        for slot in range(self._capacity):
+            base = slot * TraceStages.COUNT
+            if self._reported[slot] or self._times[base + TraceStages.SOUND] < 0:
+                continue
+            received = self._times[base + TraceStages.RECEIVED]
+            fields = [str(self._trace_ids[slot])]
+            for stage in range(TraceStages.DECODED, TraceStages.COUNT):
+                stage_time = self._times[base + stage]
+                fields.append(str(stage_time - received if stage_time >= 0 else -1))
+            lines.append(" ".join(fields))
+            self._reported[slot] = True
+        return "\n".join(lines)
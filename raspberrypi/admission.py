@@ -0,0 +1,170 @@
+"""
+`raspberrypi.admission`
+====================================================
+
+Admission control for messages from Discord, so that however busy the
+chat gets the DisBadge only receives a bounded number of messages.
+Anyone whose message can't be sent is told straight away, rather than
+the message being dropped later on.
+
+* Author(s): Alec Delaney
+
+"""
+
+import time
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """A token bucket, which allows bursts of up to ``capacity`` events
+    and refills at a steady rate
+
+    :param float rate: The number of tokens added per second
+    :param float capacity: The maximum number of tokens
+    :param monotonic: (Optional) The clock function, default is
+        `time.monotonic`
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+
+        self.rate = rate
+        self.capacity = capacity
+        self._monotonic = monotonic
+        self._tokens = capacity
+        self._updated = monotonic()
+
+    @property
+    def tokens(self) -> float:
+        """The number of tokens currently available"""
+        now = self._monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        return self._tokens
+
+    @property
+    def full(self) -> bool:
+        """Whether the bucket has refilled completely"""
+        return self.tokens >= self.capacity
+
+    def take(self) -> bool:
+        """Takes a token, if one is available
+
+        :return: Whether a token was taken
+        :rtype: bool
+        """
+
+        if self.tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+# pylint: disable=too-few-public-methods
+class AdmissionStates:
+    """Enum-like class for the outcomes of `AdmissionControl.admit`"""
+
+    ADMITTED = 0
+    USER_LIMITED = 1
+    GLOBAL_LIMITED = 2
+    BACKLOGGED = 3
+
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class AdmissionControl:
+    """Rate limits messages with a token bucket for each user and one
+    shared by everyone, and refuses messages while too many are already
+    waiting to be delivered
+
+    :param float user_rate: The messages per second allowed from each user
+    :param float user_burst: The most messages a user can send at once
+    :param float global_rate: The messages per second allowed in total
+    :param float global_burst: The most messages that can be sent at once
+        in total
+    :param int max_users: (Optional) The number of user buckets kept
+        before full ones are forgotten, default is 1000
+    :param monotonic: (Optional) The clock function, default is
+        `time.monotonic`
+    :param backlog: (Optional) The function returning the number of
+        messages already waiting to be delivered, default is None, which
+        doesn't limit the backlog
+    :param int max_backlog: (Optional) The most messages that can wait to
+        be delivered before more are refused, default is 500
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        user_rate: float,
+        user_burst: float,
+        global_rate: float,
+        global_burst: float,
+        max_users: int = 1000,
+        monotonic: Callable[[], float] = time.monotonic,
+        backlog: Optional[Callable[[], int]] = None,
+        max_backlog: int = 500,
+    ) -> None:
+
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self.backlog = backlog
+        self.max_backlog = max_backlog
+        self._monotonic = monotonic
+        self._global_bucket = TokenBucket(global_rate, global_burst, monotonic)
+        self._user_buckets: Dict[str, TokenBucket] = {}
+
+        self.admitted = 0
+        """The number of messages admitted"""
+
+        self.user_limited = 0
+        """The number of messages refused because the user sent too many"""
+
+        self.global_limited = 0
+        """The number of messages refused because everyone sent too many"""
+
+        self.backlogged = 0
+        """The number of messages refused because too many were waiting to
+        be delivered"""
+
+    def admit(self, user: str) -> int:
+        """Checks whether a user may send a message now, and if so uses up
+        one of their tokens
+
+        :param str user: The user sending the message
+        :return: The outcome, as an `AdmissionStates` value
+        :rtype: int
+        """
+
+        if self.backlog is not None and self.backlog() >= self.max_backlog:
+            self.backlogged += 1
+            return AdmissionStates.BACKLOGGED
+        bucket = self._user_buckets.get(user)
+        if bucket is None:
+            if len(self._user_buckets) >= self.max_users:
+                self._forget_idle_users()
+            bucket = self._user_buckets[user] = TokenBucket(
+                self.user_rate, self.user_burst, self._monotonic
+            )
+        if bucket.tokens < 1:
+            self.user_limited += 1
+            return AdmissionStates.USER_LIMITED
+        if not self._global_bucket.take():
+            self.global_limited += 1
+            return AdmissionStates.GLOBAL_LIMITED
+        bucket.take()
+        self.admitted += 1
+        return AdmissionStates.ADMITTED
+
+    def _forget_idle_users(self) -> None:
+        """Forgets the buckets that have refilled, as they are the same as
+        new ones"""
+        idle = [user for user, bucket in self._user_buckets.items() if bucket.full]
+        for user in idle:
+            del self._user_buckets[user]
@@ -0,0 +1,109 @@
+"""
+`raspberrypi.coalesce`
+====================================================
+
+Merges bursts of messages from the same user into a single delivery, so
+that the DisBadge plays one notification for a burst rather than one
+for each message
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+from typing import Callable, List, Optional
+from raspberrypi.rpi_messages import RPiDiscordMessage
+
+
+# pylint: disable=too-many-instance-attributes
+class Coalescer:
+    """Holds each message for a short window, merging any following
+    messages with the same user and command type into it.  A message from
+    anyone else, or with a different command type, delivers the held
+    message immediately so that the order is kept.
+
+    :param deliver: The function called with each message to deliver
+    :param float window: (Optional) How long to hold a message for, in
+        seconds, measured from the first message of a burst; 0 delivers
+        every message immediately.  Default is 2 seconds.
+    :param str separator: (Optional) The text placed between merged
+        messages, default is a space
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[RPiDiscordMessage], None],
+        window: float = 2,
+        separator: str = " ",
+    ) -> None:
+
+        self.deliver = deliver
+        self.window = window
+        self.separator = separator
+
+        self._held: Optional[RPiDiscordMessage] = None
+        self._parts: List[str] = []
+        self._flush_handle = None
+
+        self.received = 0
+        """The number of messages added"""
+
+        self.delivered = 0
+        """The number of messages delivered, after merging"""
+
+    @property
+    def pending(self) -> int:
+        """The number of messages being held"""
+        return len(self._parts)
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """The average number of added messages in each delivered message"""
+        if not self.delivered:
+            return 1.0
+        return (self.received - self.pending) / self.delivered
+
+    def add(self, message: RPiDiscordMessage) -> None:
+        """Adds a message, delivering it once its window has passed
+
+        :param RPiDiscordMessage message: The message to add
+        """
+
+        self.received += 1
+        held = self._held
+        if held is not None and (
+            held.user != message.user or held.cmd_type != message.cmd_type
+        ):
+            self.flush()
+        if not self.window:
+            self.delivered += 1
+            self.deliver(message)
+            return
+        if self._held is None:
+            self._held = message
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.window, self.flush
+            )
+        self._parts.append(message.message)
+
+    def flush(self) -> None:
+        """Delivers the held message now, if there is one"""
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        held = self._held
+        if held is None:
+            return
+        if len(self._parts) > 1:
+            # Join the whole burst at once rather than adding one at a time
+            merged = RPiDiscordMessage(
+                self.separator.join(self._parts), held.user, held.cmd_type
+            )
+            merged.trace_id = held.trace_id
+            merged.created = held.created
+            held = merged
+        self._held = None
+        self._parts = []
+        self.delivered += 1
+        self.deliver(held)
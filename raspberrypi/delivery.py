@@ -0,0 +1,371 @@
+"""
+`raspberrypi.delivery`
+====================================================
+
+Asynchronous delivery of messages from the Discord bot to the DisBadge,
+so that slow or unreachable badges never stall the bot's event loop
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import aiohttp
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.record_codec import FORM_CONTENT_TYPE, RECORD_CONTENT_TYPE
+from shared.bitmap_codec import BITMAP_CONTENT_TYPE
+from shared.capabilities import Capabilities, decode_capabilities
+
+UNSUPPORTED_STATUSES = (404, 415)
+"""The HTTP statuses with which a DisBadge rejects a route or format it
+doesn't support, rather than failing to handle a particular message"""
+
+REFUSED_STATUS = 503
+"""The HTTP status with which a DisBadge refuses messages it can't take
+yet, because its queue is full or because it has restarted and has not
+been activated again"""
+
+
+# pylint: disable=too-few-public-methods
+class DeliveryResult:
+    """The outcome of delivering a message to a DisBadge
+
+    :param RPiDiscordMessage message: The message that was delivered
+    :param bool ok: Whether the DisBadge accepted the message
+    :param float latency: How long the delivery took, in seconds
+    :param int status: (Optional) The HTTP status returned, if any
+    :param str error: (Optional) A description of the error, if any
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        message: RPiDiscordMessage,
+        ok: bool,  # pylint: disable=invalid-name
+        latency: float,
+        status: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        self.message = message
+        self.ok = ok  # pylint: disable=invalid-name
+        self.latency = latency
+        self.status = status
+        self.error = error
+
+    def __repr__(self) -> str:
+        outcome = "delivered" if self.ok else "failed ({})".format(self.error)
+        return "{0!r} {1} in {2:.0f} ms".format(
+            self.message, outcome, self.latency * 1000
+        )
+
+
+# pylint: disable=too-many-instance-attributes
+class BadgeClient:
+    """Delivers messages to a DisBadge over a persistent HTTP session,
+    limited to one connection at a time as that is all the DisBadge can
+    handle.  Messages are sent in order from the outbox by a
+    `raspberrypi.outbox.OutboxRelay`.
+
+    :param str host: The IP address (and optionally port) of the DisBadge
+    :param float timeout: (Optional) The timeout for each request, in
+        seconds; default is 5
+    :param bool use_records: (Optional) Whether to send messages in the
+        compact record format, default is False
+    :param bool prewrap: (Optional) Whether to wrap messages for the
+        DisBadge's screen before sending them, so only the lines it can
+        display are sent; default is False
+    :param bool render_bitmaps: (Optional) Whether to render messages into
+        bitmaps before sending them, so the DisBadge doesn't need to do any
+        font work; default is False
+    :param bool mute: (Optional) Whether to turn off the DisBadge's
+        notification sounds whenever it is activated, default is False
+
+    Records, batches and bitmaps are only sent once the DisBadge has
+    reported that it supports them (see `shared.capabilities`), and
+    messages are sent as form data until then.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        host: str,
+        timeout: float = 5,
+        use_records: bool = False,
+        prewrap: bool = False,
+        render_bitmaps: bool = False,
+        mute: bool = False,
+    ) -> None:
+
+        self.host = host
+        self.timeout = timeout
+        self.use_records = use_records
+        self.prewrap = prewrap
+        self.render_bitmaps = render_bitmaps
+        self.mute = mute
+
+        self.supports_batch = True
+        """Whether the DisBadge accepts batches of messages, which is
+        cleared if it turns out not to"""
+
+        self.capabilities: Optional[Dict[str, Optional[int]]] = None
+        """The optional features the DisBadge supports and their values, by
+        `shared.capabilities.Capabilities` value, or None until known"""
+
+        self._session = None
+
+        self.result_callbacks: List[Callable[[DeliveryResult], None]] = []
+        """Functions called with the `DeliveryResult` of every message"""
+
+        self.breaker = None
+        """The `raspberrypi.health.CircuitBreaker` tracking the DisBadge, if
+        any; while its circuit is open, messages fail without being sent"""
+
+    def url(self, *path: str) -> str:
+        """The URL of an endpoint on the DisBadge
+
+        :param str path: The components of the path
+        """
+
+        return "/".join(["http:/", self.host, *path])
+
+    async def start(self) -> None:
+        """Opens the HTTP session, if not already open"""
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=1),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self) -> None:
+        """Closes the HTTP session"""
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def post(
+        self, *path: str, data: Optional[object] = None, headers: Optional[dict] = None
+    ) -> int:
+        """Sends a POST request to the DisBadge
+
+        :param str path: The components of the path
+        :param data: (Optional) The request body
+        :param dict headers: (Optional) Additional request headers
+        :return: The HTTP status
+        :rtype: int
+        """
+
+        await self.start()
+        async with self._session.post(
+            self.url(*path), data=data, headers=headers
+        ) as response:
+            await response.read()
+            return response.status
+
+    async def fetch(self, *path: str) -> Tuple[int, str]:
+        """Sends a GET request to the DisBadge
+
+        :param str path: The components of the path
+        :return: The HTTP status and the response text
+        :rtype: Tuple[int, str]
+        """
+
+        await self.start()
+        async with self._session.get(self.url(*path)) as response:
+            return response.status, await response.text()
+
+    async def activate(self) -> bool:
+        """Activates the DisBadge so that it accepts messages, and turns off
+        its sounds if muted.  A DisBadge that restarts needs activating
+        again.
+
+        :return: Whether the DisBadge was activated
+        :rtype: bool
+        """
+
+        print("Activating {}...".format(self.host))
+        try:
+            status = await self.post("activate")
+            if status == 200 and self.mute:
+                status = await self.post("sound", "off")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            print("Could not activate {}: {}".format(self.host, err))
+            return False
+        return status == 200
+
+    async def probe(self, timeout: float) -> bool:
+        """Checks whether the DisBadge is reachable.  Any response counts,
+        even an error, so no particular route is needed.
+
+        :param float timeout: The timeout for the request, in seconds
+        :return: Whether the DisBadge responded
+        :rtype: bool
+        """
+
+        await self.start()
+        try:
+            async with self._session.get(
+                self.url(""), timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+        return True
+
+    async def fetch_capabilities(self) -> Optional[Dict[str, Optional[int]]]:
+        """Asks the DisBadge which optional features it supports, if not
+        already known.  Firmware without the ``/capabilities`` route only
+        supports form data.
+
+        :return: The value of each capability, or None if the DisBadge
+            couldn't be asked
+        :rtype: Dict[str, Optional[int]]|None
+        """
+
+        if self.capabilities is None:
+            try:
+                status, text = await self.fetch("capabilities")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return None
+            if status == 200:
+                self.capabilities = decode_capabilities(text)
+            elif status == 404:
+                print("Capabilities not reported, sending form data")
+                self.capabilities = {}
+        return self.capabilities
+
+    def supports(self, capability: str) -> bool:
+        """Whether the DisBadge is known to support an optional feature
+
+        :param str capability: The feature, as a
+            `shared.capabilities.Capabilities` value
+        """
+
+        return self.capabilities is not None and capability in self.capabilities
+
+    @property
+    def queue_size(self) -> Optional[int]:
+        """The number of messages the DisBadge can hold waiting to be shown,
+        or None if it hasn't reported it"""
+        if self.capabilities is None:
+            return None
+        return self.capabilities.get(Capabilities.QUEUE)
+
+    async def send_message(self, message: RPiDiscordMessage) -> DeliveryResult:
+        """Delivers a message
+
+        :param RPiDiscordMessage message: The message to deliver
+        :return: The outcome of the delivery
+        :rtype: DeliveryResult
+        """
+
+        if self.breaker is not None and self.breaker.is_open:
+            return DeliveryResult(message, False, 0.0, error="circuit open")
+        result = await self._post_message(message)
+        if self.breaker is not None:
+            self.breaker.record_result(result)
+        return result
+
+    async def _post_message(self, message: RPiDiscordMessage) -> DeliveryResult:
+        start_time = time.monotonic()
+        try:
+            await self.fetch_capabilities()
+            if self.render_bitmaps and self.supports(Capabilities.BITMAPS):
+                status = await self.post(
+                    "message",
+                    data=message.to_bitmap_body(),
+                    headers={"Content-Type": BITMAP_CONTENT_TYPE},
+                )
+                if status not in UNSUPPORTED_STATUSES:
+                    return self._result(message, start_time, status)
+                print("Bitmaps rejected, falling back to text")
+                self.render_bitmaps = False
+            if self.use_records and self.supports(Capabilities.RECORDS):
+                status = await self.post(
+                    "message",
+                    data=message.to_bytes(self.prewrap),
+                    headers={"Content-Type": RECORD_CONTENT_TYPE},
+                )
+                if status not in UNSUPPORTED_STATUSES:
+                    return self._result(message, start_time, status)
+                print("Compact format rejected, falling back to form data")
+                self.use_records = False
+            status = await self.post(
+                "message",
+                data=message.to_form_body(self.prewrap),
+                headers={"Content-Type": FORM_CONTENT_TYPE},
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            return DeliveryResult(
+                message,
+                False,
+                time.monotonic() - start_time,
+                error=repr(err),
+            )
+        return self._result(message, start_time, status)
+
+    @staticmethod
+    def _result(
+        message: RPiDiscordMessage, start_time: float, status: int
+    ) -> DeliveryResult:
+        return DeliveryResult(
+            message,
+            status == 200,
+            time.monotonic() - start_time,
+            status,
+            None if status == 200 else "HTTP {}".format(status),
+        )
+
+    async def send_batch(
+        self, messages: List[RPiDiscordMessage]
+    ) -> List[DeliveryResult]:
+        """Delivers several messages in a single request, in the compact
+        record format.  Falls back to sending them one at a time if the
+        DisBadge doesn't support batches, or if messages are sent as
+        bitmaps.
+
+        :param list messages: The messages to deliver
+        :return: The outcome of the delivery of each message
+        :rtype: List[DeliveryResult]
+        """
+
+        if self.breaker is not None and self.breaker.is_open:
+            return [
+                DeliveryResult(message, False, 0.0, error="circuit open")
+                for message in messages
+            ]
+        await self.fetch_capabilities()
+        if (
+            not self.supports_batch
+            or self.render_bitmaps
+            or not self.supports(Capabilities.BATCH)
+        ):
+            return [await self.send_message(message) for message in messages]
+
+        start_time = time.monotonic()
+        body = b"".join(message.to_bytes(self.prewrap) for message in messages)
+        status = None
+        error = None
+        try:
+            status = await self.post(
+                "messages", data=body, headers={"Content-Type": RECORD_CONTENT_TYPE}
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            error = repr(err)
+        if status in UNSUPPORTED_STATUSES:
+            print("Batches not supported, sending messages one at a time")
+            self.supports_batch = False
+            return [await self.send_message(message) for message in messages]
+        if status is not None and status != 200:
+            error = "HTTP {}".format(status)
+        latency = time.monotonic() - start_time
+        results = [
+            DeliveryResult(message, error is None, latency, status, error)
+            for message in messages
+        ]
+        if self.breaker is not None:
+            self.breaker.record_result(results[0])
+        return results
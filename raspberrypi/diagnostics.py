@@ -0,0 +1,118 @@
+"""
+`raspberrypi.diagnostics`
+====================================================
+
+Scrapes the diagnostic counters each DisBadge serves at ``/stats``,
+covering its heap usage, the messages it has received, and the timing of
+its main loop
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+from typing import Dict, Iterable
+import aiohttp
+from raspberrypi.delivery import BadgeClient
+
+
+def parse_stats(report: str) -> Dict[str, int]:
+    """Parses a DisBadge's stats report, which has one counter per line
+    as its name and value
+
+    :param str report: The report
+    :return: The value of each counter, by name
+    :rtype: Dict[str, int]
+    """
+
+    stats = {}
+    for line in report.splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            stats[fields[0]] = int(fields[1])
+    return stats
+
+
+class StatsScraper:
+    """Periodically scrapes the stats of each DisBadge, keeping the most
+    recent stats of each
+
+    :param clients: The clients for each DisBadge
+    :param float interval: (Optional) How often to scrape the DisBadges,
+        in seconds; default is 60
+    """
+
+    def __init__(self, clients: Iterable[BadgeClient], interval: float = 60) -> None:
+
+        self.clients = list(clients)
+        self.interval = interval
+        self._task = None
+
+        self.latest: Dict[str, Dict[str, int]] = {}
+        """The most recent stats of each DisBadge, by host"""
+
+    async def scrape(self, client: BadgeClient) -> None:
+        """Scrapes the stats of a DisBadge
+
+        :param BadgeClient client: The client for the DisBadge
+        """
+
+        try:
+            status, report = await client.fetch("stats")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return
+        if status == 200:
+            self.latest[client.host] = parse_stats(report)
+
+    def dump(self) -> str:
+        """Formats the most recent stats of each DisBadge as a table, with
+        a row for each counter and a column for each DisBadge
+
+        :return: The table
+        :rtype: str
+        """
+
+        hosts = [client.host for client in self.clients]
+        names = []
+        for host in hosts:
+            for name in self.latest.get(host, {}):
+                if name not in names:
+                    names.append(name)
+        lines = [
+            " ".join(
+                ["{:>18}".format("stat")] + ["{:>15}".format(host) for host in hosts]
+            )
+        ]
+        for name in names:
+            values = [self.latest.get(host, {}).get(name, "-") for host in hosts]
+            lines.append(
+                " ".join(
+                    ["{:>18}".format(name)]
+                    + ["{:>15}".format(value) for value in values]
+                )
+            )
+        return "\n".join(lines)
+
+    def start(self) -> None:
+        """Starts scraping, if not already started"""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._scrape_forever())
+
+    async def stop(self) -> None:
+        """Stops scraping"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _scrape_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for client in self.clients:
+                if client.breaker is None or not client.breaker.is_open:
+                    await self.scrape(client)
@@ -0,0 +1,336 @@
+"""
+`raspberrypi.fake_badge`
+====================================================
+
+A local stand-in for the DisBadge's web server, for developing and
+benchmarking the bot link without any hardware.  Like the ESP32's
+``WSGIServer``, it can be limited to handling one connection at a time,
+and it can be made slow, erratic, or lossy.
+
+Run from the repository root with ``python3 -m raspberrypi.fake_badge``,
+then start the bot link with the address it prints
+
+* Author(s): Alec Delaney
+
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from shared.uri_codec import iter_decode_payload
+from shared.record_codec import (
+    FORM_CONTENT_TYPE,
+    RECORD_CONTENT_TYPE,
+    iter_records,
+    read_record,
+)
+from shared.bitmap_codec import BITMAP_CONTENT_TYPE, read_bitmap
+from shared.capabilities import Capabilities, encode_capabilities
+
+ALL_CAPABILITIES = {
+    Capabilities.RECORDS: None,
+    Capabilities.BATCH: None,
+    Capabilities.BITMAPS: None,
+    Capabilities.TRACES: None,
+    Capabilities.STATS: None,
+}
+"""The capabilities of the current DisBadge firmware, except for a queue
+size, as the stand-in keeps every message"""
+
+
+# pylint: disable=too-many-instance-attributes
+class FakeBadge:
+    """Serves the same routes as the DisBadge, decoding messages the same
+    way and keeping them in a list.  Like the DisBadge, messages are
+    refused until it is activated.
+
+    :param float latency: (Optional) How long each request takes to
+        handle, in seconds; default is 0
+    :param float jitter: (Optional) The most extra time, chosen at random,
+        that each request takes to handle, in seconds; default is 0
+    :param float drop_rate: (Optional) The fraction of requests whose
+        connection is closed without a response, default is 0
+    :param int max_connections: (Optional) The number of requests handled
+        at once, with the rest waiting their turn; default is no limit.
+        The DisBadge handles one at a time.
+    :param int seed: (Optional) The seed for the jitter and drops, for
+        repeatable runs
+    :param capabilities: (Optional) The capabilities to report, default is
+        those of the current firmware.  If None, there is no
+        ``/capabilities`` route, like older firmware.
+    """
+
+    # The capabilities are copied, so the default is never changed
+    # pylint: disable=too-many-arguments,dangerous-default-value
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        max_connections: Optional[int] = None,
+        seed: Optional[int] = None,
+        capabilities: Optional[Dict[str, Optional[int]]] = ALL_CAPABILITIES,
+    ) -> None:
+
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.max_connections = max_connections
+        self.capabilities = None if capabilities is None else dict(capabilities)
+        self._random = random.Random(seed)
+        self._connections = None
+
+        self.messages: List[Tuple[str, str, int]] = []
+        """The (message, user, cmd_type) of every message received"""
+
+        self.bitmaps: List[Tuple[int, int, bytes]] = []
+        """The (width, height, pixels) of every rendered message received"""
+
+        self.batches: List[int] = []
+        """The number of messages in each batch received"""
+
+        self._traces: List[int] = []
+
+        self.activated = False
+        """Whether the stand-in has been activated, which can be cleared to
+        act as if it restarted"""
+
+        self.muted = False
+        """Whether the stand-in's sounds have been turned off"""
+
+        self.requests = 0
+        """The number of requests received"""
+
+        self.dropped = 0
+        """The number of requests dropped without a response"""
+
+        self._runner = None
+        self.port = None
+
+    @web.middleware
+    async def _simulate(self, request: web.Request, handler) -> web.StreamResponse:
+        self.requests += 1
+        if self._connections is None:
+            return await self._respond(request, handler)
+        async with self._connections:
+            return await self._respond(request, handler)
+
+    async def _respond(self, request: web.Request, handler) -> web.StreamResponse:
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self._random.random() < self.drop_rate:
+            self.dropped += 1
+            request.transport.close()
+            raise web.HTTPServiceUnavailable()
+        return await handler(request)
+
+    def _app(self) -> web.Application:
+        app = web.Application(middlewares=[self._simulate])
+        app.router.add_post("/message", self._handle_message)
+        app.router.add_post("/messages", self._handle_messages)
+        app.router.add_post("/activate", self._handle_activate)
+        app.router.add_post("/sound/{setting}", self._handle_sound)
+        app.router.add_get("/traces", self._handle_traces)
+        app.router.add_get("/stats", self._handle_stats)
+        if self.capabilities is not None:
+            app.router.add_get("/capabilities", self._handle_capabilities)
+        app.router.add_get("/", self._handle_unknown)
+        return app
+
+    async def _handle_unknown(self, _request: web.Request) -> web.Response:
+        # The DisBadge answers any other route with a 404 once it gets to it
+        return web.Response(status=404, text="")
+
+    async def _handle_message(self, request: web.Request) -> web.Response:
+        if not self.activated:
+            return web.Response(status=503, text="")
+        body = io.StringIO(await request.text())
+        content_type = (
+            request.content_type
+            if "Content-Type" in request.headers
+            else FORM_CONTENT_TYPE
+        )
+        try:
+            if content_type in (RECORD_CONTENT_TYPE, BITMAP_CONTENT_TYPE):
+                record = read_record(body)
+                bitmap = (
+                    read_bitmap(body) if content_type == BITMAP_CONTENT_TYPE else None
+                )
+                self._add_record(record)
+                if bitmap is not None:
+                    self.bitmaps.append(bitmap)
+            elif content_type == FORM_CONTENT_TYPE:
+                fields = dict(iter_decode_payload(body))
+                self.messages.append(
+                    (fields["message"], fields["user"], int(fields["cmdtype"]))
+                )
+                if "trace" in fields:
+                    self._traces.append(int(fields["trace"]))
+            else:
+                return web.Response(status=415, text="")
+        except (ValueError, RuntimeError, TypeError, KeyError):
+            return web.Response(status=400, text="")
+        return web.Response(text="")
+
+    async def _handle_messages(self, request: web.Request) -> web.Response:
+        if request.content_type != RECORD_CONTENT_TYPE:
+            return web.Response(status=415, text="")
+        if not self.activated:
+            return web.Response(status=503, text="")
+        body = io.StringIO(await request.text())
+        try:
+            records = list(iter_records(body))
+        except (ValueError, RuntimeError, TypeError):
+            return web.Response(status=400, text="")
+        self.batches.append(len(records))
+        for record in records:
+            self._add_record(record)
+        return web.Response(text=str(len(records)))
+
+    def _add_record(self, record: tuple) -> None:
+        self.messages.append(record[:3])
+        if record[4] is not None:
+            self._traces.append(record[4])
+
+    async def _handle_traces(self, _request: web.Request) -> web.Response:
+        # Every traced message is reported as finished as soon as it arrives
+        report = "\n".join("{} 0 0 0 0".format(trace_id) for trace_id in self._traces)
+        self._traces = []
+        return web.Response(text=report)
+
+    async def _handle_stats(self, _request: web.Request) -> web.Response:
+        return web.Response(text="received {}".format(len(self.messages)))
+
+    async def _handle_capabilities(self, _request: web.Request) -> web.Response:
+        return web.Response(text=encode_capabilities(self.capabilities))
+
+    async def _handle_activate(self, _request: web.Request) -> web.Response:
+        self.activated = True
+        return web.Response(text="")
+
+    async def _handle_sound(self, request: web.Request) -> web.Response:
+        if request.match_info["setting"] == "off":
+            self.muted = True
+        return web.Response(text="")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving
+
+        :param str host: (Optional) The address to listen on, default is
+            ``127.0.0.1``
+        :param int port: (Optional) The port to listen on, default is any
+            free port
+        :return: The host and port, for use as the bot's IP address
+        :rtype: str
+        """
+
+        if self.max_connections:
+            self._connections = asyncio.Semaphore(self.max_connections)
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # pylint: disable=protected-access
+        self.port = site._server.sockets[0].getsockname()[1]
+        return "{}:{}".format(host, self.port)
+
+    async def stop(self) -> None:
+        """Stops serving"""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving from an event loop in a background thread, like a
+        separate device would
+
+        :param str host: (Optional) The address to listen on, default is
+            ``127.0.0.1``
+        :param int port: (Optional) The port to listen on, default is any
+            free port
+        :return: The host and port, for use as the bot's IP address
+        :rtype: str
+        """
+
+        started = threading.Event()
+        address = []
+
+        def serve() -> None:
+            loop = asyncio.new_event_loop()
+            address.append(loop.run_until_complete(self.start(host, port)))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return address[0]
+
+
+def main() -> None:
+    """Serves a stand-in DisBadge until interrupted, printing what it
+    received when it stops"""
+
+    parser = argparse.ArgumentParser(
+        description="Serve a stand-in DisBadge for the bot link"
+    )
+    parser.add_argument("--host", help="The address to listen on", default="127.0.0.1")
+    parser.add_argument("--port", help="The port to listen on", type=int, default=8080)
+    parser.add_argument(
+        "--latency",
+        help="How long each request takes to handle, in seconds",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument(
+        "--jitter",
+        help="The most extra time each request takes at random, in seconds",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--drop-rate",
+        help="The fraction of requests closed without a response",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--max-connections",
+        help="The number of requests handled at once, 0 for no limit",
+        type=int,
+        default=1,
+    )
+    parser.add_argument("--seed", help="The seed for the jitter and drops", type=int)
+    args = parser.parse_args()
+
+    fake_badge = FakeBadge(
+        args.latency, args.jitter, args.drop_rate, args.max_connections, args.seed
+    )
+
+    async def serve() -> None:
+        print(
+            "Serving a stand-in DisBadge at {}".format(
+                await fake_badge.start(args.host, args.port)
+            )
+        )
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await fake_badge.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    print(
+        "{} requests, {} dropped, {} messages received".format(
+            fake_badge.requests, fake_badge.dropped, len(fake_badge.messages)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+`raspberrypi.health`
+====================================================
+
+Health tracking for DisBadges, so that messages for a DisBadge that has
+gone offline wait in the outbox instead of each waiting out a timeout
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict
+from raspberrypi.delivery import BadgeClient, DeliveryResult
+
+
+# pylint: disable=too-few-public-methods
+class CircuitStates:
+    """Enum-like class for the states of a `CircuitBreaker`"""
+
+    CLOSED = 0
+    OPEN = 1
+
+
+# pylint: disable=too-many-instance-attributes
+class CircuitBreaker:
+    """Tracks whether a DisBadge is reachable by periodically probing it
+    and counting failed deliveries.  After enough failures in a row the
+    circuit opens, and messages fail immediately without contacting the
+    DisBadge; once a probe succeeds, the circuit closes again.  The
+    breaker attaches itself to the client, which reports the outcome of
+    every delivery to it.
+
+    :param BadgeClient client: The client for the DisBadge
+    :param int failure_threshold: (Optional) The number of failures in a
+        row that opens the circuit, default is 3
+    :param float probe_interval: (Optional) How often to probe the
+        DisBadge, in seconds; default is 10
+    :param float probe_timeout: (Optional) The timeout for each probe, in
+        seconds; default is 1
+    :param monotonic: (Optional) The clock function, default is
+        `time.monotonic`
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        client: BadgeClient,
+        failure_threshold: int = 3,
+        probe_interval: float = 10,
+        probe_timeout: float = 1,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._monotonic = monotonic
+
+        self._state = CircuitStates.CLOSED
+        self._closed_event = asyncio.Event()
+        self._closed_event.set()
+        self._task = None
+
+        self.consecutive_failures = 0
+        """The number of probes and deliveries that have failed in a row"""
+
+        self.probes = 0
+        """The number of probes sent"""
+
+        self.probe_failures = 0
+        """The number of probes that failed"""
+
+        self.transitions: Dict[int, int] = {
+            CircuitStates.CLOSED: 0,
+            CircuitStates.OPEN: 0,
+        }
+        """The number of times the circuit has entered each state"""
+
+        self.last_transition = monotonic()
+        """When the circuit last changed state"""
+
+        client.breaker = self
+
+    @property
+    def state(self) -> int:
+        """The current state, as a `CircuitStates` value"""
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the circuit is open, so messages should not be sent"""
+        return self._state == CircuitStates.OPEN
+
+    def _set_state(self, state: int) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        self.transitions[state] += 1
+        self.last_transition = self._monotonic()
+        if state == CircuitStates.OPEN:
+            self._closed_event.clear()
+            # It may come back running different firmware
+            self.client.capabilities = None
+            print("{} is unreachable, holding messages".format(self.client.host))
+        else:
+            self._closed_event.set()
+            print("{} is reachable again".format(self.client.host))
+
+    def record_success(self) -> None:
+        """Records that the DisBadge responded, closing the circuit"""
+
+        self.consecutive_failures = 0
+        self._set_state(CircuitStates.CLOSED)
+
+    def record_failure(self) -> None:
+        """Records that the DisBadge could not be reached, opening the
+        circuit if it has failed too many times in a row"""
+
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self._set_state(CircuitStates.OPEN)
+
+    def record_result(self, result: DeliveryResult) -> None:
+        """Records the outcome of a delivery.  Only failures to reach the
+        DisBadge count; a DisBadge that rejects a message is still
+        reachable.
+
+        :param DeliveryResult result: The outcome of the delivery
+        """
+
+        if self.is_open:
+            return
+        if result.status is None:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    async def probe(self) -> bool:
+        """Checks whether the DisBadge is reachable, updating the circuit
+
+        :return: Whether the DisBadge responded
+        :rtype: bool
+        """
+
+        self.probes += 1
+        if await self.client.probe(self.probe_timeout):
+            self.record_success()
+            return True
+        self.probe_failures += 1
+        self.record_failure()
+        return False
+
+    async def wait_closed(self) -> None:
+        """Waits until the circuit is closed"""
+
+        await self._closed_event.wait()
+
+    def start(self) -> None:
+        """Starts probing, if not already started"""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_forever())
+
+    async def stop(self) -> None:
+        """Stops probing"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe()
@@ -0,0 +1,589 @@
+"""
+`raspberrypi.outbox`
+====================================================
+
+A persistent outbox for messages waiting to be delivered to one or more
+DisBadges, so that messages survive a DisBadge rebooting or dropping off
+Wi-Fi.  Each DisBadge receives the messages at least once, in order
+except that pings are sent ahead of any other messages waiting.
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import collections
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from raspberrypi.delivery import REFUSED_STATUS, BadgeClient, DeliveryResult
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.messages import CommandType
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message TEXT NOT NULL,
+    user TEXT NOT NULL,
+    cmd_type INTEGER NOT NULL,
+    created REAL NOT NULL,
+    prewrapped INTEGER NOT NULL DEFAULT 0,
+    trace_id INTEGER,
+    priority INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    consumer TEXT PRIMARY KEY,
+    last_acked INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS acked_ahead (
+    consumer TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (consumer, id)
+);
+"""
+
+# Columns added since the outbox was first written, for older files
+_ADDED_COLUMNS = {
+    "prewrapped": "prewrapped INTEGER NOT NULL DEFAULT 0",
+    "trace_id": "trace_id INTEGER",
+    "priority": "priority INTEGER NOT NULL DEFAULT 1",
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS outbox_priority ON outbox (priority, id);
+"""
+
+DEFAULT_CONSUMER = "default"
+"""The consumer name used when there is only one DisBadge"""
+
+
+def message_priority(message: RPiDiscordMessage) -> int:
+    """The priority of a message in the outbox, where lower is sent sooner;
+    pings are sent ahead of any other messages
+
+    :param RPiDiscordMessage message: The message
+    """
+
+    return 0 if message.cmd_type == CommandType.PING else 1
+
+
+def _to_wall_time(created: float) -> float:
+    """Converts when a message was created from `time.monotonic`, which
+    doesn't survive a restart, to `time.time`"""
+    if not created:
+        return time.time()
+    return time.time() - (time.monotonic() - created)
+
+
+# pylint: disable=too-many-arguments
+def _message_from_row(
+    message: str,
+    user: str,
+    cmd_type: int,
+    created: float,
+    prewrapped: int,
+    trace_id: Optional[int],
+) -> RPiDiscordMessage:
+    """Rebuilds a stored message, such as after a restart"""
+    restored = RPiDiscordMessage(message, user, cmd_type, bool(prewrapped))
+    restored.trace_id = trace_id
+    restored.created = time.monotonic() - (time.time() - created)
+    return restored
+
+
+# pylint: disable=too-many-instance-attributes
+class Outbox:
+    """An SQLite backed queue of messages, which keeps a separate position
+    for each consumer (DisBadge) reading from it.  Messages are read in
+    order of `message_priority`, then in the order they were added.
+    Added messages and acknowledgements are buffered and written together
+    by `flush`, so a burst of messages costs a single transaction.  A
+    message is removed once every consumer has acknowledged it.
+
+    :param str path: The path of the database file, or ``:memory:``
+    :param consumers: (Optional) The names of the consumers, default is
+        a single consumer named ``default``
+    :param int cache_size: (Optional) The maximum number of message objects
+        kept in memory so that they are shared between consumers rather
+        than read back and re-encoded for each; default is 1000
+    """
+
+    def __init__(
+        self,
+        path: str,
+        consumers: Iterable[str] = (DEFAULT_CONSUMER,),
+        cache_size: int = 1000,
+    ) -> None:
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in columns:
+                self._db.execute("ALTER TABLE outbox ADD COLUMN " + definition)
+        self._db.executescript(_INDEXES)
+
+        min_id, max_id = self._db.execute(
+            "SELECT MIN(id), MAX(id) FROM outbox"
+        ).fetchone()
+        stored = dict(self._db.execute("SELECT consumer, last_acked FROM cursors"))
+        # Acknowledged messages are deleted, so the newest may be gone
+        self._max_id = max(max_id or 0, *stored.values(), 0)
+        # New consumers start from the oldest stored message
+        start = min_id - 1 if min_id else self._max_id
+        self._cursors: Dict[str, int] = {
+            consumer: stored.get(consumer, start) for consumer in consumers
+        }
+        self._dirty_cursors = set(self._cursors)
+        # Messages acknowledged past each cursor, such as pings sent ahead
+        # of older messages
+        self._acked_ahead: Dict[str, Set[int]] = {
+            consumer: set() for consumer in self._cursors
+        }
+        for consumer, row_id in self._db.execute(
+            "SELECT consumer, id FROM acked_ahead"
+        ):
+            if consumer in self._cursors and row_id > self._cursors[consumer]:
+                self._acked_ahead[consumer].add(row_id)
+
+        self._unwritten: List[RPiDiscordMessage] = []
+        self._cache: Dict[int, RPiDiscordMessage] = {}
+        self._cache_size = cache_size
+        self._delivery_times = collections.deque(maxlen=100)
+
+        self.enqueued = 0
+        """The number of messages added since starting"""
+
+        self.delivered = 0
+        """The number of acknowledgements since starting, over all consumers"""
+
+        self.flushes = 0
+        """The number of transactions written"""
+
+    @property
+    def consumers(self) -> Tuple[str, ...]:
+        """The names of the consumers"""
+        return tuple(self._cursors)
+
+    def add(self, message: RPiDiscordMessage) -> None:
+        """Adds a message to the outbox; it is written on the next `flush`
+
+        :param RPiDiscordMessage message: The message to add
+        """
+
+        self._unwritten.append(message)
+        self.enqueued += 1
+
+    def flush(self) -> None:
+        """Writes any added messages and acknowledgements in one transaction"""
+
+        if not self._unwritten and not self._dirty_cursors:
+            return
+        with self._db:
+            for message in self._unwritten:
+                row_id = self._db.execute(
+                    "INSERT INTO outbox (message, user, cmd_type, created, "
+                    "prewrapped, trace_id, priority) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        message.message,
+                        message.user,
+                        message.cmd_type,
+                        _to_wall_time(message.created),
+                        message.prewrapped,
+                        message.trace_id,
+                        message_priority(message),
+                    ),
+                ).lastrowid
+                self._max_id = row_id
+                if len(self._cache) < self._cache_size:
+                    self._cache[row_id] = message
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cursors (consumer, last_acked) VALUES (?, ?)",
+                [
+                    (consumer, self._cursors[consumer])
+                    for consumer in self._dirty_cursors
+                ],
+            )
+            self._db.executemany(
+                "DELETE FROM acked_ahead WHERE consumer = ?",
+                [(consumer,) for consumer in self._dirty_cursors],
+            )
+            self._db.executemany(
+                "INSERT INTO acked_ahead (consumer, id) VALUES (?, ?)",
+                [
+                    (consumer, row_id)
+                    for consumer in self._dirty_cursors
+                    for row_id in self._acked_ahead[consumer]
+                ],
+            )
+            self._db.execute(
+                "DELETE FROM outbox WHERE id <= ?", (min(self._cursors.values()),)
+            )
+        self._unwritten = []
+        self._dirty_cursors.clear()
+        self.flushes += 1
+
+        # Forget messages every consumer has acknowledged
+        oldest_needed = min(self._cursors.values())
+        for row_id in [row_id for row_id in self._cache if row_id <= oldest_needed]:
+            del self._cache[row_id]
+
+    def peek(
+        self, consumer: str = DEFAULT_CONSUMER
+    ) -> Optional[Tuple[int, RPiDiscordMessage]]:
+        """Gets the next message that a consumer has not acknowledged,
+        writing any added messages first
+
+        :param str consumer: (Optional) The consumer, default is ``default``
+        :return: The ID and message, or None if there are no messages
+        :rtype: Tuple[int, RPiDiscordMessage]|None
+        """
+
+        entries = self.peek_batch(consumer, 1)
+        return entries[0] if entries else None
+
+    def peek_batch(
+        self, consumer: str = DEFAULT_CONSUMER, limit: int = 10
+    ) -> List[Tuple[int, RPiDiscordMessage]]:
+        """Gets the next messages that a consumer has not acknowledged,
+        writing any added messages first
+
+        :param str consumer: (Optional) The consumer, default is ``default``
+        :param int limit: (Optional) The maximum number of messages, default
+            is 10
+        :return: The ID and message of each message, highest priority
+            first and then oldest first
+        :rtype: List[Tuple[int, RPiDiscordMessage]]
+        """
+
+        if self._unwritten:
+            self.flush()
+        acked_ahead = self._acked_ahead[consumer]
+        rows = self._db.execute(
+            "SELECT id, message, user, cmd_type, created, prewrapped, trace_id "
+            "FROM outbox WHERE id > ? ORDER BY priority, id LIMIT ?",
+            (self._cursors[consumer], limit + len(acked_ahead)),
+        ).fetchall()
+        entries = []
+        for row_id, *fields in rows:
+            if row_id in acked_ahead:
+                continue
+            if len(entries) == limit:
+                break
+            cached = self._cache.get(row_id)
+            if cached is None:
+                cached = _message_from_row(*fields)
+                if len(self._cache) < self._cache_size:
+                    self._cache[row_id] = cached
+            entries.append((row_id, cached))
+        return entries
+
+    def ack(self, row_id: int, consumer: str = DEFAULT_CONSUMER) -> None:
+        """Marks a message as delivered to a consumer; this is written on
+        the next `flush`.  Messages may be acknowledged in any order, such
+        as a ping sent ahead of older messages.
+
+        :param int row_id: The ID of the message
+        :param str consumer: (Optional) The consumer, default is ``default``
+        """
+
+        acked_ahead = self._acked_ahead[consumer]
+        if row_id <= self._cursors[consumer] or row_id in acked_ahead:
+            return
+        acked_ahead.add(row_id)
+        self._advance(consumer)
+        self._dirty_cursors.add(consumer)
+        self._delivery_times.append(time.monotonic())
+        self.delivered += 1
+
+    def _advance(self, consumer: str) -> None:
+        """Moves a consumer's cursor past every message it has acknowledged
+        without a gap"""
+
+        acked_ahead = self._acked_ahead[consumer]
+        cursor = self._cursors[consumer]
+        for (row_id,) in self._db.execute(
+            "SELECT id FROM outbox WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor, len(acked_ahead)),
+        ).fetchall():
+            if row_id not in acked_ahead:
+                break
+            acked_ahead.remove(row_id)
+            cursor = row_id
+        self._cursors[consumer] = cursor
+
+    def depth(self, consumer: Optional[str] = None) -> int:
+        """The number of messages waiting to be delivered
+
+        :param str consumer: (Optional) The consumer, default is the one
+            furthest behind
+        """
+
+        if consumer is None:
+            return max((self.depth(name) for name in self._cursors), default=0)
+        return (
+            self._max_id
+            - self._cursors[consumer]
+            - len(self._acked_ahead[consumer])
+            + len(self._unwritten)
+        )
+
+    @property
+    def drain_rate(self) -> float:
+        """The recent acknowledgement rate over all consumers, in messages
+        per second"""
+        if len(self._delivery_times) < 2:
+            return 0.0
+        span = time.monotonic() - self._delivery_times[0]
+        return (len(self._delivery_times) - 1) / span if span else 0.0
+
+    def close(self) -> None:
+        """Writes anything outstanding and closes the database"""
+
+        self.flush()
+        self._db.close()
+
+
+class OutboxRelay:
+    """Delivers the messages in an `Outbox` to a single DisBadge in order,
+    retrying with exponential backoff while it can't be reached.
+    Acknowledgements are written after each batch is sent.  If the
+    client has a circuit breaker, delivery also pauses while the circuit
+    is open.  The DisBadge is activated when the relay starts, when its
+    circuit closes, and whenever it refuses messages, as it refuses them
+    after restarting until activated again.
+
+    :param Outbox outbox: The outbox to deliver from
+    :param BadgeClient client: The client used to deliver messages
+    :param str consumer: (Optional) The consumer name of the DisBadge in
+        the outbox, default is ``default``
+    :param int batch_size: (Optional) The most messages to send in one
+        request, default is 10.  Batches are never larger than the queue
+        size the DisBadge reports, so it has space for every message.
+    :param float batch_window: (Optional) How long to wait for more
+        messages when a burst starts arriving, so that they can be sent
+        together; default is 0, which sends straight away.  A single
+        message or a ping is never held back.
+    :param float min_backoff: (Optional) The first retry delay, default is
+        0.5 seconds
+    :param float max_backoff: (Optional) The longest retry delay, default
+        is 30 seconds
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        outbox: Outbox,
+        client: BadgeClient,
+        consumer: str = DEFAULT_CONSUMER,
+        batch_size: int = 10,
+        batch_window: float = 0,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30,
+    ) -> None:
+
+        self.outbox = outbox
+        self.client = client
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._wakeup = asyncio.Event()
+        self._urgent = False
+        self._backoff = min_backoff
+        self._task = None
+
+        self.retries = 0
+        """The number of failed delivery attempts"""
+
+    def wake(self, urgent: bool = False) -> None:
+        """Lets the relay know that a message has been added
+
+        :param bool urgent: (Optional) Whether to send the message without
+            waiting for others to batch with it, default is False
+        """
+
+        self._urgent = self._urgent or urgent
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Starts delivering, if not already started"""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._relay_forever())
+
+    async def stop(self) -> None:
+        """Stops delivering"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _relay_forever(self) -> None:
+        await self.client.activate()
+        while True:
+            await self._wait_until_reachable()
+            if self.outbox.depth(self.consumer) == 0:
+                self._wakeup.clear()
+                self._urgent = False
+                await self._wakeup.wait()
+                await self._hold_batch_window()
+            batch_size = await self._batch_size()
+            entries = self.outbox.peek_batch(self.consumer, batch_size)
+            if entries:
+                results = await self._deliver(entries)
+                await self._back_off(results)
+
+    async def _batch_size(self) -> int:
+        """The most messages to send in the next request"""
+
+        if not self.client.supports_batch:
+            return 1
+        await self.client.fetch_capabilities()
+        queue_size = self.client.queue_size
+        if queue_size:
+            return min(self.batch_size, queue_size)
+        return self.batch_size
+
+    async def _deliver(
+        self, entries: List[Tuple[int, RPiDiscordMessage]]
+    ) -> List[DeliveryResult]:
+        """Sends a batch of messages, and acknowledges everything up to the
+        first failure"""
+
+        messages = [message for _, message in entries]
+        if len(messages) > 1:
+            results = await self.client.send_batch(messages)
+        else:
+            results = [await self.client.send_message(messages[0])]
+        for result in results:
+            for callback in self.client.result_callbacks:
+                callback(result)
+
+        for (row_id, _), result in zip(entries, results):
+            if not result.ok:
+                break
+            self.outbox.ack(row_id, self.consumer)
+        # Write the acknowledgements, so delivered messages aren't sent
+        # again after a restart
+        self.outbox.flush()
+        if any(result.status == REFUSED_STATUS for result in results):
+            await self.client.activate()
+        return results
+
+    async def _wait_until_reachable(self) -> None:
+        """Holds messages while the DisBadge's circuit is open"""
+
+        breaker = self.client.breaker
+        if breaker is not None and breaker.is_open:
+            await breaker.wait_closed()
+            self._backoff = self.min_backoff
+            # It may have restarted while it couldn't be reached
+            await self.client.activate()
+
+    async def _back_off(self, results: List[DeliveryResult]) -> None:
+        """Waits before retrying if any message failed, doubling the wait
+        each time in a row up to the longest retry delay"""
+
+        if all(result.ok for result in results):
+            self._backoff = self.min_backoff
+            return
+        self.retries += 1
+        await asyncio.sleep(self._backoff)
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    async def _hold_batch_window(self) -> None:
+        """Waits for the rest of a burst to arrive, if one is arriving and
+        the batch isn't already full"""
+
+        if not self.batch_window or self._urgent or not self.client.supports_batch:
+            return
+        if 1 < self.outbox.depth(self.consumer) < self.batch_size:
+            await asyncio.sleep(self.batch_window)
+
+
+class OutboxDispatcher:
+    """Adds messages to an `Outbox` and delivers them to every DisBadge
+    concurrently, each with its own `OutboxRelay` so that a slow or dead
+    DisBadge does not hold up the others
+
+    :param str path: The path of the outbox database file
+    :param clients: The clients for each DisBadge
+    :param float flush_delay: (Optional) How long to wait after a message
+        is added before writing, so a burst is written together; default
+        is 0.01 seconds
+    :param float batch_window: (Optional) How long each relay waits for the
+        rest of a burst, see `OutboxRelay`; default is 0
+    """
+
+    def __init__(
+        self,
+        path: str,
+        clients: Iterable[BadgeClient],
+        flush_delay: float = 0.01,
+        batch_window: float = 0,
+    ) -> None:
+
+        clients = list(clients)
+        self.outbox = Outbox(path, [client.host for client in clients])
+        self.relays = [
+            OutboxRelay(self.outbox, client, client.host, batch_window=batch_window)
+            for client in clients
+        ]
+        self.flush_delay = flush_delay
+        self._flush_handle = None
+
+    def add(self, message: RPiDiscordMessage) -> None:
+        """Adds a message for every DisBadge
+
+        :param RPiDiscordMessage message: The message to add
+        """
+
+        self.outbox.add(message)
+        urgent = message.cmd_type == CommandType.PING
+        for relay in self.relays:
+            relay.wake(urgent)
+        if self._flush_handle is None:
+            # Write the burst soon, even if every relay is backing off
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_delay, self._flush
+            )
+
+    @property
+    def backlog(self) -> int:
+        """The number of messages waiting to be delivered to the DisBadge
+        that is furthest ahead, so that one DisBadge being offline doesn't
+        hold back the others"""
+        return min(
+            (self.outbox.depth(consumer) for consumer in self.outbox.consumers),
+            default=0,
+        )
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        self.outbox.flush()
+
+    async def start(self) -> None:
+        """Starts the clients and relays, if not already started"""
+
+        for relay in self.relays:
+            await relay.client.start()
+            relay.start()
+
+    async def stop(self) -> None:
+        """Stops the relays and closes the clients and outbox"""
+
+        for relay in self.relays:
+            await relay.stop()
+            await relay.client.close()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.outbox.close()
@@ -0,0 +1,156 @@
+"""
+`raspberrypi.pipeline`
+====================================================
+
+Everything between a slash command and the DisBadges: admission control,
+coalescing, the outbox, and health tracking.  The bot link
+feeds slash commands into a `MessagePipeline`, and the load generator
+feeds it directly without Discord.
+
+* Author(s): Alec Delaney
+
+"""
+
+from typing import Iterable
+from raspberrypi.admission import AdmissionControl, AdmissionStates
+from raspberrypi.coalesce import Coalescer
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.diagnostics import StatsScraper
+from raspberrypi.health import CircuitBreaker
+from raspberrypi.outbox import OutboxDispatcher
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from raspberrypi.tracing import TraceCollector, start_trace
+
+
+# pylint: disable=too-many-instance-attributes
+class MessagePipeline:
+    """Accepts messages from slash commands and delivers them to every
+    DisBadge in the background.  Each user and everyone together are rate
+    limited, bursts from the same user are merged, and pings are sent
+    ahead of other messages.  Admitted messages are stored in the outbox
+    straight away, or as soon as any merging is done.
+
+    :param clients: The clients for each DisBadge
+    :param str outbox_path: The path of the outbox database file
+    :param float coalesce: (Optional) How long to wait for more messages
+        from the same user to merge, in seconds; default is 0, which
+        doesn't merge messages
+    :param float user_rate: (Optional) The number of messages per second
+        each user can send, default is 0.1
+    :param float user_burst: (Optional) The number of messages each user
+        can send at once, default is 3
+    :param float global_rate: (Optional) The number of messages per second
+        that can be sent in total, default is 1
+    :param float global_burst: (Optional) The number of messages that can
+        be sent at once in total, default is 10
+    :param float probe_interval: (Optional) How often to check that each
+        DisBadge is reachable, in seconds; default is 10
+    :param bool trace: (Optional) Whether to trace the latency of every
+        message, default is False
+    :param float stats_interval: (Optional) How often to collect
+        diagnostics from each DisBadge, in seconds; default is 0, which
+        doesn't collect them
+    :param float batch_window: (Optional) How long to wait for the rest of
+        a burst of messages so they can be sent together, in seconds;
+        default is 0, which sends each message straight away
+    :param int max_backlog: (Optional) The most messages that can wait to
+        be delivered before more are refused, default is 500
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        clients: Iterable[BadgeClient],
+        outbox_path: str,
+        coalesce: float = 0,
+        user_rate: float = 0.1,
+        user_burst: float = 3,
+        global_rate: float = 1,
+        global_burst: float = 10,
+        probe_interval: float = 10,
+        trace: bool = False,
+        stats_interval: float = 0,
+        batch_window: float = 0,
+        max_backlog: int = 500,
+    ) -> None:
+
+        self.clients = list(clients)
+        self.breakers = [
+            CircuitBreaker(client, probe_interval=probe_interval)
+            for client in self.clients
+        ]
+        self.dispatcher = OutboxDispatcher(
+            outbox_path, self.clients, batch_window=batch_window
+        )
+        self.admission = AdmissionControl(
+            user_rate,
+            user_burst,
+            global_rate,
+            global_burst,
+            backlog=lambda: self.dispatcher.backlog,
+            max_backlog=max_backlog,
+        )
+        self.coalescer = Coalescer(self.dispatcher.add, coalesce)
+        self.collector = TraceCollector(self.clients) if trace else None
+        self.scraper = (
+            StatsScraper(self.clients, stats_interval) if stats_interval else None
+        )
+
+    def submit(self, message: str, user: str, command_type: int) -> int:
+        """Adds a message to be sent to every DisBadge in the background,
+        if the user hasn't sent too many messages
+
+        :param str message: The message to send
+        :param str user: The user sending the message
+        :param int command_type: The command type being used
+        :return: Whether the message was accepted, as an `AdmissionStates`
+            value
+        :rtype: int
+        """
+
+        outcome = self.admission.admit(user)
+        if outcome == AdmissionStates.ADMITTED:
+            new_message = RPiDiscordMessage(message, user, command_type)
+            if self.collector is not None:
+                start_trace(new_message)
+            self.coalescer.add(new_message)
+        return outcome
+
+    async def start(self) -> None:
+        """Starts delivering messages and tracking each DisBadge"""
+
+        await self.dispatcher.start()
+        for breaker in self.breakers:
+            breaker.start()
+        if self.collector is not None:
+            self.collector.start()
+        if self.scraper is not None:
+            self.scraper.start()
+
+    async def stop(self) -> None:
+        """Delivers any messages being merged, then stops delivering and
+        tracking"""
+
+        self.coalescer.flush()
+        if self.scraper is not None:
+            await self.scraper.stop()
+        if self.collector is not None:
+            await self.collector.stop()
+        for breaker in self.breakers:
+            await breaker.stop()
+        await self.dispatcher.stop()
+
+    def dump_diagnostics(self) -> str:
+        """Formats the latency of each stage of traced messages and the most
+        recent diagnostics from each DisBadge, for whichever are collected
+
+        :return: The diagnostics
+        :rtype: str
+        """
+
+        sections = []
+        if self.collector is not None:
+            sections.append(self.collector.dump())
+        if self.scraper is not None:
+            sections.append(self.scraper.dump())
+        return "\n\n".join(sections)
@@ -0,0 +1,235 @@
+"""
+`raspberrypi.render`
+====================================================
+
+Renders messages into packed 1-bit bitmaps using the DisBadge's BDF
+fonts, laid out the same way as the DisBadge's labels, so the DisBadge
+can display them without any font work of its own
+
+* Author(s): Alec Delaney
+
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from shared.bitmap_codec import row_stride
+
+FONTS_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "pybadge", "fonts"
+)
+"""The directory containing the DisBadge's fonts"""
+
+TITLE_FONTNAME = os.path.join(FONTS_DIRECTORY, "cherry-13-b.bdf")
+"""The font the DisBadge uses to display usernames"""
+
+MESSAGE_FONTNAME = os.path.join(FONTS_DIRECTORY, "cherry-11-r.bdf")
+"""The font the DisBadge uses to display messages"""
+
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 128
+
+# The label positions used by pybadge_messages.DiscordMessageGroup
+USERNAME_Y = 8
+MESSAGE_Y = 32
+
+LINE_SPACING = 1.25
+"""The line spacing used by the DisBadge's labels"""
+
+
+# pylint: disable=too-few-public-methods
+class Glyph:
+    """A single glyph of a BDF font
+
+    :param int shift_x: The distance to advance after the glyph
+    :param int width: The width of the glyph's bitmap
+    :param int height: The height of the glyph's bitmap
+    :param int dx: The offset of the glyph's bitmap from the cursor
+    :param int dy: The offset of the glyph's bitmap from the baseline
+    :param list rows: Each row of the glyph's bitmap as an integer, most
+        significant bit leftmost
+    :param int row_bits: The number of bits in each row
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        shift_x: int,
+        width: int,
+        height: int,
+        dx: int,  # pylint: disable=invalid-name
+        dy: int,  # pylint: disable=invalid-name
+        rows: List[int],
+        row_bits: int,
+    ) -> None:
+        self.shift_x = shift_x
+        self.width = width
+        self.height = height
+        self.dx = dx  # pylint: disable=invalid-name
+        self.dy = dy  # pylint: disable=invalid-name
+        self.rows = rows
+        self.row_bits = row_bits
+
+
+def _read_bitmap_rows(lines: Iterator[str]) -> List[str]:
+    """Reads the hex rows of a glyph's bitmap, up to the end of the glyph"""
+    rows = []
+    for row in lines:
+        row = row.strip()
+        if row == "ENDCHAR":
+            break
+        rows.append(row)
+    return rows
+
+
+class BDFFont:
+    """The glyphs of a BDF font file
+
+    :param dict glyphs: The glyphs, by code point
+    :param int bounding_height: The height of the font's bounding box
+    """
+
+    def __init__(self, glyphs: Dict[int, Glyph], bounding_height: int) -> None:
+
+        self.glyphs = glyphs
+        self.bounding_height = bounding_height
+
+    @classmethod
+    def from_file(cls, filename: str) -> "BDFFont":
+        """Reads every glyph in a BDF font file
+
+        :param str filename: The filename of the BDF font
+        """
+
+        glyphs = {}
+        bounding_height = 0
+        with open(filename, "r", encoding="utf-8") as font_file:
+            lines = iter(font_file)
+            for line in lines:
+                if line.startswith("FONTBOUNDINGBOX "):
+                    bounding_height = int(line.split()[2])
+                elif line.startswith("ENCODING "):
+                    encoding = int(line.split()[1])
+                elif line.startswith("DWIDTH "):
+                    shift_x = int(line.split()[1])
+                elif line.startswith("BBX "):
+                    # The width, height, and x and y offsets
+                    bounding_box = [int(value) for value in line.split()[1:]]
+                elif line.startswith("BITMAP"):
+                    rows = _read_bitmap_rows(lines)
+                    row_bits = len(rows[0]) * 4 if rows else 0
+                    glyphs[encoding] = Glyph(
+                        shift_x,
+                        *bounding_box,
+                        [int(row, 16) for row in rows],
+                        row_bits,
+                    )
+        return cls(glyphs, bounding_height)
+
+    @property
+    def ascent(self) -> int:
+        """The ascent used by labels, measured from the tallest of a few
+        sample glyphs as adafruit_display_text does"""
+        samples = [self.glyphs.get(ord(character)) for character in "M j'"]
+        return max(
+            (glyph.height + glyph.dy for glyph in samples if glyph is not None),
+            default=0,
+        )
+
+
+class BitmapCanvas:
+    """A 1-bit bitmap that text can be drawn onto, stored as one integer
+    per row so that each glyph row is drawn with a single shift
+
+    :param int width: The width of the bitmap in pixels
+    :param int height: The height of the bitmap in pixels
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+
+        self.width = width
+        self.height = height
+        self._row_bits = row_stride(width) * 8
+        self._row_mask = (1 << self._row_bits) - 1
+        self._rows = [0] * height
+        self._used_height = 0
+
+    # pylint: disable=invalid-name
+    def draw_text(self, font: BDFFont, text: str, x: int, y: int) -> None:
+        """Draws text the way a label positioned at (x, y) would display it
+
+        :param BDFFont font: The font to draw with
+        :param str text: The text, which may have several lines
+        :param int x: The x position of the label
+        :param int y: The y position of the label
+        """
+
+        baseline = y + font.ascent // 2
+        line_height = int(LINE_SPACING * font.bounding_height)
+        for line in text.split("\n"):
+            cursor = x
+            for character in line:
+                glyph = font.glyphs.get(ord(character))
+                if glyph is None:
+                    continue
+                self._draw_glyph(glyph, cursor, baseline)
+                cursor += glyph.shift_x
+            baseline += line_height
+
+    def _draw_glyph(self, glyph: Glyph, cursor: int, baseline: int) -> None:
+        top = baseline - glyph.height - glyph.dy
+        shift = self._row_bits - (cursor + glyph.dx) - glyph.row_bits
+        for index, bits in enumerate(glyph.rows):
+            row = top + index
+            if not bits or not 0 <= row < self.height:
+                continue
+            if shift >= 0:
+                self._rows[row] |= (bits << shift) & self._row_mask
+            else:
+                self._rows[row] |= bits >> -shift
+            self._used_height = max(self._used_height, row + 1)
+
+    @property
+    def used_height(self) -> int:
+        """The height of the bitmap down to the lowest drawn pixel"""
+        return self._used_height
+
+    def pack(self, height: Optional[int] = None) -> bytes:
+        """Packs the rows of pixels into bytes, most significant bit first
+
+        :param int height: (Optional) The number of rows to pack, default
+            is every row
+        """
+
+        if height is None:
+            height = self.height
+        stride = self._row_bits // 8
+        return b"".join(row.to_bytes(stride, "big") for row in self._rows[:height])
+
+
+_fonts: Dict[str, BDFFont] = {}
+
+
+def _get_font(filename: str) -> BDFFont:
+    """Gets a font, reading it the first time it is needed"""
+    font = _fonts.get(filename)
+    if font is None:
+        font = _fonts[filename] = BDFFont.from_file(filename)
+    return font
+
+
+def render_message(username: str, wrapped_message: str) -> Tuple[int, int, bytes]:
+    """Renders a message as the DisBadge would display it, cropped below
+    the last line of text
+
+    :param str username: The username shown above the message
+    :param str wrapped_message: The message, already wrapped into lines
+        (see `RPiDiscordMessage.wrapped_message`)
+    :return: The width, height, and packed rows of pixels of the bitmap
+    :rtype: Tuple[int, int, bytes]
+    """
+
+    canvas = BitmapCanvas(SCREEN_WIDTH, SCREEN_HEIGHT)
+    canvas.draw_text(_get_font(TITLE_FONTNAME), username, 0, USERNAME_Y)
+    canvas.draw_text(_get_font(MESSAGE_FONTNAME), wrapped_message, 0, MESSAGE_Y)
+    height = canvas.used_height
+    return SCREEN_WIDTH, height, canvas.pack(height)
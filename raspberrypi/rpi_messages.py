@@ -1,16 +1,146 @@
-from typing import Dict
-from shared.messages import DiscordMessageBase
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+from shared import layout
+from shared.messages import CommandType, DiscordMessageBase
 from shared.uri_codec import encode_dictionary
+from shared.record_codec import encode_record
+from shared.bitmap_codec import encode_bitmap
+from raspberrypi.render import MESSAGE_FONTNAME, render_message
+
+_message_wrapper: Optional[layout.PixelWrapper] = None
+
+
+def _get_message_wrapper() -> layout.PixelWrapper:
+    """Gets the wrapper for the PyBadge's message font, reading the font
+    the first time it is needed"""
+    global _message_wrapper  # pylint: disable=global-statement
+    if _message_wrapper is None:
+        _message_wrapper = layout.PixelWrapper(
+            layout.GlyphWidths.from_bdf(MESSAGE_FONTNAME), cache_size=0
+        )
+    return _message_wrapper
 
 
 class RPiDiscordMessage(DiscordMessageBase):
     """The extension of DiscordMessage Base that is used by the
-    Raspberry Pi"""
-
-    def to_dict(self) -> Dict[str, str]:
-        prelim_dict = {
-            "message": self._message,
-            "user": self._user,
-            "cmdtype": str(self._cmd_type),
-        }
-        return encode_dictionary(prelim_dict)
+    Raspberry Pi.  Encoded forms of the message are kept, so a message
+    sent to several DisBadges is only encoded once."""
+
+    def __init__(
+        self,
+        message: Optional[str] = None,
+        user: Optional[str] = None,
+        cmd_type: int = CommandType.NONE,
+        prewrapped: bool = False,
+    ) -> None:
+
+        super().__init__(message, user, cmd_type, prewrapped)
+
+        self.trace_id: Optional[int] = None
+        """The trace ID sent with the message, if it is being traced (see
+        `raspberrypi.tracing`)"""
+
+        self.created = 0.0
+        """When tracing the message started, from `time.monotonic`"""
+
+        self._encoded_for: Tuple = ()
+        self._encodings: Dict[str, object] = {}
+
+    def _encoding(self, name: str) -> object:
+        """Gets a previously generated encoding, if the message hasn't
+        changed since"""
+        key = (
+            self._message,
+            self._user,
+            self._cmd_type,
+            self._prewrapped,
+            self.trace_id,
+        )
+        if key != self._encoded_for:
+            self._encoded_for = key
+            self._encodings = {}
+        return self._encodings.get(name)
+
+    def wrapped_message(self) -> str:
+        """The message wrapped and truncated exactly as the DisBadge would
+        display it, using the DisBadge's font metrics"""
+        encoded = self._encoding("wrapped")
+        if encoded is None:
+            if self._prewrapped:
+                encoded = self._message
+            else:
+                lines = _get_message_wrapper().wrap(
+                    self._message, layout.MESSAGE_WIDTH, layout.MESSAGE_MAX_LINES
+                )
+                encoded = "\n".join(lines)
+            self._encodings["wrapped"] = encoded
+        return encoded
+
+    def to_dict(self, prewrap: bool = False) -> Dict[str, str]:
+        """Converts the message into a URI encoded dict
+
+        :param bool prewrap: (Optional) Whether to send the message already
+            wrapped for the DisBadge's screen, default is False
+        """
+        name = "dict-wrapped" if prewrap else "dict"
+        encoded = self._encoding(name)
+        if encoded is None:
+            prelim_dict = {
+                "message": self.wrapped_message() if prewrap else self._message,
+                "user": self._user,
+                "cmdtype": str(self._cmd_type),
+            }
+            if prewrap or self._prewrapped:
+                prelim_dict["prewrapped"] = "1"
+            if self.trace_id is not None:
+                prelim_dict["trace"] = str(self.trace_id)
+            encoded = self._encodings[name] = encode_dictionary(prelim_dict)
+        return encoded
+
+    def to_form_body(self, prewrap: bool = False) -> bytes:
+        """Converts the message into URI encoded form data, ready to be
+        sent as a request body
+
+        :param bool prewrap: (Optional) Whether to send the message already
+            wrapped for the DisBadge's screen, default is False
+        """
+        name = "form-wrapped" if prewrap else "form"
+        encoded = self._encoding(name)
+        if encoded is None:
+            encoded = self._encodings[name] = urlencode(self.to_dict(prewrap)).encode()
+        return encoded
+
+    def to_bytes(self, prewrap: bool = False) -> bytes:
+        """Converts the message into the compact record format
+
+        :param bool prewrap: (Optional) Whether to send the message already
+            wrapped for the DisBadge's screen, default is False
+        """
+        name = "record-wrapped" if prewrap else "record"
+        encoded = self._encoding(name)
+        if encoded is None:
+            encoded = self._encodings[name] = encode_record(
+                self.wrapped_message() if prewrap else self._message,
+                self._user,
+                self._cmd_type,
+                prewrap or self._prewrapped,
+                self.trace_id,
+            )
+        return encoded
+
+    def to_bitmap_body(self) -> bytes:
+        """Renders the message as the DisBadge would display it, and
+        converts it into a record followed by the packed bitmap (see
+        `shared.bitmap_codec`)"""
+        encoded = self._encoding("bitmap")
+        if encoded is None:
+            wrapped = self.wrapped_message()
+            encoded = self._encodings["bitmap"] = b"".join(
+                [
+                    encode_record(
+                        wrapped, self._user, self._cmd_type, True, self.trace_id
+                    ),
+                    encode_bitmap(*render_message(self.username, wrapped)),
+                ]
+            )
+        return encoded
@@ -0,0 +1,225 @@
+"""
+`raspberrypi.tracing`
+====================================================
+
+End-to-end latency tracing, from a slash command being received to the
+message being on the DisBadge's screen.  Traced messages carry a trace
+ID; the Raspberry Pi times how long each waits to be sent and how long
+its delivery takes, and the DisBadge reports when it decoded, showed,
+and finished notifying for each one.
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+import collections
+import functools
+import itertools
+import time
+from typing import Deque, Dict, Iterable, List, Tuple
+import aiohttp
+from raspberrypi.delivery import BadgeClient, DeliveryResult
+from raspberrypi.rpi_messages import RPiDiscordMessage
+
+STAGES = ("queued", "delivered", "decoded", "splash", "layout", "sound", "total")
+"""The stages timed for each message.  ``queued`` is the time from the
+slash command until sending started, and ``delivered`` how long the
+request took.  ``decoded``, ``splash``, ``layout`` and ``sound`` are
+measured on the DisBadge from receiving the message until it was
+decoded, its notification splash was shown, its text was laid out, and
+its notification sound finished.  ``total`` is the time from the slash
+command until the notification finished."""
+
+_BADGE_STAGES = STAGES[2:6]
+
+_trace_ids = itertools.count(1)
+
+
+def start_trace(message: RPiDiscordMessage) -> None:
+    """Gives a message a trace ID and starts timing it
+
+    :param RPiDiscordMessage message: The message to trace
+    """
+
+    message.trace_id = next(_trace_ids)
+    message.created = time.monotonic()
+
+
+class LatencyHistogram:
+    """The most recent latencies of a stage, in milliseconds
+
+    :param int max_samples: (Optional) The number of latencies kept,
+        default is 1000
+    """
+
+    def __init__(self, max_samples: int = 1000) -> None:
+
+        self._samples: Deque[float] = collections.deque(maxlen=max_samples)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        """Adds a latency
+
+        :param float latency: The latency, in milliseconds
+        """
+
+        self._samples.append(latency)
+
+    def percentiles(self, *percents: float) -> List[float]:
+        """Gets percentiles of the latencies, using the nearest rank
+
+        :param float percents: The percentiles to get, from 0 to 100
+        :return: The latencies at each percentile, or 0 if there are none
+        :rtype: List[float]
+        """
+
+        if not self._samples:
+            return [0.0 for _ in percents]
+        ordered = sorted(self._samples)
+        last = len(ordered) - 1
+        return [
+            ordered[min(last, int(percent / 100 * len(ordered)))]
+            for percent in percents
+        ]
+
+
+class TraceCollector:
+    """Collects the stage times of traced messages from the results of
+    their deliveries and from the DisBadges' trace reports, and keeps a
+    histogram of each stage.  The collector adds a result callback to each
+    client.
+
+    :param clients: The clients for each DisBadge
+    :param float interval: (Optional) How often to collect trace reports
+        from the DisBadges, in seconds; default is 5
+    :param int max_samples: (Optional) The number of latencies kept for
+        each stage, default is 1000
+    """
+
+    def __init__(
+        self,
+        clients: Iterable[BadgeClient],
+        interval: float = 5,
+        max_samples: int = 1000,
+    ) -> None:
+
+        self.clients = list(clients)
+        self.interval = interval
+        self.histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram(max_samples) for stage in STAGES
+        }
+        # Times measured on the Pi, waiting for the DisBadge's report
+        self._sent: Dict[Tuple[str, int], float] = {}
+        self._max_sent = max_samples
+        self._task = None
+        for client in self.clients:
+            client.result_callbacks.append(
+                functools.partial(self.record_result, client.host)
+            )
+
+        self.reports = 0
+        """The number of trace reports collected from DisBadges"""
+
+    def record_result(self, host: str, result: DeliveryResult) -> None:
+        """Records how long a traced message waited and took to deliver
+
+        :param str host: The DisBadge the message was delivered to
+        :param DeliveryResult result: The outcome of the delivery
+        """
+
+        message = result.message
+        if not result.ok or message.trace_id is None:
+            return
+        latency = result.latency * 1000
+        queued = max(0.0, (time.monotonic() - message.created) * 1000 - latency)
+        self.histograms["queued"].add(queued)
+        self.histograms["delivered"].add(latency)
+        if len(self._sent) >= self._max_sent:
+            # Forget the oldest, which the DisBadge will never report
+            del self._sent[next(iter(self._sent))]
+        self._sent[(host, message.trace_id)] = queued + latency
+
+    def add_report(self, host: str, report: str) -> None:
+        """Adds a DisBadge's trace report (see the DisBadge's
+        ``trace_log.TraceLog.report``)
+
+        :param str host: The DisBadge the report came from
+        :param str report: The report
+        """
+
+        self.reports += 1
+        for line in report.splitlines():
+            fields = line.split()
+            if len(fields) != len(_BADGE_STAGES) + 1:
+                continue
+            trace_id = int(fields[0])
+            times = [int(field) for field in fields[1:]]
+            for stage, stage_time in zip(_BADGE_STAGES, times):
+                if stage_time >= 0:
+                    self.histograms[stage].add(stage_time)
+            sent = self._sent.pop((host, trace_id), None)
+            if sent is not None and times[-1] >= 0:
+                # Receiving and decoding happen during the delivery, so only
+                # add the time the DisBadge took after that
+                self.histograms["total"].add(sent + times[-1] - times[0])
+
+    async def collect(self, client: BadgeClient) -> None:
+        """Collects the trace report of a DisBadge
+
+        :param BadgeClient client: The client for the DisBadge
+        """
+
+        try:
+            status, report = await client.fetch("traces")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return
+        if status == 200:
+            self.add_report(client.host, report)
+
+    def dump(self) -> str:
+        """Formats the p50, p95 and p99 latency of every stage as a table
+
+        :return: The table
+        :rtype: str
+        """
+
+        lines = [
+            "{:>10} {:>6} {:>9} {:>9} {:>9}".format(
+                "stage", "count", "p50 ms", "p95 ms", "p99 ms"
+            )
+        ]
+        for stage in STAGES:
+            histogram = self.histograms[stage]
+            lines.append(
+                "{:>10} {:>6} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+                    stage, len(histogram), *histogram.percentiles(50, 95, 99)
+                )
+            )
+        return "\n".join(lines)
+
+    def start(self) -> None:
+        """Starts collecting trace reports, if not already started"""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._collect_forever())
+
+    async def stop(self) -> None:
+        """Stops collecting trace reports"""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _collect_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for client in self.clients:
+                if client.breaker is None or not client.breaker.is_open:
+                    await self.collect(client)
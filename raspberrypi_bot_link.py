@@ -2,11 +2,13 @@
 Bot link for the DisBadge!
 """
 import argparse
+import signal
 import discord
 from discord.commands.context import ApplicationContext
-import requests
 from shared.messages import CommandType
-from raspberrypi.rpi_messages import RPiDiscordMessage
+from raspberrypi.admission import AdmissionStates
+from raspberrypi.delivery import BadgeClient, DeliveryResult
+from raspberrypi.pipeline import MessagePipeline
 from shared.secrets import (  # pylint: disable=ungrouped-imports,no-name-in-module
     secrets,
 )
@@ -14,39 +16,206 @@ from shared.secrets import (  # pylint: disable=ungrouped-imports,no-name-in-mod
 # Define variables used throughout Discord bot
 MY_NAME = "Tekktrik"
 MY_NUMBER = "0458"
+BUSY_TEXT = "{0} has too many messages right now, try again later!"
+SLOW_DOWN_TEXT = "You're sending messages too quickly, try again in a minute!"
 
 
-parser = argparse.ArgumentParser(description="Set the IP address for the PyBadge")
-parser.add_argument("ip", metavar="IP", type=str, help="the IP address")
+parser = argparse.ArgumentParser(description="Set the IP addresses for the PyBadges")
+parser.add_argument(
+    "ip", metavar="IP", type=str, nargs="+", help="the IP address of each PyBadge"
+)
+parser.add_argument(
+    "--timeout",
+    help="The timeout for each request to a PyBadge, in seconds",
+    type=float,
+    default=5,
+)
 parser.add_argument(
     "--mute", help="Mute DisBadge for notification sounds", action="store_true"
 )
+parser.add_argument(
+    "--compact",
+    help="Send messages using the compact record format instead of form data",
+    action="store_true",
+)
+parser.add_argument(
+    "--prewrap",
+    help="Wrap messages for the PyBadge's screen before sending them",
+    action="store_true",
+)
+parser.add_argument(
+    "--bitmaps",
+    help="Render messages into bitmaps before sending them to the PyBadge",
+    action="store_true",
+)
+parser.add_argument(
+    "--coalesce",
+    help="Merge messages from the same user sent within this many seconds",
+    type=float,
+    default=0,
+)
+parser.add_argument(
+    "--user-rate",
+    help="The number of messages per minute each user can send",
+    type=float,
+    default=6,
+)
+parser.add_argument(
+    "--user-burst",
+    help="The number of messages each user can send at once",
+    type=float,
+    default=3,
+)
+parser.add_argument(
+    "--global-rate",
+    help="The number of messages per minute that can be sent in total",
+    type=float,
+    default=60,
+)
+parser.add_argument(
+    "--global-burst",
+    help="The number of messages that can be sent at once in total",
+    type=float,
+    default=10,
+)
+parser.add_argument(
+    "--probe-interval",
+    help="How often to check that each PyBadge is reachable, in seconds",
+    type=float,
+    default=10,
+)
+parser.add_argument(
+    "--trace",
+    help="Time each message from the slash command until it is on the PyBadge",
+    action="store_true",
+)
+parser.add_argument(
+    "--stats-interval",
+    help="How often to collect diagnostics from each PyBadge, in seconds",
+    type=float,
+    default=0,
+)
+parser.add_argument(
+    "--batch-window",
+    help="How long to wait for the rest of a burst of messages, in seconds",
+    type=float,
+    default=0,
+)
+parser.add_argument(
+    "--max-backlog",
+    help="The most messages that can wait to be sent before more are refused",
+    type=int,
+    default=500,
+)
+parser.add_argument(
+    "--outbox",
+    help="The file used to store messages until they are delivered",
+    default="disbadge_outbox.db",
+)
 args = parser.parse_args()
 
-IP_ADDRESS = args.ip
+IP_ADDRESSES = list(dict.fromkeys(args.ip))
+
+
+# pylint: disable=too-few-public-methods
+class BotLink(discord.Bot):
+    """The Discord bot, which stores any messages still being merged in
+    the outbox when it shuts down"""
+
+    async def close(self) -> None:
+        """Stops delivering messages, then logs out of Discord"""
+        if not self.is_closed():
+            await pipeline.stop()
+        await super().close()
+
 
 # Prepare Discord bot
-bot = discord.Bot()
+bot = BotLink()
+
+# Prepare delivery to each DisBadge
+badges = [
+    BadgeClient(
+        ip_address,
+        timeout=args.timeout,
+        use_records=args.compact,
+        prewrap=args.prewrap,
+        render_bitmaps=args.bitmaps,
+        mute=args.mute,
+    )
+    for ip_address in IP_ADDRESSES
+]
 
 
-def send_message_post(message: str, user: str, command_type: int) -> None:
-    """Send a message to the PyBadge
+def report_delivery(result: DeliveryResult) -> None:
+    """Prints the outcome of delivering a message
+
+    :param DeliveryResult result: The outcome of the delivery
+    """
+
+    print(result)
+
+
+pipeline = MessagePipeline(
+    badges,
+    args.outbox,
+    coalesce=args.coalesce,
+    user_rate=args.user_rate / 60,
+    user_burst=args.user_burst,
+    global_rate=args.global_rate / 60,
+    global_burst=args.global_burst,
+    probe_interval=args.probe_interval,
+    trace=args.trace,
+    stats_interval=args.stats_interval,
+    batch_window=args.batch_window,
+    max_backlog=args.max_backlog,
+)
+for badge in badges:
+    badge.result_callbacks.append(report_delivery)
+
+
+def dump_diagnostics(*_args) -> None:
+    """Prints the latency of each stage of traced messages and the most
+    recent diagnostics from each PyBadge"""
+
+    print(pipeline.dump_diagnostics())
+
+
+def send_message_post(message: str, user: str, command_type: int) -> int:
+    """Add a message to be sent to every PyBadge in the background, if the
+    user hasn't sent too many messages.  Bursts are merged, and pings are
+    sent ahead of other messages.
 
     :param str message: The message to send
     :param str user: The user sending the message
     :param int command_type: The command type being used
+    :return: Whether the message was accepted, as an `AdmissionStates` value
+    :rtype: int
+    """
+
+    return pipeline.submit(message, str(user), command_type)
+
+
+async def respond_to_message(ctx: ApplicationContext, outcome: int, text: str):
+    """Lets the user know whether their message is being sent
+
+    :param ApplicationContext ctx: The application context
+    :param int outcome: The outcome of `send_message_post`
+    :param str text: The response if the message is being sent
     """
 
-    new_message = RPiDiscordMessage(message, str(user), command_type)
-    payload = new_message.to_dict()
-    print(payload)
-    requests.post("/".join(["http:/", IP_ADDRESS, "message"]), data=payload, timeout=5)
+    if outcome == AdmissionStates.ADMITTED:
+        await ctx.respond(text.format(MY_NAME))
+    elif outcome == AdmissionStates.USER_LIMITED:
+        await ctx.respond(SLOW_DOWN_TEXT)
+    else:
+        await ctx.respond(BUSY_TEXT.format(MY_NAME))
 
 
 @bot.event
 async def on_ready():
     """Method that runs when bot is ready"""
     print(f"We have logged in as {bot.user}")
+    await pipeline.start()
 
 
 @bot.slash_command(guild_ids=[secrets["guild-id"]])
@@ -57,8 +226,8 @@ async def cheer(ctx: ApplicationContext, message: str):
     :param str message: The message to send
     """
 
-    await ctx.respond("Sending your message to {0}!".format(MY_NAME))
-    send_message_post(message, ctx.user, CommandType.CHEER)
+    outcome = send_message_post(message, ctx.user, CommandType.CHEER)
+    await respond_to_message(ctx, outcome, "Sending your message to {0}!")
 
 
 @bot.slash_command(guild_ids=[secrets["guild-id"]])
@@ -69,8 +238,8 @@ async def hype(ctx: ApplicationContext, message: str):
     :param str message: The message to send
     """
 
-    await ctx.respond("Sending your hype to {0}!".format(MY_NAME))
-    send_message_post(message, ctx.user, CommandType.HYPE)
+    outcome = send_message_post(message, ctx.user, CommandType.HYPE)
+    await respond_to_message(ctx, outcome, "Sending your hype to {0}!")
 
 
 @bot.slash_command(guild_ids=[secrets["guild-id"]])
@@ -81,22 +250,16 @@ async def ping(ctx: ApplicationContext, message: str):
     :param str message: The message to send
     """
 
-    await ctx.respond("Pinging {0} with your message!".format(MY_NAME))
-    send_message_post(message, ctx.user, CommandType.PING)
-
-
-def activate_disbadge():
-    """Send an activation POST to the PyBadge"""
-
-    print("Activating...")
-    requests.post("/".join(["http:/", IP_ADDRESS, "activate"]), timeout=5)
-    if args.mute:
-        requests.post("/".join(["http:/", IP_ADDRESS, "sound", "off"]), timeout=5)
+    outcome = send_message_post(message, ctx.user, CommandType.PING)
+    await respond_to_message(ctx, outcome, "Pinging {0} with your message!")
 
 
 # Run blocking event code
 
-activate_disbadge()
+if args.trace or args.stats_interval:
+    signal.signal(signal.SIGUSR1, dump_diagnostics)
+
+# Each DisBadge is activated once its delivery starts
 bot.run(secrets["login-token"])
 # loop = asyncio.new_event_loop()
 # bluetooth_task = loop.create_task(bluetooth_functionality())
@@ -0,0 +1,90 @@
+"""
+`shared.bitmap_codec`
+====================================================
+
+Codec for sending a message that has already been rendered by the
+Raspberry Pi as a 1-bit bitmap.  The body is a record (see
+`shared.record_codec`) followed by the bitmap's size and its packed
+pixels:
+
+``2`` ``12:Tekktrik#0458`` ``11:Hello there`` ``160x91:`` ``AAAA...``
+
+Each row of pixels is packed into whole bytes, most significant bit
+first, and the pixels are sent base64 encoded so that the body survives
+being decoded into a string by the WSGI server.
+
+* Author(s): Alec Delaney
+
+"""
+
+import binascii
+
+try:
+    from typing import Tuple
+    from io import StringIO
+except ImportError:
+    pass
+
+BITMAP_CONTENT_TYPE = "application/x-disbadge-bitmap"
+"""The Content-Type used when sending rendered messages"""
+
+
+def row_stride(width: int) -> int:
+    """The number of bytes used for each row of a packed 1-bit bitmap
+
+    :param int width: The width of the bitmap in pixels
+    """
+
+    return (width + 7) // 8
+
+
+def encode_bitmap(width: int, height: int, pixels: bytes) -> bytes:
+    """Encodes a packed 1-bit bitmap
+
+    :param int width: The width of the bitmap in pixels
+    :param int height: The height of the bitmap in pixels
+    :param bytes pixels: The packed rows of pixels
+    :return: The ASCII encoded bitmap
+    :rtype: bytes
+    """
+
+    if len(pixels) != row_stride(width) * height:
+        raise ValueError("Pixel data does not match the bitmap size")
+
+    return b"".join(
+        [
+            "{}x{}:".format(width, height).encode(),
+            binascii.b2a_base64(pixels).rstrip(b"\n"),
+        ]
+    )
+
+
+def read_bitmap(stream: StringIO) -> Tuple[int, int, bytes]:
+    """Reads a packed 1-bit bitmap from a text stream, such as the rest of
+    a request body after the record
+
+    :param StringIO stream: The text stream containing the bitmap
+    :return: The width, height, and packed rows of pixels of the bitmap
+    :rtype: Tuple[int, int, bytes]
+    """
+
+    header = []
+    while True:
+        char = stream.read(1)
+        if char == ":":
+            break
+        if not char:
+            raise ValueError("Malformed bitmap size")
+        header.append(char)
+    try:
+        width, height = (int(size) for size in "".join(header).split("x"))
+    except ValueError as err:
+        raise ValueError("Malformed bitmap size") from err
+
+    byte_count = row_stride(width) * height
+    encoded_length = (byte_count + 2) // 3 * 4
+    encoded = stream.read(encoded_length)
+    if len(encoded) != encoded_length:
+        raise ValueError("Bitmap was truncated")
+    pixels = binascii.a2b_base64(encoded)
+    return width, height, pixels
@@ -0,0 +1,65 @@
+"""
+`shared.capabilities`
+====================================================
+
+The optional features a DisBadge's firmware supports, which it lists one
+per line from its ``/capabilities`` route, each followed by a value if it
+has one.  The Raspberry Pi asks for them before using anything newer
+than form data, as firmware from before the route existed crashes when
+sent a body it can't decode.
+
+* Author(s): Alec Delaney
+
+"""
+
+try:
+    from typing import Dict, Optional
+except ImportError:
+    pass
+
+
+# pylint: disable=too-few-public-methods
+class Capabilities:
+    """Enum-like class for the optional features of a DisBadge"""
+
+    RECORDS = "records"
+    BATCH = "batch"
+    BITMAPS = "bitmaps"
+    TRACES = "traces"
+    STATS = "stats"
+    QUEUE = "queue"
+    """The number of messages the DisBadge can hold waiting to be shown,
+    which no batch should be larger than"""
+
+
+def encode_capabilities(capabilities: Dict[str, Optional[int]]) -> str:
+    """Lists capabilities one per line, each followed by its value if it
+    has one
+
+    :param dict capabilities: The value of each capability, as
+        `Capabilities` values, or None for those without a value
+    :return: The list of capabilities
+    :rtype: str
+    """
+
+    return "\n".join(
+        name if value is None else "{} {}".format(name, value)
+        for name, value in capabilities.items()
+    )
+
+
+def decode_capabilities(text: str) -> Dict[str, Optional[int]]:
+    """Reads a list of capabilities, ignoring blank lines
+
+    :param str text: The capabilities, one per line
+    :return: The value of each capability, or None for those without a
+        value
+    :rtype: Dict[str, Optional[int]]
+    """
+
+    capabilities = {}
+    for line in text.splitlines():
+        name, _, value = line.strip().partition(" ")
+        if name:
+            capabilities[name] = int(value) if value else None
+    return capabilities
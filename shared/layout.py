@@ -10,32 +10,209 @@ across the PyBadge and Raspberry Pi
 """
 
 try:
-    from typing import List
+    from typing import Callable, Dict, List, Optional, Tuple
 except ImportError:
     pass
 
+MESSAGE_WIDTH = 160
+"""The width available to message text on the PyBadge, in pixels"""
+
+MESSAGE_MAX_LINES = 5
+"""The maximum number of lines of message text shown on the PyBadge"""
+
+
+def _wrap(
+    string: str,
+    measure: Callable[[str], int],
+    space_width: int,
+    max_width: int,
+    max_lines: Optional[int] = None,
+) -> List[str]:
+    """Wraps text word by word, stopping once ``max_lines`` lines have
+    been produced
+
+    :param str string: The text to be wrapped
+    :param measure: Function that returns the width of a word
+    :param int space_width: The width of a space between words
+    :param int max_width: The maximum width of a line
+    :param int max_lines: (Optional) The maximum number of lines to produce,
+        default is no limit
+    """
+
+    string = string.replace("\n", "").replace("\r", "")  # strip confusing newlines
+    the_lines = []
+    line_words = []
+    line_width = 0
+    start = 0
+    length = len(string)
+    while start <= length:
+        end = string.find(" ", start)
+        if end == -1:
+            end = length
+        word = string[start:end]
+        word_width = measure(word)
+        if not line_words:
+            line_words.append(word)
+            line_width = word_width
+        elif line_width + space_width + word_width <= max_width:
+            line_words.append(word)
+            line_width += space_width + word_width
+        else:
+            the_lines.append(" ".join(line_words))
+            if max_lines is not None and len(the_lines) >= max_lines:
+                return the_lines
+            line_words = [word]
+            line_width = word_width
+        start = end + 1
+    if line_words:  # last line remaining
+        the_lines.append(" ".join(line_words))
+    return the_lines
+
+
 # cribbed from adafruit_display_notification
-def wrap_text(string: str, max_chars: int) -> List[str]:
+def wrap_text(
+    string: str, max_chars: int, max_lines: Optional[int] = None
+) -> List[str]:
     """A helper that will return a list of lines with word-break wrapping.
 
     :param str string: The text to be wrapped.
     :param int max_chars: The maximum number of characters on a line before wrapping.
+    :param int max_lines: (Optional) The maximum number of lines to return,
+        default is no limit
     :return: A list of strings representing the wrapped message
     :rtype: List[str]
     """
 
-    string = string.replace("\n", "").replace("\r", "")  # strip confusing newlines
-    words = string.split(" ")
-    the_lines = []
-    the_line = ""
-    for word in words:
-        if len(the_line + " " + word) <= max_chars:
-            the_line += " " + word
-        else:
-            the_lines.append(the_line)
-            the_line = "" + word
-    if the_line:  # last line remaining
-        the_lines.append(the_line)
-    # remove first space from first line:
-    the_lines[0] = the_lines[0][1:]
-    return the_lines
+    return _wrap(string, len, 1, max_chars, max_lines)
+
+
+class GlyphWidths:
+    """The advance width in pixels of each glyph in a font
+
+    :param bytearray widths: The widths of the code points 0-255
+    :param int default_width: The width to use for any glyph not in
+        ``widths`` or ``extra_widths``
+    :param dict extra_widths: (Optional) The widths of any code points
+        above 255, default is None
+    """
+
+    def __init__(
+        self,
+        widths: bytearray,
+        default_width: int,
+        extra_widths: Optional[Dict[int, int]] = None,
+    ) -> None:
+
+        self._widths = widths
+        self._default_width = default_width
+        self._extra_widths = extra_widths if extra_widths else {}
+
+    @classmethod
+    def from_bdf(cls, filename: str) -> "GlyphWidths":
+        """Reads the glyph widths from a BDF font file
+
+        :param str filename: The filename of the BDF font
+        """
+
+        widths = bytearray(256)
+        extra_widths = {}
+        default_width = 0
+        encoding = -1
+        with open(filename, "r") as font_file:
+            for line in font_file:
+                if line.startswith("ENCODING "):
+                    encoding = int(line.split()[1])
+                elif line.startswith("DWIDTH ") and encoding >= 0:
+                    width = int(line.split()[1])
+                    if encoding < 256:
+                        widths[encoding] = width
+                    else:
+                        extra_widths[encoding] = width
+                    encoding = -1
+                elif line.startswith("FONTBOUNDINGBOX "):
+                    default_width = int(line.split()[1])
+        return cls(widths, default_width, extra_widths)
+
+    def width(self, character: str) -> int:
+        """The width of a single character in pixels
+
+        :param str character: The character
+        """
+
+        code = ord(character)
+        if code < 256:
+            return self._widths[code] or self._default_width
+        return self._extra_widths.get(code, self._default_width)
+
+    def measure(self, text: str) -> int:
+        """The width of a string of text in pixels
+
+        :param str text: The text to measure
+        """
+
+        total = 0
+        widths = self._widths
+        for character in text:
+            code = ord(character)
+            if code < 256 and widths[code]:
+                total += widths[code]
+            else:
+                total += self.width(character)
+        return total
+
+
+class PixelWrapper:
+    """Word-wraps text to a width in pixels, keeping the results for the
+    most recently wrapped texts
+
+    :param GlyphWidths glyph_widths: The glyph widths of the font used
+    :param int cache_size: (Optional) The number of results to keep,
+        default is 4
+    """
+
+    def __init__(self, glyph_widths: GlyphWidths, cache_size: int = 4) -> None:
+
+        self._glyph_widths = glyph_widths
+        self._space_width = glyph_widths.width(" ")
+        self._cache_size = cache_size
+        self._cache = {}
+        self._cache_order = []
+
+    def wrap(
+        self, string: str, max_width: int, max_lines: Optional[int] = None
+    ) -> List[str]:
+        """Wraps text so that each line fits in the given width
+
+        :param str string: The text to be wrapped
+        :param int max_width: The maximum width of a line in pixels
+        :param int max_lines: (Optional) The maximum number of lines to
+            return, default is no limit
+        :return: A list of strings representing the wrapped message
+        :rtype: List[str]
+        """
+
+        key = (string, max_width, max_lines)
+        lines = self._cache.get(key)
+        if lines is not None:
+            self._cache_order.remove(key)
+            self._cache_order.append(key)
+            return lines
+
+        lines = _wrap(
+            string,
+            self._glyph_widths.measure,
+            self._space_width,
+            max_width,
+            max_lines,
+        )
+        if self._cache_size:
+            if len(self._cache_order) >= self._cache_size:
+                del self._cache[self._cache_order.pop(0)]
+            self._cache[key] = lines
+            self._cache_order.append(key)
+        return lines
+
+    @property
+    def cache_info(self) -> Tuple[int, int]:
+        """The number of cached results and the maximum number of results"""
+        return len(self._cache_order), self._cache_size
@@ -31,6 +31,8 @@ class DiscordMessageBase:
     :param str user: (Optional) The sender of the message; defualt is None
     :param int cmd_type: (Optional) The slash command type used to send the
         message; default is CommandType.NONE
+    :param bool prewrapped: (Optional) Whether the message has already been
+        wrapped into lines for the PyBadge's screen; default is False
     """
 
     def __init__(
@@ -38,11 +40,13 @@ class DiscordMessageBase:
         message: Optional[str] = None,
         user: Optional[str] = None,
         cmd_type: int = CommandType.NONE,
+        prewrapped: bool = False,
     ) -> None:
 
         self._message = message
         self._user = user
         self._cmd_type = cmd_type
+        self._prewrapped = prewrapped
 
     def __repr__(self) -> str:
         return "{0}: {1}".format(self.user, self.message)
@@ -98,6 +102,12 @@ class DiscordMessageBase:
     def cmd_type(self, command: int) -> None:
         self._cmd_type = command
 
+    @property
+    def prewrapped(self) -> bool:
+        """Whether the message has already been wrapped into lines, so the
+        PyBadge can display it as-is"""
+        return self._prewrapped
+
     def to_json(self) -> Dict[str, Any]:
         """Converts the message object into an equivalent dict, must be
         implemented in subclasses of DiscordMessageBase"""
@@ -0,0 +1,173 @@
+"""
+`shared.record_codec`
+====================================================
+
+Compact alternative to the URI codec for sending Discord messages from
+the Raspberry Pi to the PyBadge.  A record is a single command type
+character followed by the user and message fields, each prefixed with
+its length and a colon:
+
+``2`` ``12:Tekktrik#0458`` ``11:Hello there``
+
+If the message has already been wrapped into lines for the PyBadge's
+screen, the command type character is followed by ``w``:
+
+``2`` ``w`` ``12:Tekktrik#0458`` ``11:Hello there``
+
+If the message is being traced, the flags include ``t`` and the trace ID
+follows the message as a third field:
+
+``2`` ``t`` ``12:Tekktrik#0458`` ``11:Hello there`` ``2:42``
+
+Text is sent as UTF-8 and lengths count characters rather than bytes, so
+a record survives being decoded into a string by the WSGI server before
+it is parsed.  Records are self-delimiting, so several can be sent one
+after another in the same request body.
+
+* Author(s): Alec Delaney
+
+"""
+
+from io import StringIO
+
+try:
+    from typing import Iterator, Optional, Tuple, Union
+
+    Record = Tuple[str, str, int, bool, Optional[int]]
+except ImportError:
+    pass
+
+RECORD_CONTENT_TYPE = "application/x-disbadge-record"
+"""The Content-Type used when sending records"""
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+"""The Content-Type used when sending URI encoded form data"""
+
+_CMD_TYPE_OFFSET = 48  # ord("0")
+_PREWRAPPED_FLAG = "w"
+_TRACED_FLAG = "t"
+
+
+def _encode_field(text: str) -> str:
+    return "".join([str(len(text)), ":", text])
+
+
+def encode_record(
+    message: str,
+    user: str,
+    cmd_type: int,
+    prewrapped: bool = False,
+    trace_id: Optional[int] = None,
+) -> bytes:
+    """Encodes a message as a record
+
+    :param str message: The Discord message
+    :param str user: The sender of the message
+    :param int cmd_type: The slash command type used to send the message
+    :param bool prewrapped: (Optional) Whether the message has already been
+        wrapped into lines for the PyBadge, default is False
+    :param int trace_id: (Optional) The trace ID of the message, default is
+        None for a message that isn't traced
+    :return: The UTF-8 encoded record
+    :rtype: bytes
+    """
+
+    if not 0 <= cmd_type <= 9:
+        raise ValueError("Command type must fit in a single character")
+
+    return "".join(
+        [
+            chr(_CMD_TYPE_OFFSET + cmd_type),
+            _PREWRAPPED_FLAG if prewrapped else "",
+            _TRACED_FLAG if trace_id is not None else "",
+            _encode_field(user),
+            _encode_field(message),
+            _encode_field(str(trace_id)) if trace_id is not None else "",
+        ]
+    ).encode("utf-8")
+
+
+def _read_field(stream: StringIO, first_char: str = "") -> str:
+    digits = [first_char] if first_char else []
+    while True:
+        char = stream.read(1)
+        if char == ":":
+            break
+        if not char or not "0" <= char <= "9":
+            raise ValueError("Malformed record field length")
+        digits.append(char)
+    if not digits:
+        raise ValueError("Malformed record field length")
+    length = int("".join(digits))
+    text = stream.read(length)
+    if len(text) != length:
+        raise ValueError("Record field was truncated")
+    return text
+
+
+def _read_body(stream: StringIO, cmd_char: str) -> Record:
+    cmd_type = ord(cmd_char) - _CMD_TYPE_OFFSET
+    if not 0 <= cmd_type <= 9:
+        raise ValueError("Malformed record command type")
+    prewrapped = False
+    traced = False
+    char = stream.read(1)
+    while char in (_PREWRAPPED_FLAG, _TRACED_FLAG):
+        if char == _PREWRAPPED_FLAG:
+            prewrapped = True
+        else:
+            traced = True
+        char = stream.read(1)
+    user = _read_field(stream, char)
+    message = _read_field(stream)
+    trace_id = int(_read_field(stream)) if traced else None
+    return message, user, cmd_type, prewrapped, trace_id
+
+
+def read_record(stream: StringIO) -> Record:
+    """Reads a single record from a text stream, such as a request body
+
+    :param StringIO stream: The text stream containing the record
+    :return: The message, user, command type, whether the message is
+        already wrapped, and the trace ID (or None)
+    :rtype: Tuple[str, str, int, bool, Optional[int]]
+    """
+
+    cmd_char = stream.read(1)
+    if not cmd_char:
+        raise ValueError("Empty record")
+    return _read_body(stream, cmd_char)
+
+
+def iter_records(stream: StringIO) -> Iterator[Record]:
+    """Reads records from a text stream until it is exhausted
+
+    :param StringIO stream: The text stream containing the records
+    :return: An iterator of the message, user, command type, whether the
+        message is already wrapped, and the trace ID (or None), for each
+        record
+    :rtype: Iterator[Tuple[str, str, int, bool, Optional[int]]]
+    """
+
+    while True:
+        cmd_char = stream.read(1)
+        if not cmd_char:
+            return
+        yield _read_body(stream, cmd_char)
+
+
+def decode_record(record: Union[str, bytes]) -> Record:
+    """Decodes a complete record
+
+    :param str|bytes record: The record, either as a string or as UTF-8
+        encoded bytes
+    :return: The message, user, command type, whether the message is
+        already wrapped, and the trace ID (or None)
+    :rtype: Tuple[str, str, int, bool, Optional[int]]
+    """
+
+    if not isinstance(record, str):
+        record = str(record, "utf-8")
+    if not record:
+        raise ValueError("Empty record")
+    return _read_body(StringIO(record[1:]), record[0])
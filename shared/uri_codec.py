@@ -1,14 +1,40 @@
-import re
+"""
+`shared.uri_codec`
+====================================================
+
+Codec for safely transmitting strings as URI-encoded form data between
+the Raspberry Pi and the PyBadge.  Any character that is not ASCII
+alphanumeric is transmitted as its code point surrounded by dashes,
+e.g. a space becomes ``-32-``.
+
+* Author(s): Alec Delaney
+
+"""
+
 import gc
 
 try:
-    from typing import Dict
+    from typing import Dict, Iterator, Tuple, Union
+    from io import BytesIO, StringIO
 except ImportError:
     pass
 
+_DASH = 45  # ord("-")
+
+# Lookup table of the ASCII characters that can be sent as-is
+_SAFE_TABLE = bytearray(128)
+for _code in range(48, 58):  # 0-9
+    _SAFE_TABLE[_code] = 1
+for _code in range(65, 91):  # A-Z
+    _SAFE_TABLE[_code] = 1
+for _code in range(97, 123):  # a-z
+    _SAFE_TABLE[_code] = 1
+del _code
+
 
 def _is_alphanumeric(character: str) -> bool:
-    return re.match("^[a-zA-Z0-9]+$", character)
+    code = ord(character)
+    return code < 128 and _SAFE_TABLE[code] == 1
 
 
 def _encode_character(character: str) -> str:
@@ -31,36 +57,134 @@ def _decode_character(char_str: str) -> str:
 
 
 def encode_characters(original: str) -> str:
-    payload = ""
-    for char in original:
-        if not _is_alphanumeric(char):
-            char = _encode_character(char)
-        payload += char
-    gc.collect()
-    return payload
+    """Encodes a string so that it only contains alphanumeric characters
+    and dashes
+
+    :param str original: The string to encode
+    :return: The encoded string
+    :rtype: str
+    """
+
+    pieces = []
+    run_start = 0
+    for index, char in enumerate(original):
+        code = ord(char)
+        if code < 128 and _SAFE_TABLE[code]:
+            continue
+        if run_start != index:
+            pieces.append(original[run_start:index])
+        pieces.append("-")
+        pieces.append(str(code))
+        pieces.append("-")
+        run_start = index + 1
+    if not pieces:
+        return original
+    if run_start < len(original):
+        pieces.append(original[run_start:])
+    return "".join(pieces)
 
 
 def decode_characters(payload: str) -> str:
-    translation = ""
-    payload_iter = iter(payload)
-    for char in payload_iter:
-        if char == "-":
-            sub_seq = char
-            try:
-                while True:
-                    next_char = next(payload_iter)
-                    sub_seq += next_char
-                    if next_char == "-":
-                        break
-            except StopIteration:
-                raise RuntimeError("Could not parse a special character in string")
-            char = _decode_character(sub_seq)
-        translation += char
-    gc.collect()
-    return translation
+    """Decodes a string previously encoded with `encode_characters`
+
+    :param str payload: The encoded string
+    :return: The decoded string
+    :rtype: str
+    """
+
+    start = payload.find("-")
+    if start == -1:
+        return payload
+    pieces = []
+    run_start = 0
+    while start != -1:
+        end = payload.find("-", start + 1)
+        if end == -1:
+            raise RuntimeError("Could not parse a special character in string")
+        if run_start != start:
+            pieces.append(payload[run_start:start])
+        pieces.append(chr(int(payload[start + 1 : end])))
+        run_start = end + 1
+        start = payload.find("-", run_start)
+    if run_start < len(payload):
+        pieces.append(payload[run_start:])
+    return "".join(pieces)
+
+
+def encode_bytes(original: bytes) -> bytes:
+    """Encodes UTF-8 text given as bytes, producing the same output as
+    `encode_characters` but as ASCII bytes
+
+    :param bytes original: The UTF-8 encoded text
+    :return: The encoded payload
+    :rtype: bytes
+    """
+
+    payload = bytearray()
+    run_start = 0
+    index = 0
+    length = len(original)
+    while index < length:
+        code = original[index]
+        if code < 128 and _SAFE_TABLE[code]:
+            index += 1
+            continue
+        if run_start != index:
+            payload.extend(original[run_start:index])
+        # Determine the length of the UTF-8 sequence from the lead byte
+        if code < 0x80:
+            width = 1
+        elif code < 0xE0:
+            width = 2
+        elif code < 0xF0:
+            width = 3
+        else:
+            width = 4
+        code_point = ord(str(original[index : index + width], "utf-8"))
+        payload.append(_DASH)
+        payload.extend(str(code_point).encode())
+        payload.append(_DASH)
+        index += width
+        run_start = index
+    if run_start < length:
+        payload.extend(original[run_start:])
+    return bytes(payload)
+
+
+def decode_bytes(payload: bytes) -> bytes:
+    """Decodes an ASCII payload previously encoded with `encode_bytes`
+    or `encode_characters`, returning the UTF-8 encoded text
+
+    :param bytes payload: The encoded payload
+    :return: The decoded UTF-8 text
+    :rtype: bytes
+    """
+
+    translation = bytearray()
+    run_start = 0
+    start = payload.find(b"-")
+    while start != -1:
+        end = payload.find(b"-", start + 1)
+        if end == -1:
+            raise RuntimeError("Could not parse a special character in string")
+        if run_start != start:
+            translation.extend(payload[run_start:start])
+        translation.extend(chr(int(payload[start + 1 : end])).encode())
+        run_start = end + 1
+        start = payload.find(b"-", run_start)
+    if run_start < len(payload):
+        translation.extend(payload[run_start:])
+    return bytes(translation)
 
 
 def decode_payload(payload: str) -> Dict[str, str]:
+    """Decodes a URI-encoded form payload into a dict
+
+    :param str payload: The form payload (e.g. ``key1=value1&key2=value2``)
+    :return: The decoded key/value pairs
+    :rtype: Dict[str, str]
+    """
+
     payload_dict = {}
     kv_pairs = payload.split("&")
     for kv_str in kv_pairs:
@@ -72,7 +196,82 @@ def decode_payload(payload: str) -> Dict[str, str]:
     return payload_dict
 
 
+def iter_decode_payload(
+    stream: Union[StringIO, BytesIO], chunk_size: int = 64
+) -> Iterator[Tuple[str, str]]:
+    """Incrementally decodes a URI-encoded form payload from a file-like
+    object, yielding each key/value pair as soon as it is complete.  Only
+    one chunk and the field currently being parsed are held in memory.
+
+    :param StringIO|BytesIO stream: The file-like payload, such as a
+        request body
+    :param int chunk_size: (Optional) The number of characters to read
+        at a time, default is 64
+    :return: An iterator of decoded (key, value) pairs
+    :rtype: Iterator[Tuple[str, str]]
+    """
+
+    field = []
+    key = None
+    escape = None
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            chunk = str(chunk, "utf-8")
+        pos = 0
+        length = len(chunk)
+        while pos < length:
+            if escape is not None:
+                # Inside a -NNN- escape, which may continue from the last chunk
+                end = chunk.find("-", pos)
+                if end == -1:
+                    escape += chunk[pos:]
+                    break
+                field.append(chr(int(escape + chunk[pos:end])))
+                escape = None
+                pos = end + 1
+                continue
+            run_start = pos
+            while pos < length and chunk[pos] not in "-=&":
+                pos += 1
+            if run_start != pos:
+                field.append(chunk[run_start:pos])
+            if pos == length:
+                break
+            char = chunk[pos]
+            pos += 1
+            if char == "-":
+                escape = ""
+            elif char == "=":
+                if key is not None:
+                    raise ValueError("Unexpected '=' in payload value")
+                key = "".join(field)
+                field = []
+            else:
+                if key is None:
+                    raise ValueError("Missing '=' in payload field")
+                yield key, "".join(field)
+                key = None
+                field = []
+    if escape is not None:
+        raise RuntimeError("Could not parse a special character in string")
+    if key is None:
+        if field:
+            raise ValueError("Missing '=' in payload field")
+        return
+    yield key, "".join(field)
+
+
 def encode_dictionary(payload: Dict[str, str]) -> Dict[str, str]:
+    """Encodes the keys and values of a dict with `encode_characters`
+
+    :param dict payload: The dict to encode
+    :return: The encoded dict
+    :rtype: Dict[str, str]
+    """
+
     safe_dict = {}
     for key, value in payload.items():
         safe_dict[encode_characters(key)] = encode_characters(value)
@@ -0,0 +1,19 @@
+"""
+`conftest`
+====================================================
+
+Makes the DisBadge's modules importable the way they are on the device.
+The ``pybadge`` folder is added after the standard library, so that its
+``code.py`` doesn't hide the standard library's ``code`` module.
+
+* Author(s): Alec Delaney
+
+"""
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "pybadge"))
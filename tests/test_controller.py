@@ -0,0 +1,160 @@
+"""
+`test_controller`
+====================================================
+
+Tests for the `controller.MessageController` state machine, running the
+DisBadge's ``code.py`` on the simulator
+
+* Author(s): Alec Delaney
+
+"""
+
+import pytest
+import simulator
+from shared.messages import CommandType
+from shared.record_codec import RECORD_CONTENT_TYPE, encode_record
+
+# The DisBadge's modules need the fake CircuitPython libraries to import
+simulator.install_fake_modules()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from controller import ControllerStates
+from states import Buttons, DisplayStateIDs, LEDStateIDs
+
+SOUND_DURATION = 2.0
+
+# Long enough for the main loop to receive a message and act on it
+STEP = 0.2
+
+
+@pytest.fixture(name="badge")
+def fixture_badge() -> simulator.Simulator:
+    """A simulated DisBadge that has been activated and is in its main loop"""
+    badge = simulator.Simulator(sound_duration=SOUND_DURATION)
+    badge.start()
+    return badge
+
+
+def send(badge: simulator.Simulator, text: str, cmd_type: int = CommandType.CHEER):
+    """Sends a message to the DisBadge and lets the main loop pick it up"""
+    record = encode_record(text, "user#0001", cmd_type).decode()
+    badge.request("POST", "/message", record, RECORD_CONTENT_TYPE)
+    badge.run(STEP)
+
+
+def controller_state(badge: simulator.Simulator) -> int:
+    """The state of the DisBadge's message controller"""
+    return badge.code.controller.state
+
+
+def dwell_time(badge: simulator.Simulator) -> float:
+    """The least time a message is shown before the next replaces it"""
+    return badge.code.MESSAGE_DWELL_TIME
+
+
+def test_idle_without_messages(badge):
+    """Nothing happens until a message arrives"""
+    badge.run(1.0)
+    assert controller_state(badge) == ControllerStates.IDLE
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.NO_MESSAGE
+
+
+def test_message_lifecycle(badge):
+    """A message is notified, shown once its sound has played, then
+    removed once its pin time is up"""
+    send(badge, "hello")
+    assert controller_state(badge) == ControllerStates.NOTIFYING
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.CHEER
+    assert badge.code.disbadge.animation == LEDStateIDs.CHEER
+
+    badge.run(SOUND_DURATION)
+    assert controller_state(badge) == ControllerStates.SHOWING
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.MESSAGE
+
+    badge.run(badge.code.MESSAGE_PIN_TIME * 60)
+    assert controller_state(badge) == ControllerStates.IDLE
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.NO_MESSAGE
+    assert badge.code.disbadge.animation == LEDStateIDs.NONE
+
+
+def test_ping_notification(badge):
+    """Pings have their own splash screen and animation"""
+    send(badge, "hey", CommandType.PING)
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.PING
+    assert badge.code.disbadge.animation == LEDStateIDs.PING
+
+
+def test_button_b_skips_sound(badge):
+    """Pressing B while notifying stops the sound and shows the message"""
+    send(badge, "hello")
+    badge.press(Buttons.BUTTON_B)
+    badge.run(STEP)
+    assert controller_state(badge) == ControllerStates.SHOWING
+
+
+def test_button_b_dismisses(badge):
+    """Pressing B while a message is shown removes it"""
+    send(badge, "hello")
+    badge.run(SOUND_DURATION)
+    badge.press(Buttons.BUTTON_B)
+    badge.run(STEP)
+    assert controller_state(badge) == ControllerStates.IDLE
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.NO_MESSAGE
+
+
+def test_new_message_waits_for_dwell_time(badge):
+    """A new message replaces the shown message once it has been shown
+    for the dwell time"""
+    send(badge, "first")
+    badge.run(SOUND_DURATION)
+    send(badge, "second", CommandType.HYPE)
+    assert controller_state(badge) == ControllerStates.SHOWING
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.MESSAGE
+
+    badge.run(dwell_time(badge))
+    assert controller_state(badge) == ControllerStates.NOTIFYING
+    assert badge.code.disbadge.current_splash == DisplayStateIDs.HYPE
+
+
+def test_burst_shows_every_message(badge):
+    """Every message in a burst is shown for at least the dwell time, in
+    the order they arrived"""
+    texts = ("one", "two", "three")
+    for text in texts:
+        record = encode_record(text, "user#0001", CommandType.CHEER).decode()
+        badge.request("POST", "/message", record, RECORD_CONTENT_TYPE)
+    message_queue = badge.code.global_state.MESSAGE_QUEUE
+    shown = {}
+    for _ in range(int(len(texts) * (SOUND_DURATION + dwell_time(badge) + 1) / STEP)):
+        badge.run(STEP)
+        if controller_state(badge) == ControllerStates.SHOWING:
+            text = message_queue.current.message
+            shown[text] = shown.get(text, 0) + STEP
+    assert tuple(shown) == texts
+    assert min(shown.values()) >= dwell_time(badge) - STEP
+
+
+def test_browse_history(badge):
+    """The direction buttons browse the shown messages"""
+    message_queue = badge.code.global_state.MESSAGE_QUEUE
+    for text in ("first", "second"):
+        send(badge, text)
+        badge.run(SOUND_DURATION + dwell_time(badge))
+    assert message_queue.current.message == "second"
+
+    badge.press(Buttons.BUTTON_LEFT)
+    badge.run(STEP)
+    assert controller_state(badge) == ControllerStates.SHOWING
+    assert message_queue.current.message == "first"
+
+    badge.press(Buttons.BUTTON_RIGHT)
+    badge.run(STEP)
+    assert message_queue.current.message == "second"
+
+
+def test_buttons_ignored_when_idle(badge):
+    """Buttons do nothing while no message is shown"""
+    badge.press(Buttons.BUTTON_LEFT)
+    badge.press(Buttons.BUTTON_B)
+    badge.run(STEP)
+    assert controller_state(badge) == ControllerStates.IDLE
@@ -0,0 +1,34 @@
+"""
+`test_hal`
+====================================================
+
+Tests for the `hal` hardware boundary
+
+* Author(s): Alec Delaney
+
+"""
+
+from hal import ESP32Network
+
+
+# pylint: disable=too-few-public-methods
+class FakeESP32:
+    """A stand-in for an ``adafruit_esp32spi.ESP_SPIcontrol``"""
+
+    is_connected = True
+
+
+def test_esp32_set_up_when_first_used():
+    """The ESP32 isn't set up, which resets it, until it is first used"""
+    devices = []
+
+    def setup_esp32() -> FakeESP32:
+        devices.append(FakeESP32())
+        return devices[-1]
+
+    network = ESP32Network(setup_esp32)
+    assert not devices
+
+    assert network.is_connected
+    assert network.is_connected
+    assert len(devices) == 1
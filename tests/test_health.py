@@ -0,0 +1,67 @@
+"""
+`test_health`
+====================================================
+
+Tests for the `raspberrypi.health.CircuitBreaker`, using a
+`raspberrypi.fake_badge.FakeBadge` that goes offline and comes back
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import FakeBadge
+from raspberrypi.health import CircuitBreaker, CircuitStates
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.messages import CommandType
+
+FAILURE_THRESHOLD = 3
+
+
+def make_message(index: int) -> RPiDiscordMessage:
+    """Creates a message numbered by its index"""
+    return RPiDiscordMessage("message {}".format(index), "user#0001", CommandType.CHEER)
+
+
+def test_circuit_opens_and_closes():
+    """The circuit opens after enough failed deliveries, after which
+    messages fail without being sent, and closes once a probe succeeds"""
+
+    badge = FakeBadge()
+
+    async def outage() -> None:
+        client = BadgeClient(await badge.start(), timeout=1)
+        breaker = CircuitBreaker(client, failure_threshold=FAILURE_THRESHOLD)
+        port = badge.port
+        await badge.stop()
+
+        for index in range(FAILURE_THRESHOLD):
+            assert breaker.state == CircuitStates.CLOSED
+            result = await client.send_message(make_message(index))
+            assert not result.ok and result.status is None
+        assert breaker.state == CircuitStates.OPEN
+
+        result = await client.send_message(make_message(FAILURE_THRESHOLD))
+        assert not result.ok
+        assert result.error == "circuit open"
+        assert result.latency == 0.0
+
+        assert not await breaker.probe()
+        assert breaker.state == CircuitStates.OPEN
+
+        await badge.start(port=port)
+        assert await breaker.probe()
+        assert breaker.state == CircuitStates.CLOSED
+        assert breaker.consecutive_failures == 0
+
+        assert await client.activate()
+        result = await client.send_message(make_message(FAILURE_THRESHOLD + 1))
+        assert result.ok
+        await client.close()
+        await badge.stop()
+
+    asyncio.run(outage())
+    assert [message for message, _, _ in badge.messages] == [
+        "message {}".format(FAILURE_THRESHOLD + 1)
+    ]
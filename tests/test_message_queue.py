@@ -0,0 +1,132 @@
+"""
+`test_message_queue`
+====================================================
+
+Tests for the `message_queue.MessageQueue` ring buffer
+
+* Author(s): Alec Delaney
+
+"""
+
+import pytest
+from message_queue import MessageQueue, MessageRecord
+
+
+def make_record(index: int) -> MessageRecord:
+    """Creates a message numbered by its index"""
+    return MessageRecord("message {}".format(index), "user#0001", 2)
+
+
+def filled_queue(capacity: int, count: int) -> MessageQueue:
+    """Creates a queue and pushes the given number of messages to it"""
+    queue = MessageQueue(capacity)
+    for index in range(count):
+        queue.push(make_record(index))
+    return queue
+
+
+def test_capacity_must_be_positive():
+    """A queue must be able to hold at least one message"""
+    with pytest.raises(ValueError):
+        MessageQueue(0)
+
+
+def test_empty():
+    """An empty queue has nothing pending or to browse"""
+    queue = MessageQueue(3)
+    assert len(queue) == 0
+    assert queue.pending == 0
+    assert queue.pop_pending() is None
+    assert queue.current is None
+    assert queue.older() is None
+    assert queue.newer() is None
+
+
+def test_push_and_pop_in_order():
+    """Pending messages are taken in the order they arrived"""
+    queue = filled_queue(5, 3)
+    assert len(queue) == 3
+    assert queue.pending == 3
+    assert queue.received == 3
+    for index in range(3):
+        record = queue.pop_pending()
+        assert record.message == "message {}".format(index)
+        assert queue.current is record
+    assert queue.pending == 0
+    assert queue.pop_pending() is None
+
+
+def test_overwrites_oldest_when_full():
+    """Once full, each new message overwrites the oldest"""
+    queue = filled_queue(3, 5)
+    assert len(queue) == 3
+    assert queue.pending == 3
+    assert queue.received == 5
+    assert queue.dropped == 2
+    assert [queue.pop_pending().message for _ in range(3)] == [
+        "message 2",
+        "message 3",
+        "message 4",
+    ]
+
+
+def test_shown_messages_are_not_dropped():
+    """Overwriting a message that has been shown doesn't count as a drop"""
+    queue = filled_queue(2, 2)
+    queue.pop_pending()
+    queue.pop_pending()
+    queue.push(make_record(2))
+    queue.push(make_record(3))
+    assert queue.dropped == 0
+    queue.push(make_record(4))
+    assert queue.dropped == 1
+
+
+def test_browse_older_and_newer():
+    """The history can be browsed back and forth between the oldest
+    message and the newest shown one"""
+    queue = filled_queue(5, 3)
+    for _ in range(3):
+        queue.pop_pending()
+
+    assert queue.current.message == "message 2"
+    assert queue.newer() is None
+    assert queue.older().message == "message 1"
+    assert queue.older().message == "message 0"
+    assert queue.older() is None
+    assert queue.current.message == "message 0"
+    assert queue.newer().message == "message 1"
+    assert queue.newer().message == "message 2"
+    assert queue.newer() is None
+
+
+def test_browsing_stops_at_pending_messages():
+    """Messages that haven't been shown yet can't be browsed to"""
+    queue = filled_queue(5, 3)
+    queue.pop_pending()
+    assert queue.current.message == "message 0"
+    assert queue.newer() is None
+    assert queue.older() is None
+
+
+def test_cursor_follows_message_as_new_ones_arrive():
+    """The message being browsed stays put when new messages arrive"""
+    queue = filled_queue(5, 3)
+    for _ in range(3):
+        queue.pop_pending()
+    queue.older()
+    queue.push(make_record(3))
+    assert queue.current.message == "message 1"
+    assert queue.pending == 1
+    assert queue.pop_pending().message == "message 3"
+
+
+def test_space_counts_messages_not_yet_shown():
+    """Only messages that haven't been shown take up space"""
+    queue = filled_queue(3, 2)
+    assert queue.space == 1
+    queue.pop_pending()
+    assert queue.space == 2
+    queue.push(make_record(2))
+    queue.push(make_record(3))
+    assert queue.space == 0
@@ -0,0 +1,169 @@
+"""
+`test_notifications`
+====================================================
+
+Tests for `notifications.NotificationPlayer`, driven by a fake audio
+output on a virtual clock
+
+* Author(s): Alec Delaney
+
+"""
+
+import pytest
+from fakes import FakeAudioOut, FakePin, FakeSound, VirtualClock
+from notifications import NotificationPlayer, NotificationStates
+
+SOUND_DURATION = 2.0
+MUTED_DURATION = 4.0
+
+
+# pylint: disable=too-few-public-methods
+class SoundLoader:
+    """Hands out a new `FakeSound` for each notification, keeping them
+    so tests can check whether they were released"""
+
+    def __init__(self) -> None:
+        self.loaded = []
+
+    def __call__(self, sound_id: int) -> FakeSound:
+        sound = FakeSound(SOUND_DURATION)
+        sound.sound_id = sound_id
+        self.loaded.append(sound)
+        return sound
+
+
+@pytest.fixture(name="clock")
+def fixture_clock() -> VirtualClock:
+    """The clock the audio output and player share"""
+    return VirtualClock()
+
+
+@pytest.fixture(name="audio")
+def fixture_audio(clock: VirtualClock) -> FakeAudioOut:
+    """The audio output"""
+    return FakeAudioOut(clock)
+
+
+@pytest.fixture(name="loader")
+def fixture_loader() -> SoundLoader:
+    """The sound loader"""
+    return SoundLoader()
+
+
+@pytest.fixture(name="speaker")
+def fixture_speaker() -> FakePin:
+    """The external speaker's enable pin"""
+    return FakePin()
+
+
+def make_player(audio, loader, speaker, clock, release_sounds=True):
+    """Creates a player from the fakes"""
+    return NotificationPlayer(
+        audio,
+        loader,
+        speaker,
+        muted_duration=MUTED_DURATION,
+        monotonic=clock,
+        release_sounds=release_sounds,
+    )
+
+
+def test_starts_idle(audio, loader, speaker, clock):
+    """A new player isn't playing anything"""
+    player = make_player(audio, loader, speaker, clock)
+    assert player.state == NotificationStates.IDLE
+    assert not player.playing
+    assert not player.tick()
+
+
+def test_plays_until_sound_finishes(audio, loader, speaker, clock):
+    """A notification plays for as long as its sound, without blocking"""
+    player = make_player(audio, loader, speaker, clock)
+    player.start(3)
+
+    assert player.state == NotificationStates.PLAYING
+    assert loader.loaded[0].sound_id == 3
+    assert audio.play_count == 1
+    assert speaker.value
+
+    clock.advance(SOUND_DURATION - 0.1)
+    assert player.tick()
+    assert player.state == NotificationStates.PLAYING
+
+    clock.advance(0.1)
+    assert not player.tick()
+    assert player.state == NotificationStates.IDLE
+    assert not speaker.value
+
+
+def test_muted_waits_without_playing(audio, loader, speaker, clock):
+    """A muted notification lasts for the muted duration in silence"""
+    player = make_player(audio, loader, speaker, clock)
+    player.start(1, muted=True)
+
+    assert player.state == NotificationStates.MUTED
+    assert player.playing
+    assert not loader.loaded
+    assert audio.play_count == 0
+    assert not speaker.value
+
+    clock.advance(MUTED_DURATION - 0.1)
+    assert player.tick()
+    clock.advance(0.1)
+    assert not player.tick()
+    assert player.state == NotificationStates.IDLE
+
+
+def test_stop_interrupts_playback(audio, loader, speaker, clock):
+    """Stopping ends the sound straight away"""
+    player = make_player(audio, loader, speaker, clock)
+    player.start(2)
+    player.stop()
+
+    assert player.state == NotificationStates.IDLE
+    assert not audio.playing
+    assert not speaker.value
+
+
+def test_start_replaces_current_notification(audio, loader, speaker, clock):
+    """Starting a notification stops the one already playing"""
+    player = make_player(audio, loader, speaker, clock)
+    player.start(2)
+    clock.advance(1)
+    player.start(3)
+
+    assert loader.loaded[0].deinited
+    assert audio.play_count == 2
+    clock.advance(SOUND_DURATION - 0.1)
+    assert player.tick()
+    clock.advance(0.1)
+    assert not player.tick()
+
+
+def test_releases_sounds_by_default(audio, loader, speaker, clock):
+    """Each sound is released once it has played"""
+    player = make_player(audio, loader, speaker, clock)
+    player.start(2)
+    assert not loader.loaded[0].deinited
+    clock.advance(SOUND_DURATION)
+    player.tick()
+    assert loader.loaded[0].deinited
+
+
+def test_keeps_sounds_when_not_releasing(audio, loader, speaker, clock):
+    """Sounds a loader reuses are left alone once played"""
+    player = make_player(audio, loader, speaker, clock, release_sounds=False)
+    player.start(2)
+    clock.advance(SOUND_DURATION)
+    player.tick()
+    player.start(2)
+    player.stop()
+    assert not any(sound.deinited for sound in loader.loaded)
+
+
+def test_without_speaker_pin(audio, loader, clock):
+    """The speaker enable pin is optional"""
+    player = make_player(audio, loader, None, clock)
+    player.start(2)
+    clock.advance(SOUND_DURATION)
+    assert not player.tick()
@@ -0,0 +1,136 @@
+"""
+`test_outbox`
+====================================================
+
+Tests for delivering messages from the `raspberrypi.outbox.Outbox` to a
+`raspberrypi.fake_badge.FakeBadge`
+
+* Author(s): Alec Delaney
+
+"""
+
+import asyncio
+from typing import Callable
+from raspberrypi.delivery import BadgeClient
+from raspberrypi.fake_badge import ALL_CAPABILITIES, FakeBadge
+from raspberrypi.health import CircuitBreaker
+from raspberrypi.outbox import OutboxDispatcher
+from raspberrypi.rpi_messages import RPiDiscordMessage
+from shared.capabilities import Capabilities
+from shared.messages import CommandType
+
+TIMEOUT = 5
+"""The longest to wait for messages to be delivered, in seconds"""
+
+
+def make_message(index: int, cmd_type: int = CommandType.CHEER) -> RPiDiscordMessage:
+    """Creates a message numbered by its index"""
+    return RPiDiscordMessage("message {}".format(index), "user#0001", cmd_type)
+
+
+async def wait_for(condition: Callable[[], bool]) -> None:
+    """Waits until a condition is met, failing if it takes too long"""
+    deadline = asyncio.get_running_loop().time() + TIMEOUT
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_batches_fit_in_badge_queue(tmp_path):
+    """Batches are no larger than the queue size the DisBadge reports"""
+
+    badge = FakeBadge(capabilities={**ALL_CAPABILITIES, Capabilities.QUEUE: 3})
+
+    async def deliver() -> None:
+        client = BadgeClient(await badge.start(), use_records=True)
+        dispatcher = OutboxDispatcher(str(tmp_path / "outbox.db"), [client])
+        for index in range(7):
+            dispatcher.add(make_message(index))
+        await dispatcher.start()
+        await wait_for(lambda: len(badge.messages) == 7)
+        await dispatcher.stop()
+        await badge.stop()
+
+    asyncio.run(deliver())
+    assert badge.batches and max(badge.batches) == 3
+    assert [message for message, _, _ in badge.messages] == [
+        "message {}".format(index) for index in range(7)
+    ]
+
+
+def test_restarted_badge_activated_again(tmp_path):
+    """Messages for a DisBadge that restarts are held until it has been
+    activated again, and none are lost"""
+
+    badge = FakeBadge()
+
+    async def deliver() -> None:
+        client = BadgeClient(await badge.start(), use_records=True, mute=True)
+        dispatcher = OutboxDispatcher(str(tmp_path / "outbox.db"), [client])
+        await dispatcher.start()
+        dispatcher.add(make_message(0))
+        await wait_for(lambda: len(badge.messages) == 1)
+
+        badge.activated = False
+        badge.muted = False
+        for index in range(1, 4):
+            dispatcher.add(make_message(index))
+        await wait_for(lambda: len(badge.messages) == 4)
+        await dispatcher.stop()
+        await badge.stop()
+
+    asyncio.run(deliver())
+    assert badge.activated and badge.muted
+    assert [message for message, _, _ in badge.messages] == [
+        "message {}".format(index) for index in range(4)
+    ]
+
+
+def test_order_kept_across_outage_and_restart(tmp_path):
+    """Messages held during an outage are delivered in order once the
+    DisBadge is back, even if the outbox was closed and reopened in the
+    meantime, and none that were acknowledged are sent again"""
+
+    badge = FakeBadge()
+    path = str(tmp_path / "outbox.db")
+
+    async def start_delivery(host: str):
+        client = BadgeClient(host, timeout=1, use_records=True)
+        breaker = CircuitBreaker(
+            client, failure_threshold=1, probe_interval=0.05, probe_timeout=0.5
+        )
+        dispatcher = OutboxDispatcher(path, [client])
+        await dispatcher.start()
+        breaker.start()
+        return dispatcher, breaker
+
+    async def deliver() -> None:
+        host = await badge.start()
+        dispatcher, breaker = await start_delivery(host)
+        for index in range(3):
+            dispatcher.add(make_message(index))
+        await wait_for(lambda: len(badge.messages) == 3)
+
+        # The DisBadge goes offline, then the bot restarts
+        port = badge.port
+        await badge.stop()
+        for index in range(3, 6):
+            dispatcher.add(make_message(index))
+        await wait_for(lambda: breaker.is_open)
+        await breaker.stop()
+        await dispatcher.stop()
+
+        badge.activated = False
+        await badge.start(port=port)
+        dispatcher, breaker = await start_delivery(host)
+        dispatcher.add(make_message(6))
+        await wait_for(lambda: len(badge.messages) == 7)
+        assert dispatcher.backlog == 0
+        await breaker.stop()
+        await dispatcher.stop()
+        await badge.stop()
+
+    asyncio.run(deliver())
+    assert [message for message, _, _ in badge.messages] == [
+        "message {}".format(index) for index in range(7)
+    ]
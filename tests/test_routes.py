@@ -0,0 +1,103 @@
+"""
+`test_routes`
+====================================================
+
+Tests for the web routes in the DisBadge's ``code.py``, running on the
+simulator
+
+* Author(s): Alec Delaney
+
+"""
+
+import pytest
+import simulator
+from shared.capabilities import Capabilities, decode_capabilities
+from shared.messages import CommandType
+from shared.record_codec import RECORD_CONTENT_TYPE, encode_record
+
+# Long enough for the main loop to handle a request
+STEP = 0.05
+
+
+@pytest.fixture(name="badge")
+def fixture_badge() -> simulator.Simulator:
+    """A simulated DisBadge that has been activated and is in its main loop"""
+    badge = simulator.Simulator()
+    badge.start()
+    badge.network.responses.clear()
+    return badge
+
+
+def records(count: int) -> str:
+    """A batch of messages in the compact record format"""
+    return b"".join(
+        encode_record("message {}".format(index), "user#0001", CommandType.CHEER)
+        for index in range(count)
+    ).decode()
+
+
+def history_size(badge: simulator.Simulator) -> int:
+    """The number of messages the DisBadge's queue holds"""
+    return badge.code.global_state.HISTORY_SIZE
+
+
+def last_response(badge: simulator.Simulator):
+    """The status and body of the most recent response"""
+    return badge.network.responses[-1]
+
+
+def test_capabilities_include_queue_size(badge):
+    """The DisBadge reports how many messages it can hold"""
+    badge.request("GET", "/capabilities")
+    badge.run(STEP)
+    status, body = last_response(badge)
+    assert status == "200 OK"
+    capabilities = decode_capabilities(body)
+    assert capabilities[Capabilities.QUEUE] == history_size(badge)
+    assert capabilities[Capabilities.BATCH] is None
+
+
+def test_batch_accepted(badge):
+    """A batch that fits in the queue is accepted whole"""
+    badge.request("POST", "/messages", records(3), RECORD_CONTENT_TYPE)
+    badge.run(STEP)
+    assert last_response(badge) == ("200 OK", "3")
+    assert badge.code.global_state.MESSAGE_QUEUE.received == 3
+
+
+def test_batch_larger_than_queue_refused(badge):
+    """A batch that would overwrite messages not yet shown is refused
+    whole, so the Raspberry Pi sends it again later"""
+    message_queue = badge.code.global_state.MESSAGE_QUEUE
+    badge.request(
+        "POST", "/messages", records(history_size(badge) + 1), RECORD_CONTENT_TYPE
+    )
+    badge.run(STEP)
+    assert last_response(badge)[0] == "503 Service Unavailable"
+    assert message_queue.received == 0
+    assert message_queue.dropped == 0
+
+
+def test_message_refused_while_queue_full(badge):
+    """A message is refused while every message in the queue is still
+    waiting to be shown"""
+    message_queue = badge.code.global_state.MESSAGE_QUEUE
+    for _ in range(history_size(badge)):
+        message_queue.push(badge.code.MessageRecord("waiting", "user#0001", 1))
+    badge.request("POST", "/message", records(1), RECORD_CONTENT_TYPE)
+    badge.run(STEP)
+    assert last_response(badge)[0] == "503 Service Unavailable"
+    assert message_queue.dropped == 0
+
+
+def test_messages_refused_until_activated(badge):
+    """A DisBadge that hasn't been activated, such as after restarting,
+    refuses messages so that none are acknowledged"""
+    badge.code.global_state.DISCORD_CONNECTION = False
+    badge.request("POST", "/message", records(1), RECORD_CONTENT_TYPE)
+    badge.request("POST", "/messages", records(2), RECORD_CONTENT_TYPE)
+    badge.run(STEP)
+    assert [status for status, _ in badge.network.responses] == [
+        "503 Service Unavailable"
+    ] * 2
+    assert badge.code.global_state.MESSAGE_QUEUE.received == 0
@@ -0,0 +1,176 @@
+"""
+`test_scheduler`
+====================================================
+
+Tests for the timing of `scheduler.Scheduler`, on a virtual clock and on
+the simulated DisBadge's main loop
+
+* Author(s): Alec Delaney
+
+"""
+
+import pytest
+from fakes import VirtualClock
+from scheduler import Scheduler
+from simulator import Simulator
+
+
+# pylint: disable=too-few-public-methods
+class Counter:
+    """A task callback that counts its runs and can take time to run
+
+    :param VirtualClock clock: The clock to advance while running
+    :param float duration: (Optional) How long each run takes, default is 0
+    """
+
+    def __init__(self, clock: VirtualClock, duration: float = 0.0) -> None:
+        self.clock = clock
+        self.duration = duration
+        self.runs = 0
+
+    def __call__(self) -> None:
+        self.runs += 1
+        self.clock.advance(self.duration)
+
+
+@pytest.fixture(name="clock")
+def fixture_clock() -> VirtualClock:
+    """The clock the scheduler runs on"""
+    return VirtualClock()
+
+
+@pytest.fixture(name="scheduler")
+def fixture_scheduler(clock: VirtualClock) -> Scheduler:
+    """A scheduler on the virtual clock"""
+    return Scheduler(clock, clock.advance)
+
+
+def test_runs_new_tasks_on_next_pass(clock, scheduler):
+    """Tasks run on the first pass after being added, then wait for
+    their interval"""
+    fast = Counter(clock)
+    slow = Counter(clock)
+    scheduler.add_task("fast", fast, 0.1)
+    scheduler.add_task("slow", slow, 0.5)
+
+    assert scheduler.run_once() == pytest.approx(0.1)
+    assert (fast.runs, slow.runs) == (1, 1)
+    assert scheduler.run_once() == pytest.approx(0.1)
+    assert (fast.runs, slow.runs) == (1, 1)
+    assert scheduler.passes == 2
+
+
+def test_runs_tasks_at_their_rates(clock, scheduler):
+    """Sleeping for the returned wait runs each task at its own rate"""
+    fast = Counter(clock)
+    slow = Counter(clock)
+    scheduler.add_task("fast", fast, 0.1)
+    scheduler.add_task("slow", slow, 0.25)
+
+    while clock.now < 0.99:
+        clock.advance(scheduler.run_once())
+
+    assert fast.runs == 10
+    assert slow.runs == 4
+
+
+def test_wait_counts_down_to_next_task(clock, scheduler):
+    """The wait returned is the time left until the next task is due"""
+    scheduler.add_task("task", Counter(clock), 1.0)
+    scheduler.run_once()
+    clock.advance(0.4)
+    assert scheduler.run_once() == pytest.approx(0.6)
+    clock.advance(0.6)
+    assert scheduler.run_once() == pytest.approx(1.0)
+
+
+def test_zero_interval_runs_every_pass(clock, scheduler):
+    """A task with no interval runs on every pass without waiting"""
+    always = Counter(clock)
+    scheduler.add_task("always", always, 0)
+    assert scheduler.run_once() == 0.0
+    assert scheduler.run_once() == 0.0
+    assert always.runs == 2
+
+
+def test_records_latency_and_duration(clock, scheduler):
+    """How late and how long each task ran is recorded"""
+    scheduler.add_task("task", Counter(clock, duration=0.02), 0.1)
+    scheduler.run_once()
+    clock.advance(0.13)
+    scheduler.run_once()
+
+    runs, latency, duration = scheduler.task_stats()["task"]
+    assert runs == 2
+    assert latency == pytest.approx(0.05)
+    assert duration == pytest.approx(0.02)
+
+    scheduler.reset_stats()
+    assert scheduler.task_stats()["task"] == (0, 0.0, 0.0)
+    assert scheduler.passes == 0
+
+
+def test_does_not_catch_up_missed_runs(clock, scheduler):
+    """A task that falls far behind runs once, then resumes its rate
+    from when it finished"""
+    task = Counter(clock)
+    scheduler.add_task("task", task, 0.1)
+    scheduler.run_once()
+    clock.advance(1.0)
+    scheduler.run_once()
+    assert task.runs == 2
+    assert scheduler.run_once() == pytest.approx(0.1)
+    assert task.runs == 2
+
+
+def test_slow_task_delays_the_next(clock, scheduler):
+    """A task that overruns makes the tasks after it in the pass late"""
+    scheduler.add_task("slow", Counter(clock, duration=0.03), 0.1)
+    scheduler.add_task("other", Counter(clock), 0.1)
+    scheduler.run_once()
+    assert scheduler.task_stats()["other"][1] == pytest.approx(0.03)
+
+
+def test_set_interval(clock, scheduler):
+    """Changing a task's interval moves its next run"""
+    scheduler.add_task("task", Counter(clock), 1.0)
+    scheduler.run_once()
+    scheduler.set_interval("task", 0.25)
+    assert scheduler.get_task("task").interval == 0.25
+    assert scheduler.run_once() == pytest.approx(0.25)
+    with pytest.raises(ValueError):
+        scheduler.set_interval("missing", 1.0)
+
+
+def test_remove_task_from_within_a_task(clock, scheduler):
+    """A task can remove itself while the scheduler is running it"""
+    other = Counter(clock)
+
+    def run_once_only() -> None:
+        scheduler.remove_task("once")
+
+    scheduler.add_task("once", run_once_only, 0.1)
+    scheduler.add_task("other", other, 0.1)
+    scheduler.run_once()
+    assert scheduler.get_task("once") is None
+    assert other.runs == 1
+
+
+def test_main_loop_rates_on_simulator():
+    """The DisBadge's main loop tasks run at their configured rates on the
+    simulated hardware, and are never late on the virtual clock"""
+    simulator = Simulator()
+    simulator.start()
+    stats = simulator.run(2.0)
+
+    code = simulator.code
+    expected = {
+        "network": code.NETWORK_INTERVAL,
+        "leds": code.LED_INTERVAL,
+        "inputs": code.INPUT_INTERVAL,
+        "display": code.DISPLAY_INTERVAL,
+    }
+    for name, interval in expected.items():
+        runs, latency, _ = stats.tasks[name]
+        assert runs == pytest.approx(2.0 / interval, abs=1)
+        assert latency == pytest.approx(0.0, abs=1e-9)
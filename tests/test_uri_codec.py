@@ -0,0 +1,91 @@
+"""
+`test_uri_codec`
+====================================================
+
+Tests for the `shared.uri_codec` form payload codec
+
+* Author(s): Alec Delaney
+
+"""
+
+from io import BytesIO, StringIO
+import pytest
+from shared.uri_codec import (
+    decode_payload,
+    encode_characters,
+    iter_decode_payload,
+)
+
+FIELDS = (
+    ("msg", "Hello, world! -- ünïcödé & 🎉"),
+    ("user", "user#0001"),
+    ("cmd-type", "2"),
+    ("empty", ""),
+)
+
+CHUNK_SIZES = (1, 2, 3, 4, 5)
+
+
+def encode_payload(fields) -> str:
+    """Encodes key/value pairs as a form payload"""
+    return "&".join(
+        "{}={}".format(encode_characters(key), encode_characters(value))
+        for key, value in fields
+    )
+
+
+def make_stream(payload: str, as_bytes: bool):
+    """Wraps a payload in a file-like object, as str or bytes"""
+    if as_bytes:
+        return BytesIO(payload.encode())
+    return StringIO(payload)
+
+
+@pytest.mark.parametrize("as_bytes", (False, True))
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_decodes_across_chunk_boundaries(chunk_size, as_bytes):
+    """Fields and escapes split across chunks are decoded the same as the
+    whole payload at once"""
+    payload = encode_payload(FIELDS)
+    stream = make_stream(payload, as_bytes)
+    decoded = list(iter_decode_payload(stream, chunk_size))
+    assert decoded == list(FIELDS)
+    assert dict(decoded) == decode_payload(payload)
+
+
+@pytest.mark.parametrize("as_bytes", (False, True))
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_empty_payload(chunk_size, as_bytes):
+    """An empty payload has no fields"""
+    assert not list(iter_decode_payload(make_stream("", as_bytes), chunk_size))
+
+
+@pytest.mark.parametrize("as_bytes", (False, True))
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("payload", ("msg=Hello-32", "msg-=1", "msg=-"))
+def test_truncated_escape(payload, chunk_size, as_bytes):
+    """A payload that ends partway through an escape can't be decoded"""
+    stream = make_stream(payload, as_bytes)
+    with pytest.raises(RuntimeError):
+        list(iter_decode_payload(stream, chunk_size))
+
+
+@pytest.mark.parametrize("as_bytes", (False, True))
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize(
+    "payload",
+    (
+        "msg=a=b",
+        "msg=hello&user",
+        "msg&user=a",
+        "msg",
+        "msg=-x-",
+        "msg=--",
+    ),
+)
+def test_malformed_payload(payload, chunk_size, as_bytes):
+    """A payload with a missing or extra ``=``, or an escape that isn't a
+    number, can't be decoded"""
+    stream = make_stream(payload, as_bytes)
+    with pytest.raises(ValueError):
+        list(iter_decode_payload(stream, chunk_size))